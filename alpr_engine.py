@@ -1,8 +1,8 @@
 import cv2
 import numpy as np
-from ultralytics import YOLO
 import json
 import re
+import time
 from typing import Optional, Tuple, List
 import torch
 import os
@@ -18,25 +18,245 @@ except Exception as e:
     print(f"⚠ Could not apply Pillow compatibility patch: {e}")
 
 import easyocr
+from detector_backends import create_detector
+import lprnet
+from debug_trace import trace as _log
 from logging_config import get_logger
+from stage_metrics import add_timing
 
 # Get logger
 logger = get_logger('app')
 
-# #region agent log
-LOG_PATH = r"c:\Users\maazs\Documents\Projects\ALPR_TollPlaza_System\.cursor\debug.log"
-def _log(location, message, data=None, hypothesisId=None):
-    try:
-        import json as _json
-        log_entry = {"sessionId": "debug-session", "runId": "run1", "location": location, "message": message, "data": data or {}, "timestamp": int(__import__("time").time() * 1000)}
-        if hypothesisId: log_entry["hypothesisId"] = hypothesisId
-        with open(LOG_PATH, "a", encoding="utf-8") as f: f.write(_json.dumps(log_entry) + "\n")
-    except: pass
-# #endregion
+
+# Characters that can appear on an Indian plate
+PLATE_ALLOWLIST = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+
+
+class DetectionRegion:
+    """
+    Where and at what size one camera's frames are run through YOLO: an
+    optional lane polygon and a reduced detection width; crops are always
+    taken from the frames as the camera delivers them
+    
+    roi is given in the camera's full-resolution pixel coordinates (its
+    configured width x height); roi_scale maps it onto the delivered frames
+    when the camera scales them down while decoding (CameraHandler.frame_scale)
+    """
+    def __init__(self, roi=None, detect_width=0, roi_scale: float = 1.0):
+        roi = roi or []
+        self.polygon = np.rint(np.array(roi, dtype=np.float64) * roi_scale).astype(np.int32) if len(roi) >= 3 else None
+        self.detect_width = int(detect_width or 0)
+        self._masks = {}
+        self._outside_warned = set()     # Frame sizes the ROI does not fit, warned once each
+    
+    def prepare(self, frame: np.ndarray) -> Tuple[np.ndarray, int, int, float]:
+        """
+        Restrict a frame to the ROI and downscale it for detection
+        Returns: (detector_input, x_offset, y_offset, scale) where a detector box
+                 maps back to the frame as box / scale + offset
+        """
+        image = frame
+        x_offset = y_offset = 0
+        
+        if self.polygon is not None:
+            h, w = frame.shape[:2]
+            x, y, rw, rh = cv2.boundingRect(self.polygon)
+            x1, y1 = max(0, x), max(0, y)
+            x2, y2 = min(w, x + rw), min(h, y + rh)
+            if x2 > x1 and y2 > y1:
+                roi = frame[y1:y2, x1:x2]
+                image = cv2.bitwise_and(roi, roi, mask=self._mask(frame.shape[:2]))
+                x_offset, y_offset = x1, y1
+            elif (w, h) not in self._outside_warned:
+                # Skip the mask for this frame only; e.g. a reconnect at another resolution
+                self._outside_warned.add((w, h))
+                logger.warning(f"ROI {self.polygon.tolist()} lies outside the {w}x{h} frame, "
+                               f"detecting on whole {w}x{h} frames")
+        
+        scale = 1.0
+        if self.detect_width and image.shape[1] > self.detect_width:
+            scale = self.detect_width / image.shape[1]
+            height = max(1, int(round(image.shape[0] * scale)))
+            image = cv2.resize(image, (self.detect_width, height), interpolation=cv2.INTER_AREA)
+        
+        return image, x_offset, y_offset, scale
+    
+    def _mask(self, frame_shape: Tuple[int, int]) -> np.ndarray:
+        """Polygon mask over the ROI bounding box, cached per frame size"""
+        mask = self._masks.get(frame_shape)
+        if mask is None:
+            h, w = frame_shape
+            x, y, rw, rh = cv2.boundingRect(self.polygon)
+            x1, y1 = max(0, x), max(0, y)
+            x2, y2 = min(w, x + rw), min(h, y + rh)
+            mask = np.zeros((y2 - y1, x2 - x1), dtype=np.uint8)
+            cv2.fillPoly(mask, [self.polygon - np.array([x1, y1], dtype=np.int32)], 255)
+            self._masks[frame_shape] = mask
+        return mask
+
+
+class Recognizer:
+    """Reads the text of tight plate crops; backends are selected with ocr.backend"""
+    name = 'base'
+    # Whether recognize() expects preprocess_plate() output or the raw BGR crop
+    uses_preprocessed = True
+    
+    def recognize(self, images: List[np.ndarray]) -> List[Optional[Tuple[str, float]]]:
+        """
+        Read a batch of plate images
+        Returns: (raw_text, confidence) or None for each image
+        """
+        raise NotImplementedError
+
+
+class EasyOCRRecognizer(Recognizer):
+    """EasyOCR reader, by default in recognition-only mode"""
+    name = 'easyocr'
+    
+    def __init__(self, ocr_config: dict):
+        # The crop is already a tight plate, so running CRAFT text detection on
+        # it again is wasted work unless explicitly requested
+        self.recognition_only = ocr_config.get('recognition_only', True)
+        self.decoder = ocr_config.get('decoder', 'greedy')
+        self.beam_width = ocr_config.get('beam_width', 5)
+        self.allowlist = ocr_config.get('allowlist', PLATE_ALLOWLIST)
+        
+        # Plates narrower than this width/height ratio are read as two rows
+        # (bike plates), split horizontally at two_row_split of the height
+        self.two_row_aspect = ocr_config.get('two_row_aspect', 2.5)
+        self.two_row_split = ocr_config.get('two_row_split', 0.5)
+        
+        self.reader = easyocr.Reader(
+            ocr_config['languages'],
+            gpu=ocr_config['gpu'],
+            detector=not self.recognition_only
+        )
+    
+    def recognize(self, images: List[np.ndarray]) -> List[Optional[Tuple[str, float]]]:
+        if not self.recognition_only:
+            return self._readtext(images)
+        if not images:
+            return []
+        
+        # Stack all plates into one canvas so every text band of every plate
+        # goes through the recognizer in a single batch
+        canvas, boxes, layout = self._stack_bands(images)
+        results = self.reader.recognize(
+            canvas,
+            horizontal_list=boxes,
+            free_list=[],
+            decoder=self.decoder,
+            beamWidth=self.beam_width,
+            batch_size=len(boxes),
+            allowlist=self.allowlist,
+            detail=1
+        )
+        
+        # EasyOCR reorders its output; match readings back by box corner
+        band_readings = {}
+        for box, text, confidence in results:
+            band_readings[(int(box[0][0]), int(box[0][1]))] = (text, float(confidence))
+        
+        readings = []
+        for corners in layout:
+            parts = [band_readings.get(corner) for corner in corners]
+            if any(part is None or not part[0] for part in parts):
+                readings.append(None)
+                continue
+            # Two-row plates read top row first, then bottom row
+            text = ''.join(part[0] for part in parts)
+            confidence = float(np.mean([part[1] for part in parts]))
+            readings.append((text, confidence))
+        return readings
+    
+    def _stack_bands(self, images: List[np.ndarray]):
+        """
+        Stack plates vertically and list their text bands
+        Returns: (canvas, boxes as [x_min, x_max, y_min, y_max], band corners per image)
+        """
+        width = max(img.shape[1] for img in images)
+        rows, boxes, layout = [], [], []
+        y = 0
+        for img in images:
+            h, w = img.shape[:2]
+            rows.append(cv2.copyMakeBorder(img, 0, 0, 0, width - w, cv2.BORDER_CONSTANT, value=255))
+            
+            if w / h < self.two_row_aspect:
+                split = int(h * self.two_row_split)
+                bands = [(0, split), (split, h)]
+            else:
+                bands = [(0, h)]
+            
+            corners = []
+            for top, bottom in bands:
+                boxes.append([0, w, y + top, y + bottom])
+                corners.append((0, y + top))
+            layout.append(corners)
+            y += h
+        
+        return np.vstack(rows), boxes, layout
+    
+    def _readtext(self, images: List[np.ndarray]) -> List[Optional[Tuple[str, float]]]:
+        """Full EasyOCR pipeline (CRAFT detection + recognition) in one batched call"""
+        if not images:
+            return []
+        
+        # readtext_batched needs equally sized images; every preprocessed plate
+        # is 100px high, so pad the narrower ones with white on the right
+        max_width = max(img.shape[1] for img in images)
+        batch = [
+            cv2.copyMakeBorder(img, 0, 0, 0, max_width - img.shape[1], cv2.BORDER_CONSTANT, value=255)
+            for img in images
+        ]
+        batch_results = self.reader.readtext_batched(
+            batch,
+            decoder=self.decoder,
+            beamWidth=self.beam_width,
+            allowlist=self.allowlist,
+            detail=1
+        )
+        return [self._best(results) for results in batch_results]
+    
+    @staticmethod
+    def _best(results: list) -> Optional[Tuple[str, float]]:
+        """Highest-confidence (text, confidence) of an EasyOCR result list"""
+        if not results:
+            return None
+        best_result = max(results, key=lambda x: x[2])
+        return best_result[1], float(best_result[2])
+
+
+class LPRNetRecognizer(Recognizer):
+    """LPRNet CTC recognizer (see lprnet.py / train_lprnet.py)"""
+    name = 'lprnet'
+    uses_preprocessed = False
+    
+    def __init__(self, ocr_config: dict):
+        self.device = 'cuda' if ocr_config['gpu'] and torch.cuda.is_available() else 'cpu'
+        model_path = ocr_config.get('lprnet_model', 'models/lprnet.pth')
+        self.model = lprnet.load_model(model_path, self.device)
+        print(f"✓ Loaded LPRNet model: {model_path}")
+    
+    def recognize(self, images: List[np.ndarray]) -> List[Optional[Tuple[str, float]]]:
+        return lprnet.recognize(self.model, images, self.device)
+
+
+def create_recognizer(ocr_config: dict) -> Recognizer:
+    """Build the OCR backend selected in the ocr config section"""
+    backend = ocr_config.get('backend', 'easyocr')
+    if backend == 'easyocr':
+        return EasyOCRRecognizer(ocr_config)
+    if backend == 'lprnet':
+        return LPRNetRecognizer(ocr_config)
+    raise ValueError(f"Unknown OCR backend: {backend}")
+
 
 class ALPREngine:
-    def __init__(self, config_path: str = "config.json"):
-        """Initialize ALPR engine with YOLO and EasyOCR"""
+    def __init__(self, config_path: str = "config.json", ocr_only: bool = False):
+        """
+        Initialize ALPR engine with the YOLO detector and OCR recognizer
+        ocr_only skips the detector; used by the OCR worker processes
+        """
         logger.info("Initializing ALPR Engine")
         # #region agent log
         _log("alpr_engine.py:13", "Loading config for ALPR", {"config_path": config_path}, "A")
@@ -66,77 +286,150 @@ class ALPREngine:
         self.yolo_config = config['yolo']
         self.ocr_config = config['ocr']
         
-        # Initialize YOLO model
-        print("Loading YOLO model...")
-        logger.info("Loading YOLO model")
-        self.yolo_model = self._load_yolo_model()
-        
-        # Initialize EasyOCR
-        print("Loading EasyOCR...")
-        logger.info("Loading EasyOCR reader")
-        self.ocr_reader = easyocr.Reader(
-            self.ocr_config['languages'],
-            gpu=self.ocr_config['gpu']
-        )
+        # Initialize YOLO detector backend
+        if ocr_only:
+            self.detector = None
+        else:
+            print("Loading YOLO model...")
+            logger.info("Loading YOLO model")
+            self.detector = create_detector(self.yolo_config)
+        
+        # Region from the 'yolo' section, used when no lane region is passed
+        # (uploaded images, replay); pipeline lanes bring their own (make_region)
+        self.region = self.make_region()
+        
+        # Initialize text recognizer, either in worker processes or in-process
+        workers = 0 if ocr_only else int(self.ocr_config.get('workers', 0))
+        if workers > 0:
+            from ocr_pool import OCRWorkerPool
+            self.ocr_pool = OCRWorkerPool(config_path, workers)
+            self.recognizer = None
+        else:
+            backend = self.ocr_config.get('backend', 'easyocr')
+            print(f"Loading {backend} recognizer...")
+            logger.info(f"Loading {backend} recognizer")
+            self.ocr_pool = None
+            self.recognizer = create_recognizer(self.ocr_config)
         
         print("✓ ALPR Engine initialized")
         logger.info("ALPR Engine initialized successfully")
     
-    def _load_yolo_model(self):
-        """Load YOLO model for license plate detection"""
-        try:
-            # Try to load custom model
-            model = YOLO(self.yolo_config['model_path'])
-            print(f"✓ Loaded custom YOLO model: {self.yolo_config['model_path']}")
-        except:
-            # Fallback to YOLOv8n for general object detection
-            print("Custom model not found, using YOLOv8n...")
-            model = YOLO('yolov8n.pt')
-            print("✓ Loaded YOLOv8n model")
-        
-        # Set device
-        device = self.yolo_config['device']
-        if device == 'cuda' and not torch.cuda.is_available():
-            print("CUDA not available, falling back to CPU")
-            device = 'cpu'
-        
-        model.to(device)
-        print(f"✓ Using device: {device}")
-        
-        return model
+    def make_region(self, roi=None, detect_width=None, roi_scale: float = 1.0) -> DetectionRegion:
+        """
+        Detection region for one camera; unset values fall back to the 'yolo' config
+        roi_scale: the camera's frame_scale(), for cameras that decode at a reduced width
+        """
+        return DetectionRegion(
+            self.yolo_config.get('roi') if roi is None else roi,
+            self.yolo_config.get('detect_width') if detect_width is None else detect_width,
+            roi_scale
+        )
     
-    def detect_plate(self, frame: np.ndarray) -> Optional[Tuple[np.ndarray, float]]:
+    def detect_plate(self, frame: np.ndarray, region: Optional[DetectionRegion] = None) -> Optional[Tuple[np.ndarray, float]]:
         """
-        Detect license plate in frame using YOLO
+        Detect the most confident license plate in frame using YOLO
         Returns: (cropped_plate_image, confidence) or None
         """
-        # Run YOLO detection
-        results = self.yolo_model(frame, conf=self.yolo_config['confidence'])
-        
-        if len(results) == 0 or len(results[0].boxes) == 0:
+        plates = self.detect_plates(frame, region=region)
+        if not plates:
             return None
         
-        # Get the detection with highest confidence
-        boxes = results[0].boxes
-        confidences = boxes.conf.cpu().numpy()
-        best_idx = np.argmax(confidences)
-        
-        # Extract bounding box
-        box = boxes.xyxy[best_idx].cpu().numpy().astype(int)
-        x1, y1, x2, y2 = box
-        confidence = float(confidences[best_idx])
+        plate_img, confidence, _ = plates[0]
+        return plate_img, confidence
+    
+    def detect_plates(self, frame: np.ndarray, timings: Optional[dict] = None,
+                      region: Optional[DetectionRegion] = None) -> List[Tuple[np.ndarray, float, Tuple[int, int, int, int]]]:
+        """
+        Detect every license plate above the confidence threshold
+        timings, if given, accumulates 'yolo' and 'crop' seconds; region
+        defaults to the engine's ROI and detection width
+        Returns: list of (cropped_plate_image, confidence, (x1, y1, x2, y2)),
+                 most confident first
+        """
+        # Run YOLO detection on the ROI / downscaled image
+        start = time.perf_counter()
+        region = region or self.region
+        det_input, x_offset, y_offset, scale = self._prepare_detection_input(frame, region)
+        boxes = self.detector.detect([det_input], self.yolo_config['confidence'], region.detect_width or None)
+        add_timing(timings, 'yolo', time.perf_counter() - start)
+        
+        if len(boxes) == 0:
+            return []
+        
+        start = time.perf_counter()
+        plates = self._plates_from_boxes(frame, boxes[0], x_offset, y_offset, scale)
+        add_timing(timings, 'crop', time.perf_counter() - start)
+        return plates
+    
+    def detect_plates_batch(self, frames: List[np.ndarray], timings: Optional[dict] = None,
+                            regions: Optional[List[Optional[DetectionRegion]]] = None) -> List[List[Tuple[np.ndarray, float, Tuple[int, int, int, int]]]]:
+        """
+        Detect license plates in several frames with a single YOLO forward pass
+        timings, if given, accumulates 'yolo' and 'crop' seconds of the whole batch;
+        regions gives each frame's camera region (None entries use the engine's)
+        Returns: list of detect_plates()-style lists, one per frame
+        """
+        if not frames:
+            return []
+        
+        start = time.perf_counter()
+        regions = [region or self.region for region in (regions or [None] * len(frames))]
+        prepared = [self._prepare_detection_input(frame, region) for frame, region in zip(frames, regions)]
+        
+        # One inference size per batch: the largest detection width among its lanes
+        detect_size = max(region.detect_width for region in regions) or None
+        boxes = self.detector.detect([p[0] for p in prepared], self.yolo_config['confidence'], detect_size)
+        add_timing(timings, 'yolo', time.perf_counter() - start)
+        
+        start = time.perf_counter()
+        plates = [
+            self._plates_from_boxes(frame, frame_boxes, x_offset, y_offset, scale)
+            for frame, frame_boxes, (_, x_offset, y_offset, scale) in zip(frames, boxes, prepared)
+        ]
+        add_timing(timings, 'crop', time.perf_counter() - start)
+        return plates
+    
+    def _prepare_detection_input(self, frame: np.ndarray,
+                                 region: Optional[DetectionRegion] = None) -> Tuple[np.ndarray, int, int, float]:
+        """
+        Restrict a frame to the region's ROI and downscale it for detection
+        Returns: (detector_input, x_offset, y_offset, scale)
+        """
+        return (region or self.region).prepare(frame)
+    
+    def _plates_from_boxes(self, frame: np.ndarray, boxes: np.ndarray, x_offset: int = 0, y_offset: int = 0,
+                           scale: float = 1.0) -> List[Tuple[np.ndarray, float, Tuple[int, int, int, int]]]:
+        """Crop every detector box from the full-resolution frame, most confident first"""
+        if len(boxes) == 0:
+            return []
+        
+        confidences = boxes[:, 4]
+        # Map boxes from the detector input back to full-resolution coordinates
+        xyxy = boxes[:, :4] / scale
+        xyxy[:, [0, 2]] += x_offset
+        xyxy[:, [1, 3]] += y_offset
+        xyxy = xyxy.astype(int)
         
-        # Crop plate region with some padding
         h, w = frame.shape[:2]
         padding = 10
-        x1 = max(0, x1 - padding)
-        y1 = max(0, y1 - padding)
-        x2 = min(w, x2 + padding)
-        y2 = min(h, y2 + padding)
         
-        plate_img = frame[y1:y2, x1:x2]
+        plates = []
+        for idx in np.argsort(-confidences):
+            x1, y1, x2, y2 = xyxy[idx]
+            
+            # Crop plate region with some padding
+            x1 = max(0, x1 - padding)
+            y1 = max(0, y1 - padding)
+            x2 = min(w, x2 + padding)
+            y2 = min(h, y2 + padding)
+            if x2 <= x1 or y2 <= y1:
+                continue
+            
+            # Copy the small crop so it does not pin the camera's frame buffer
+            plate_img = frame[y1:y2, x1:x2].copy()
+            plates.append((plate_img, float(confidences[idx]), (int(x1), int(y1), int(x2), int(y2))))
         
-        return plate_img, confidence
+        return plates
     
     def preprocess_plate(self, plate_img: np.ndarray) -> np.ndarray:
         """Preprocess plate image for better OCR"""
@@ -170,13 +463,16 @@ class ALPREngine:
     
     def read_plate_text(self, plate_img: np.ndarray) -> Optional[Tuple[str, float, np.ndarray]]:
         """
-        Extract text from plate image using EasyOCR
+        Extract text from plate image using the configured recognizer
         Returns: (plate_text, confidence, preprocessed_image) or None
         """
         # #region agent log
         _log("alpr_engine.py:read_plate_text:1", "read_plate_text() called", {"plate_img_shape": plate_img.shape if plate_img is not None else None}, "M")
         # #endregion
         
+        if self.ocr_pool:
+            return self.ocr_pool.read_plate_texts([plate_img])[0]
+        
         # Preprocess image
         processed = self.preprocess_plate(plate_img)
         # #region agent log
@@ -184,24 +480,59 @@ class ALPREngine:
         # #endregion
         
         # Run OCR
+        reading = self.recognizer.recognize([processed if self.recognizer.uses_preprocessed else plate_img])[0]
         # #region agent log
-        _log("alpr_engine.py:read_plate_text:3", "Before ocr_reader.readtext()", {}, "M")
-        # #endregion
-        results = self.ocr_reader.readtext(processed)
-        # #region agent log
-        _log("alpr_engine.py:read_plate_text:4", "After ocr_reader.readtext()", {"results_count": len(results), "results": str(results)[:200]}, "M")
+        _log("alpr_engine.py:read_plate_text:4", "After recognizer.recognize()", {"reading": str(reading)}, "M")
         # #endregion
         
-        if not results:
+        if reading is None:
             # #region agent log
             _log("alpr_engine.py:read_plate_text:5", "No OCR results", {}, "M")
             # #endregion
             return None
         
-        # Get result with highest confidence
-        best_result = max(results, key=lambda x: x[2])
-        text = best_result[1]
-        confidence = best_result[2]
+        return self._accept_reading(reading, processed)
+    
+    def read_plate_texts(self, plate_imgs: List[np.ndarray], timings: Optional[dict] = None) -> List[Optional[Tuple[str, float, np.ndarray]]]:
+        """
+        Extract text from several plate images with one recognizer call
+        timings, if given, accumulates 'preprocess', 'ocr' and 'clean' seconds
+        (all of it as 'ocr' when a worker pool does the work)
+        Returns: list with (plate_text, confidence, preprocessed_image) or None per image
+        """
+        if self.ocr_pool:
+            start = time.perf_counter()
+            outputs = self.ocr_pool.read_plate_texts(plate_imgs)
+            add_timing(timings, 'ocr', time.perf_counter() - start)
+            return outputs
+        
+        start = time.perf_counter()
+        processed_imgs = []
+        for plate_img in plate_imgs:
+            try:
+                processed_imgs.append(self.preprocess_plate(plate_img))
+            except ValueError:
+                processed_imgs.append(None)
+        add_timing(timings, 'preprocess', time.perf_counter() - start)
+        
+        start = time.perf_counter()
+        valid = [i for i, processed in enumerate(processed_imgs) if processed is not None]
+        inputs = [processed_imgs[i] if self.recognizer.uses_preprocessed else plate_imgs[i] for i in valid]
+        readings = self.recognizer.recognize(inputs) if inputs else []
+        add_timing(timings, 'ocr', time.perf_counter() - start)
+        
+        start = time.perf_counter()
+        outputs = [None] * len(plate_imgs)
+        for i, reading in zip(valid, readings):
+            if reading is not None:
+                outputs[i] = self._accept_reading(reading, processed_imgs[i])
+        add_timing(timings, 'clean', time.perf_counter() - start)
+        
+        return outputs
+    
+    def _accept_reading(self, reading: Tuple[str, float], processed: np.ndarray) -> Optional[Tuple[str, float, np.ndarray]]:
+        """Clean a raw recognizer reading and apply the confidence threshold"""
+        text, confidence = reading
         # #region agent log
         _log("alpr_engine.py:read_plate_text:6", "Best OCR result", {"raw_text": text, "confidence": confidence}, "M")
         # #endregion
@@ -336,64 +667,101 @@ class ALPREngine:
         
         return text
     
-    def process_frame(self, frame: np.ndarray) -> Optional[dict]:
+    def process_frame(self, frame: np.ndarray, region: Optional[DetectionRegion] = None) -> List[dict]:
         """
-        Complete ALPR pipeline: detect plate and read text
-        Returns: dict with plate info or None
+        Complete ALPR pipeline: detect every plate and read its text
+        region defaults to the engine's ROI and detection width
+        Returns: list of dicts with plate info (empty if nothing was read);
+                 'timings' holds the seconds spent per stage on this frame
         """
+        timings = {}
         # #region agent log
         _log("alpr_engine.py:process_frame:1", "process_frame() called", {"frame_shape": frame.shape if frame is not None else None}, "M")
         # #endregion
         
-        # Detect plate
-        detection = self.detect_plate(frame)
+        # Detect plates
+        detections = self.detect_plates(frame, timings, region)
         # #region agent log
-        _log("alpr_engine.py:process_frame:2", "After detect_plate()", {"detection_is_none": detection is None}, "M")
+        _log("alpr_engine.py:process_frame:2", "After detect_plates()", {"detection_count": len(detections)}, "M")
         # #endregion
-        if detection is None:
-            return None
+        if not detections:
+            return []
         
-        plate_img, det_confidence = detection
+        # Read text of all plates in one OCR call
+        ocr_results = self.read_plate_texts([plate_img for plate_img, _, _ in detections], timings)
         # #region agent log
-        _log("alpr_engine.py:process_frame:3", "Plate detected", {"det_confidence": det_confidence, "plate_img_shape": plate_img.shape if plate_img is not None else None}, "M")
+        _log("alpr_engine.py:process_frame:5", "After read_plate_texts()", {"ocr_success_count": sum(r is not None for r in ocr_results)}, "M")
         # #endregion
         
-        # Read text
-        # #region agent log
-        _log("alpr_engine.py:process_frame:4", "Before read_plate_text()", {}, "M")
-        # #endregion
-        ocr_result = self.read_plate_text(plate_img)
-        # #region agent log
-        _log("alpr_engine.py:process_frame:5", "After read_plate_text()", {"ocr_result_is_none": ocr_result is None}, "M")
-        # #endregion
-        if ocr_result is None:
-            return None
-        
+        results = [
+            self._build_result(plate_img, det_confidence, ocr_result, bbox)
+            for (plate_img, det_confidence, bbox), ocr_result in zip(detections, ocr_results)
+            if ocr_result is not None
+        ]
+        for result in results:
+            result['timings'] = dict(timings)
+        return results
+    
+    def process_batch(self, frames: List[np.ndarray]) -> List[List[dict]]:
+        """
+        Batched ALPR pipeline: one YOLO pass over all frames, then one OCR call
+        over every crop
+        Returns: list of process_frame()-style result lists, one per frame;
+                 'timings' are those of the whole batch
+        """
+        timings = {}
+        detections_per_frame = self.detect_plates_batch(frames, timings)
+        
+        crops = [plate_img for detections in detections_per_frame for plate_img, _, _ in detections]
+        ocr_results = iter(self.read_plate_texts(crops, timings)) if crops else iter(())
+        
+        results = []
+        for detections in detections_per_frame:
+            frame_results = []
+            for plate_img, det_confidence, bbox in detections:
+                ocr_result = next(ocr_results)
+                if ocr_result is not None:
+                    result = self._build_result(plate_img, det_confidence, ocr_result, bbox)
+                    result['timings'] = dict(timings)
+                    frame_results.append(result)
+            results.append(frame_results)
+        
+        return results
+    
+    def _build_result(self, plate_img: np.ndarray, det_confidence: float,
+                      ocr_result: Tuple[str, float, np.ndarray],
+                      bbox: Optional[Tuple[int, int, int, int]] = None) -> dict:
+        """Combine detection and OCR output into the result dict"""
         plate_text, ocr_confidence, preprocessed_img = ocr_result
-        # #region agent log
-        _log("alpr_engine.py:process_frame:6", "OCR succeeded", {"plate_text": plate_text, "ocr_confidence": ocr_confidence}, "M")
-        # #endregion
         
         # Combined confidence
         combined_confidence = (det_confidence + ocr_confidence) / 2
         
-        # #region agent log
-        _log("alpr_engine.py:process_frame:7", "Returning result", {"plate_number": plate_text, "combined_confidence": combined_confidence}, "M")
-        # #endregion
-        
         return {
             'plate_number': plate_text,
             'confidence': combined_confidence,
             'detection_confidence': det_confidence,
             'ocr_confidence': ocr_confidence,
+            'bbox': bbox,
             'plate_image': plate_img,
             'preprocessed_image': preprocessed_img
         }
     
+    def close(self):
+        """Shut down the OCR worker processes, if any"""
+        if self.ocr_pool:
+            self.ocr_pool.close()
+            self.ocr_pool = None
+    
     def draw_detection(self, frame: np.ndarray, result: dict) -> np.ndarray:
         """Draw detection results on frame"""
         frame_copy = frame.copy()
         
+        # Outline the plate when its location is known
+        if result.get('bbox') is not None:
+            x1, y1, x2, y2 = result['bbox']
+            cv2.rectangle(frame_copy, (x1, y1), (x2, y2), (0, 255, 0), 2)
+        
         # Add text overlay
         text = f"{result['plate_number']} ({result['confidence']:.2f})"
         cv2.putText(
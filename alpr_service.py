@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+Headless ALPR service
+
+Runs the detection pipeline for unattended lanes without PyQt: the cameras
+of every lane in config.json, one shared ALPREngine and the database are
+wired together, detection never pauses, a plate is only reported again by
+the same lane after a cooldown, and every decision is published as one JSON
+line to all clients connected to a local TCP socket.
+
+Usage:
+    python alpr_service.py [--config config.json] [--host 127.0.0.1] [--port 8765]
+
+Listen with e.g. `nc 127.0.0.1 8765`; send "stats" to get pipeline counters.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import signal
+import socketserver
+import threading
+import time
+from datetime import datetime
+
+import cv2
+
+from alpr_engine import ALPREngine
+from camera_handler import CameraHandler
+from database import DatabaseManager
+from debug_trace import configure_tracing
+from detection_pipeline import Lane, MultiLanePipeline, get_lane_configs
+from logging_config import setup_logging, get_logger
+from plate_tracker import PlateTracker
+from stage_metrics import metrics, stage_timer, start_metrics_server
+
+# Get loggers
+logger = get_logger('app')
+detection_logger = get_logger('detection')
+
+DEFAULT_SERVICE_CONFIG = {
+    'host': '127.0.0.1',        # Local interface only by default
+    'port': 8765,
+    'dedup_seconds': 10.0,      # Same plate is not reported again within this window
+    'save_snapshots': True,
+    'snapshot_dir': 'snapshots'
+}
+
+
+class _SubscriberHandler(socketserver.StreamRequestHandler):
+    """One connected client; receives every event, may send 'stats'"""
+    def setup(self):
+        super().setup()
+        self.write_lock = threading.Lock()
+        self.server.service.add_subscriber(self)
+
+    def handle(self):
+        for line in self.rfile:
+            if line.strip().lower() == b'stats':
+                self.send({'type': 'stats', **self.server.service.get_stats()})
+
+    def finish(self):
+        self.server.service.remove_subscriber(self)
+        super().finish()
+
+    def send(self, message: dict):
+        data = (json.dumps(message, default=str) + "\n").encode('utf-8')
+        with self.write_lock:
+            self.wfile.write(data)
+
+
+class _ResultServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class ALPRService:
+    """Camera + ALPR engine + database running continuously, results published over TCP"""
+    def __init__(self, config_path: str = "config.json", host: str = None, port: int = None):
+        with open(config_path, 'r') as f:
+            self.config = json.load(f)
+
+        self.service_config = dict(DEFAULT_SERVICE_CONFIG)
+        self.service_config.update(self.config.get('service', {}))
+        if host:
+            self.service_config['host'] = host
+        if port:
+            self.service_config['port'] = port
+
+        configure_tracing(self.config.get('debug_trace'))
+        self.lane_configs = get_lane_configs(self.config)
+
+        self.db = DatabaseManager(config_path)
+        # One engine (YOLO model and OCR reader) shared by all lanes
+        self.alpr_engine = ALPREngine(config_path)
+        self.cameras = [CameraHandler(config_path, lane['camera']) for lane in self.lane_configs]
+
+        tracker_config = self.config.get('tracker', {})
+        pipeline_config = self.config.get('pipeline', {})
+        lanes = []
+        for lane_config, camera in zip(self.lane_configs, self.cameras):
+            if not camera.camera_available:
+                logger.error(f"Camera for lane {lane_config['node_id']} not available, skipping lane")
+                continue
+            tracker = PlateTracker(self.alpr_engine, tracker_config) if tracker_config.get('enabled', True) else None
+            region = self.alpr_engine.make_region(lane_config['roi'], lane_config['detect_width'], camera.frame_scale())
+            lanes.append(Lane(lane_config['node_id'], camera, tracker, pipeline_config.get('queue_size', 2), region))
+        self.pipeline = MultiLanePipeline(lanes, self.alpr_engine, self._on_results, pipeline_config)
+
+        self.subscribers = set()
+        self.subscribers_lock = threading.Lock()
+        self.server = None
+
+        self.last_reported = {}     # (node_id, plate) -> monotonic time of its last event
+        self.stats = {'events': 0, 'suppressed': 0, 'allowed': 0, 'denied': 0}
+        self.stop_event = threading.Event()
+
+    def run(self):
+        """Start all stages and block until stop() is called or a signal arrives"""
+        if not self.pipeline.lanes:
+            raise RuntimeError("No camera available")
+
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, lambda *_: self.stop_event.set())
+
+        start_metrics_server(self.config.get('metrics'))
+        self.server = _ResultServer((self.service_config['host'], self.service_config['port']), _SubscriberHandler)
+        self.server.service = self
+        threading.Thread(target=self.server.serve_forever, name="alpr-server", daemon=True).start()
+
+        for lane in self.pipeline.lanes:
+            lane.camera.start()
+        self.pipeline.start()
+        print(f"✓ ALPR service running on {self.service_config['host']}:{self.service_config['port']}")
+        logger.info(f"ALPR service started for lanes {[lane.node_id for lane in self.pipeline.lanes]}")
+
+        try:
+            while not self.stop_event.wait(1.0):
+                pass
+        finally:
+            self.shutdown()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def shutdown(self):
+        self.pipeline.stop()
+        metrics.stop_http_server()
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+        for camera in self.cameras:
+            camera.release()
+        self.alpr_engine.close()
+        self.db.close()
+        logger.info(f"ALPR service stopped: {self.get_stats()}")
+        print("✓ ALPR service stopped")
+
+    def get_stats(self) -> dict:
+        stats = dict(self.stats)
+        stats.update(self.pipeline.get_stats())
+        stats['subscribers'] = len(self.subscribers)
+        stats['stage_latency'] = metrics.snapshot()
+        stats['database'] = self.db.get_stats()
+        flow = self.config.get('flow', {})
+        entry_nodes = [lane['node_id'] for lane in self.lane_configs if lane['role'] == 'entry'] + \
+            ([flow['entry_node']] if flow.get('entry_node') else [])
+        exit_nodes = [lane['node_id'] for lane in self.lane_configs if lane['role'] == 'exit'] + \
+            ([flow['exit_node']] if flow.get('exit_node') else [])
+        try:
+            stats['occupancy'] = self.db.get_occupancy(entry_nodes, exit_nodes)
+        except Exception as e:
+            logger.error(f"Could not read occupancy: {e}")
+        return stats
+
+    def add_subscriber(self, handler):
+        with self.subscribers_lock:
+            self.subscribers.add(handler)
+
+    def remove_subscriber(self, handler):
+        with self.subscribers_lock:
+            self.subscribers.discard(handler)
+
+    def publish(self, message: dict):
+        """Send one event to every connected client, dropping dead connections"""
+        with self.subscribers_lock:
+            subscribers = list(self.subscribers)
+        for handler in subscribers:
+            try:
+                handler.send(message)
+            except OSError:
+                self.remove_subscriber(handler)
+
+    def _on_results(self, results):
+        """Called from the pipeline's OCR stage with the results of one frame"""
+        now = time.monotonic()
+        cooldown = self.service_config['dedup_seconds']
+
+        # Forget plates whose cooldown is over
+        self.last_reported = {key: t for key, t in self.last_reported.items() if now - t < cooldown}
+
+        for result in results:
+            node_id = result['node_id']
+            plate_number = result['plate_number']
+            if (node_id, plate_number) in self.last_reported:
+                self.stats['suppressed'] += 1
+                continue
+            try:
+                event = self._handle_result(result)
+            except Exception as e:
+                logger.error(f"Error handling detection {plate_number}: {e}", exc_info=True)
+                continue
+            # Cooldown applies to the raw reading and the corrected plate
+            self.last_reported[(node_id, plate_number)] = now
+            self.last_reported[(node_id, event['plate_number'])] = now
+            self.publish(event)
+
+    def _handle_result(self, result: dict) -> dict:
+        """Look the plate up, log the decision and build the event"""
+        timings = result.setdefault('timings', {})
+        plate_number = result['plate_number']
+        with stage_timer(timings, 'db_lookup'):
+            vehicle = self.db.get_vehicle(plate_number)
+            if not vehicle:
+                corrected_plate, corrected_vehicle = self.db.find_vehicle_fuzzy(plate_number)
+                if corrected_vehicle:
+                    plate_number, vehicle = corrected_plate, corrected_vehicle
+
+        status = 'ALLOWED' if vehicle else 'DENIED'
+        owner_name = vehicle['owner_name'] if vehicle else None
+
+        image_path = None
+        frame = result.get('frame')
+        if self.service_config['save_snapshots'] and frame is not None:
+            os.makedirs(self.service_config['snapshot_dir'], exist_ok=True)
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+            image_path = os.path.join(self.service_config['snapshot_dir'], f"{plate_number}_{timestamp}.jpg")
+            with stage_timer(timings, 'snapshot_write'):
+                cv2.imwrite(image_path, frame)
+
+        node_id = result['node_id']
+        metrics.observe_timings(node_id, {k: timings[k] for k in ('db_lookup', 'snapshot_write') if k in timings})
+        self.db.log_detection(node_id, plate_number, result['confidence'], status, owner_name, image_path)
+        detection_logger.info(f"Vehicle {status}: {plate_number} - Owner: {owner_name or 'N/A'}")
+
+        self.stats['events'] += 1
+        self.stats['allowed' if vehicle else 'denied'] += 1
+
+        return {
+            'type': 'detection',
+            'node_id': node_id,
+            'plate_number': plate_number,
+            'raw_plate_number': result['plate_number'],
+            'status': status,
+            'owner_name': owner_name,
+            'confidence': result['confidence'],
+            'detection_confidence': result['detection_confidence'],
+            'ocr_confidence': result['ocr_confidence'],
+            'bbox': result.get('bbox'),
+            'track_id': result.get('track_id'),
+            'image_path': image_path,
+            'detected_at': datetime.now().isoformat(),
+            'timings_ms': {stage: round(seconds * 1000.0, 2) for stage, seconds in timings.items()}
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the ALPR pipeline headless and publish results over TCP")
+    parser.add_argument("--config", type=str, default="config.json", help="Path to config.json")
+    parser.add_argument("--host", type=str, default=None, help="Interface to listen on (overrides config)")
+    parser.add_argument("--port", type=int, default=None, help="Port to listen on (overrides config)")
+    args = parser.parse_args()
+
+    setup_logging(args.config)
+    service = ALPRService(args.config, args.host, args.port)
+    service.run()
+
+
+if __name__ == "__main__":
+    # OCR worker processes are spawned; needed for frozen Windows builds
+    multiprocessing.freeze_support()
+    main()
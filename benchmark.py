@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+ALPREngine stage benchmark
+
+Times detect_plate, preprocess_plate, read_plate_text, _clean_plate_text and
+process_frame separately over a fixed corpus (snapshots/*.jpg plus seeded
+synthetic plates from indian_plate_generator) and reports p50/p95/p99
+latency, calls per second and peak RSS as JSON, so backends and releases can
+be compared.
+
+Detection runs with the 'yolo' section's ROI and detect_width, or with those
+of one lane from the 'cameras' list when --lane is given.
+
+Usage:
+    python benchmark.py --output bench.json
+    python benchmark.py --synthetic 100 --repeat 3 --stages detect_plate,process_frame
+    python benchmark.py --lane GATE_1_IN --stages detect_plate
+"""
+import argparse
+import glob
+import json
+import os
+import platform
+import random
+import sys
+import time
+from datetime import datetime
+
+import cv2
+import numpy as np
+
+# Ensure package is in path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from alpr_engine import ALPREngine
+from detection_pipeline import get_lane_configs
+
+STAGES = ['detect_plate', 'preprocess_plate', 'read_plate_text', '_clean_plate_text', 'process_frame']
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB, or None if unavailable"""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports KB, macOS bytes
+        return peak / (1024 * 1024) if platform.system() == 'Darwin' else peak / 1024
+    except ImportError:
+        pass
+    try:
+        import psutil
+        info = psutil.Process().memory_info()
+        return getattr(info, 'peak_wset', info.rss) / (1024 * 1024)
+    except ImportError:
+        return None
+
+
+def load_snapshots(pattern: str):
+    frames = [cv2.imread(path) for path in sorted(glob.glob(pattern))]
+    return [frame for frame in frames if frame is not None]
+
+
+def synthetic_corpus(count: int, seed: int):
+    """
+    Seeded synthetic scenes from indian_plate_generator
+    Returns: (scenes, plate_crops, plate_texts)
+    """
+    if count <= 0:
+        return [], [], []
+    from indian_plate_generator.plate_renderer import PlateRenderer
+    from indian_plate_generator.superimpose import create_random_background, superimpose
+    from indian_plate_generator.text_generator import generate_random_plate
+
+    random.seed(seed)
+    np.random.seed(seed)
+    renderer = PlateRenderer()
+
+    scenes, crops, texts = [], [], []
+    for _ in range(count):
+        data = generate_random_plate()
+        plate_img, _ = renderer.generate_image(data, text_scale=random.uniform(0.85, 1.0))
+        scene, (x, y, w, h) = superimpose(plate_img, create_random_background(1280, 720))
+        scene = cv2.cvtColor(np.array(scene.convert('RGB')), cv2.COLOR_RGB2BGR)
+        scenes.append(scene)
+        crops.append(scene[y:y + h, x:x + w].copy())
+        texts.append(data['text'])
+    return scenes, crops, texts
+
+
+def time_calls(func, inputs: list, repeat: int, warmup: int) -> dict:
+    """Call func on every input repeat times and summarise the latencies"""
+    for item in inputs[:warmup]:
+        func(item)
+
+    latencies = []
+    for _ in range(repeat):
+        for item in inputs:
+            start = time.perf_counter()
+            func(item)
+            latencies.append(time.perf_counter() - start)
+
+    if not latencies:
+        return {'calls': 0}
+    ms = np.array(latencies) * 1000.0
+    total = float(np.sum(latencies))
+    return {
+        'calls': len(latencies),
+        'mean_ms': round(float(np.mean(ms)), 4),
+        'p50_ms': round(float(np.percentile(ms, 50)), 4),
+        'p95_ms': round(float(np.percentile(ms, 95)), 4),
+        'p99_ms': round(float(np.percentile(ms, 99)), 4),
+        'max_ms': round(float(np.max(ms)), 4),
+        'per_second': round(len(latencies) / total, 2) if total > 0 else None
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the ALPREngine stages")
+    parser.add_argument("--config", type=str, default="config.json", help="Path to config.json")
+    parser.add_argument("--snapshots", type=str, default=os.path.join("snapshots", "*.jpg"), help="Snapshot glob")
+    parser.add_argument("--synthetic", type=int, default=50, help="Number of synthetic plates to add")
+    parser.add_argument("--seed", type=int, default=1234, help="Seed for the synthetic plates")
+    parser.add_argument("--repeat", type=int, default=1, help="Passes over the corpus per stage")
+    parser.add_argument("--warmup", type=int, default=3, help="Untimed calls before each stage")
+    parser.add_argument("--stages", type=str, default=",".join(STAGES), help="Comma-separated stages to run")
+    parser.add_argument("--lane", type=str, default=None,
+                        help="Use the ROI and detect_width of this node_id from the 'cameras' list")
+    parser.add_argument("--output", type=str, default=None, help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    stages = [s.strip() for s in args.stages.split(',') if s.strip()]
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        parser.error(f"Unknown stages: {', '.join(sorted(unknown))}")
+
+    lane = None
+    if args.lane:
+        with open(args.config, 'r') as f:
+            lanes = {lane['node_id']: lane for lane in get_lane_configs(json.load(f))}
+        if args.lane not in lanes:
+            parser.error(f"Unknown lane {args.lane}; configured: {', '.join(sorted(lanes))}")
+        lane = lanes[args.lane]
+
+    load_start = time.perf_counter()
+    engine = ALPREngine(args.config)
+    load_seconds = time.perf_counter() - load_start
+    # Corpus images are full resolution, so the ROI is not scaled to decode_width
+    region = engine.make_region(lane['roi'], lane['detect_width']) if lane else engine.region
+
+    snapshots = load_snapshots(args.snapshots)
+    scenes, synthetic_crops, synthetic_texts = synthetic_corpus(args.synthetic, args.seed)
+    frames = snapshots + scenes
+    if not frames:
+        print("[ERROR] Empty corpus: no snapshots found and --synthetic is 0")
+        return 1
+
+    # Plate crops: what the detector finds in the snapshots plus the synthetic plate boxes
+    crops = [plate for plate, _ in filter(None, (engine.detect_plate(frame, region) for frame in snapshots))]
+    crops += synthetic_crops
+
+    # Raw OCR strings for the text cleaner: real readings plus the rendered plate texts
+    raw_texts = list(synthetic_texts)
+    if '_clean_plate_text' in stages and engine.recognizer:
+        for crop in crops:
+            processed = engine.preprocess_plate(crop)
+            reading = engine.recognizer.recognize([processed if engine.recognizer.uses_preprocessed else crop])[0]
+            if reading:
+                raw_texts.append(reading[0])
+
+    print(f"Corpus: {len(snapshots)} snapshots, {len(scenes)} synthetic scenes, "
+          f"{len(crops)} plate crops, {len(raw_texts)} raw texts")
+
+    stage_inputs = {
+        'detect_plate': (lambda frame: engine.detect_plate(frame, region), frames),
+        'preprocess_plate': (engine.preprocess_plate, crops),
+        'read_plate_text': (engine.read_plate_text, crops),
+        '_clean_plate_text': (engine._clean_plate_text, raw_texts),
+        'process_frame': (lambda frame: engine.process_frame(frame, region), frames)
+    }
+
+    report = {
+        'timestamp': datetime.now().isoformat(),
+        'platform': platform.platform(),
+        'python': platform.python_version(),
+        'config': {
+            'detector': engine.yolo_config.get('backend', 'ultralytics'),
+            'device': engine.yolo_config.get('device'),
+            'lane': args.lane,
+            'detect_width': region.detect_width,
+            'roi': region.polygon.tolist() if region.polygon is not None else None,
+            'ocr': engine.ocr_config.get('backend', 'easyocr'),
+            'ocr_workers': engine.ocr_config.get('workers', 0)
+        },
+        'corpus': {
+            'snapshots': len(snapshots),
+            'synthetic': len(scenes),
+            'plate_crops': len(crops),
+            'raw_texts': len(raw_texts),
+            'seed': args.seed
+        },
+        'model_load_seconds': round(load_seconds, 3),
+        'stages': {}
+    }
+
+    for stage in stages:
+        func, inputs = stage_inputs[stage]
+        print(f"Timing {stage} ({len(inputs)} inputs x {args.repeat})...")
+        report['stages'][stage] = time_calls(func, inputs, args.repeat, args.warmup)
+        summary = report['stages'][stage]
+        if summary['calls']:
+            print(f"  p50 {summary['p50_ms']:.2f} ms, p95 {summary['p95_ms']:.2f} ms, "
+                  f"p99 {summary['p99_ms']:.2f} ms, {summary['per_second']:.1f}/s")
+
+    # Frames per second of the whole pipeline
+    if 'process_frame' in report['stages'] and report['stages']['process_frame']['calls']:
+        report['fps'] = report['stages']['process_frame']['per_second']
+    peak = peak_rss_mb()
+    report['peak_rss_mb'] = round(peak, 1) if peak is not None else None
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + "\n")
+        print(f"✓ Report written to {args.output}")
+    else:
+        print(output)
+
+    engine.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,29 +1,57 @@
 import cv2
 import numpy as np
+from collections import namedtuple
 from typing import Optional, Tuple
 import json
-from threading import Thread, Lock
+from threading import Thread, Lock, Event
 import time
 import os
+import platform
+import sys
+from debug_trace import trace as _log
 from logging_config import get_logger
 
 # Get logger
 logger = get_logger('app')
 
-# #region agent log
-LOG_PATH = r"c:\Users\maazs\Documents\Projects\ALPR_TollPlaza_System\.cursor\debug.log"
-def _log(location, message, data=None, hypothesisId=None):
-    try:
-        import json as _json
-        log_entry = {"sessionId": "debug-session", "runId": "run1", "location": location, "message": message, "data": data or {}, "timestamp": int(__import__("time").time() * 1000)}
-        if hypothesisId: log_entry["hypothesisId"] = hypothesisId
-        with open(LOG_PATH, "a", encoding="utf-8") as f: f.write(_json.dumps(log_entry) + "\n")
-    except: pass
-# #endregion
+
+# A captured frame with its sequence number and time.monotonic() capture time
+FramePacket = namedtuple('FramePacket', ['frame', 'seq', 'timestamp'])
+
+# References to an unused ring buffer: the ring list and getrefcount's argument
+_FREE_REFCOUNT = 2
+
+# OpenCV capture APIs selectable with camera.backend
+CAPTURE_BACKENDS = {
+    'auto': cv2.CAP_ANY,
+    'ffmpeg': cv2.CAP_FFMPEG,
+    'gstreamer': cv2.CAP_GSTREAMER,
+    'dshow': cv2.CAP_DSHOW,
+    'msmf': cv2.CAP_MSMF,
+    'v4l2': cv2.CAP_V4L2
+}
+
+# Hardware decode types for camera.hw_accel (OpenCV >= 4.5.2, FFmpeg/MSMF backends)
+HW_ACCELERATION = {
+    'any': 'VIDEO_ACCELERATION_ANY',
+    'd3d11': 'VIDEO_ACCELERATION_D3D11',
+    'vaapi': 'VIDEO_ACCELERATION_VAAPI',
+    'mfx': 'VIDEO_ACCELERATION_MFX'
+}
+
+# Low-latency demuxer options for network streams opened through FFmpeg
+DEFAULT_FFMPEG_OPTIONS = "rtsp_transport;tcp|fflags;nobuffer|flags;low_delay|max_delay;500000"
+
+# OPENCV_FFMPEG_CAPTURE_OPTIONS is process-wide; lanes open their streams one at a time
+_ffmpeg_env_lock = Lock()
+
 
 class CameraHandler:
-    def __init__(self, config_path: str = "config.json"):
-        """Initialize camera handler"""
+    def __init__(self, config_path: str = "config.json", camera_config: Optional[dict] = None):
+        """
+        Initialize camera handler
+        camera_config overrides the 'camera' section, e.g. for one entry of 'cameras'
+        """
         logger.info("Initializing Camera Handler")
         # #region agent log
         _log("camera_handler.py:11", "Loading config for camera", {"config_path": config_path}, "A")
@@ -50,14 +78,51 @@ class CameraHandler:
             # #endregion
             raise
         
-        self.camera_config = config['camera']
+        self.camera_config = camera_config if camera_config is not None else config['camera']
         self.camera_source = self.camera_config['source']
+        # "0" in config.json means device 0, not a file called 0
+        if isinstance(self.camera_source, str) and self.camera_source.isdigit():
+            self.camera_source = int(self.camera_source)
         self.width = self.camera_config['width']
         self.height = self.camera_config['height']
         self.fps = self.camera_config['fps']
         
+        # Stream decoding: capture API, hardware decode, reduced decode width
+        self.backend = self.camera_config.get('backend', 'auto')
+        self.hw_accel = self.camera_config.get('hw_accel', 'none')
+        self.ffmpeg_options = self.camera_config.get('ffmpeg_options', DEFAULT_FFMPEG_OPTIONS)
+        self.decode_width = int(self.camera_config.get('decode_width') or 0)
+        self.gst_latency = int(self.camera_config.get('gst_latency', 0))
+        # Files: replay at their own frame rate and optionally loop
+        self.realtime = self.camera_config.get('realtime', True)
+        self.loop = self.camera_config.get('loop', False)
+        # Reconnect delays for network cameras, doubled after every failed attempt
+        self.reconnect_delay = float(self.camera_config.get('reconnect_delay', 1.0))
+        self.reconnect_max_delay = float(self.camera_config.get('reconnect_max_delay', 30.0))
+        self.max_grab_failures = int(self.camera_config.get('max_grab_failures', 25))
+        
+        self.source_type = self._source_type(self.camera_source)
+        self._decode_buffer = None
+        self._stop_event = Event()
+        
+        # Preallocated frame buffers; consumers get read-only views, and a
+        # buffer is only reused once no view of it is alive any more
+        self._ring = [None] * max(2, int(self.camera_config.get('ring_size', 4)))
+        self._slot = -1
+        
         self.cap = None
         self.frame = None
+        self.frame_seq = 0
+        self.frame_time = None
+        self.frame_consumed = True
+        self.stats = {
+            'captured': 0,          # Frames grabbed and decoded
+            'overwritten': 0,       # Frames replaced before anyone read them (dropped)
+            'duplicates': 0,        # Reads that found no newer frame
+            'grab_failures': 0,
+            'ring_reallocs': 0,     # Buffers replaced because consumers still held all of them
+            'reconnects': 0
+        }
         self.running = False
         self.lock = Lock()
         self.thread = None
@@ -72,15 +137,7 @@ class CameraHandler:
         _log("camera_handler.py:init_cam:1", "Before cv2.VideoCapture()", {"camera_source": self.camera_source, "camera_source_type": type(self.camera_source).__name__}, "G")
         # #endregion
         try:
-            # On Windows, use CAP_DSHOW backend for faster initialization
-            import platform
-            if platform.system() == 'Windows':
-                # #region agent log
-                _log("camera_handler.py:init_cam:1.5", "Using CAP_DSHOW backend on Windows", {}, "L")
-                # #endregion
-                self.cap = cv2.VideoCapture(self.camera_source, cv2.CAP_DSHOW)
-            else:
-                self.cap = cv2.VideoCapture(self.camera_source)
+            self.cap = self._open_capture()
             # #region agent log
             _log("camera_handler.py:init_cam:2", "After cv2.VideoCapture()", {"cap_is_none": self.cap is None, "cap_is_opened": self.cap.isOpened() if self.cap else False}, "G")
             # #endregion
@@ -95,17 +152,15 @@ class CameraHandler:
             _log("camera_handler.py:init_cam:4", "Before setting camera properties", {}, "H")
             # #endregion
             
-            # Set camera properties
-            self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
-            self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
-            self.cap.set(cv2.CAP_PROP_FPS, self.fps)
+            self._configure_capture()
             
             # #region agent log
             _log("camera_handler.py:init_cam:5", "After setting camera properties", {}, "H")
             # #endregion
             
             self.camera_available = True
-            logger.info(f"Camera initialized successfully: {self.width}x{self.height} @ {self.fps}fps")
+            logger.info(f"Camera initialized successfully ({self.source_type}, backend {self.cap.getBackendName()}): "
+                        f"{self.width}x{self.height} @ {self.fps}fps")
             # #region agent log
             _log("camera_handler.py:init_cam:6", "Camera initialized successfully", {"width": self.width, "height": self.height, "fps": self.fps}, "G")
             # #endregion
@@ -124,6 +179,117 @@ class CameraHandler:
                 self.cap.release()
                 self.cap = None
     
+    @staticmethod
+    def _source_type(source) -> str:
+        """'device', 'stream' (RTSP/HTTP), 'gstreamer' (pipeline string) or 'file'"""
+        if isinstance(source, int):
+            return 'device'
+        if '!' in source:
+            return 'gstreamer'
+        if source.lower().startswith(('rtsp://', 'rtsps://', 'rtmp://', 'http://', 'https://', 'udp://', 'tcp://')):
+            return 'stream'
+        return 'file'
+    
+    def _open_capture(self) -> cv2.VideoCapture:
+        """Open the source with the configured capture backend"""
+        backend = self.backend
+        if backend == 'auto':
+            if self.source_type == 'device' and platform.system() == 'Windows':
+                # DirectShow initializes USB cameras much faster on Windows
+                backend = 'dshow'
+            elif self.source_type == 'gstreamer':
+                backend = 'gstreamer'
+            elif self.source_type in ('stream', 'file'):
+                backend = 'ffmpeg'
+        api = CAPTURE_BACKENDS[backend]
+        
+        source = self.camera_source
+        if backend == 'gstreamer' and self.source_type != 'gstreamer':
+            source = self._gstreamer_pipeline()
+        
+        params = []
+        accel = HW_ACCELERATION.get(self.hw_accel)
+        if accel and hasattr(cv2, accel) and backend in ('ffmpeg', 'msmf'):
+            params = [cv2.CAP_PROP_HW_ACCELERATION, getattr(cv2, accel)]
+        
+        logger.info(f"Opening {self.source_type} source with {backend} backend"
+                    f"{' (hw accel ' + self.hw_accel + ')' if params else ''}")
+        if backend == 'ffmpeg' and self.source_type == 'stream' and self.ffmpeg_options:
+            with _ffmpeg_env_lock:
+                previous = os.environ.get('OPENCV_FFMPEG_CAPTURE_OPTIONS')
+                os.environ['OPENCV_FFMPEG_CAPTURE_OPTIONS'] = self.ffmpeg_options
+                try:
+                    return self._video_capture(source, api, params)
+                finally:
+                    if previous is None:
+                        os.environ.pop('OPENCV_FFMPEG_CAPTURE_OPTIONS', None)
+                    else:
+                        os.environ['OPENCV_FFMPEG_CAPTURE_OPTIONS'] = previous
+        return self._video_capture(source, api, params)
+    
+    @staticmethod
+    def _video_capture(source, api: int, params: list) -> cv2.VideoCapture:
+        # The params overload only exists from OpenCV 4.5.2 on
+        return cv2.VideoCapture(source, api, params) if params else cv2.VideoCapture(source, api)
+    
+    def _gstreamer_pipeline(self) -> str:
+        """
+        Low-latency GStreamer pipeline for a URL, file or device
+        decodebin picks a hardware decoder (VA-API, NVDEC, ...) when one is
+        installed; with decode_width the scaling happens inside the pipeline.
+        """
+        if self.source_type == 'stream' and self.camera_source.lower().startswith('rtsp'):
+            src = f"rtspsrc location={self.camera_source} latency={self.gst_latency} ! decodebin"
+        elif self.source_type == 'stream':
+            src = f"souphttpsrc location={self.camera_source} is-live=true ! decodebin"
+        elif self.source_type == 'device':
+            src = f"v4l2src device=/dev/video{self.camera_source} ! decodebin"
+        else:
+            src = f"filesrc location={self.camera_source} ! decodebin"
+        
+        caps = "video/x-raw,format=BGR"
+        if self.decode_width:
+            height = int(round(self.decode_width * self.height / self.width)) if self.width else 0
+            caps += f",width={self.decode_width}" + (f",height={height}" if height else "")
+        return f"{src} ! videoconvert ! videoscale ! {caps} ! appsink drop=true max-buffers=1 sync=false"
+    
+    def _configure_capture(self):
+        """Set capture properties after opening"""
+        if self.source_type == 'device':
+            self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
+            self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
+            self.cap.set(cv2.CAP_PROP_FPS, self.fps)
+        elif self.source_type == 'file':
+            # Replay files at their recorded rate
+            self.fps = self.cap.get(cv2.CAP_PROP_FPS) or self.fps
+        # Keep the driver queue short; not every backend honours this
+        self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+    
+    def _reconnect(self) -> bool:
+        """Reopen a lost source, backing off exponentially between attempts"""
+        delay = self.reconnect_delay
+        while self.running:
+            if self.cap:
+                self.cap.release()
+                self.cap = None
+            logger.warning(f"Camera {self.camera_source} lost, reconnecting in {delay:.1f}s")
+            if self._stop_event.wait(delay):
+                return False
+            try:
+                cap = self._open_capture()
+                if cap.isOpened():
+                    self.cap = cap
+                    self._configure_capture()
+                    self.stats['reconnects'] += 1
+                    logger.info(f"Camera {self.camera_source} reconnected")
+                    print(f"✓ Camera reconnected: {self.camera_source}")
+                    return True
+                cap.release()
+            except Exception as e:
+                logger.error(f"Camera reconnect failed: {e}")
+            delay = min(delay * 2, self.reconnect_max_delay)
+        return False
+    
     def start(self):
         """Start camera capture thread"""
         if not self.camera_available:
@@ -134,26 +300,151 @@ class CameraHandler:
             return
         
         self.running = True
+        self._stop_event.clear()
         self.thread = Thread(target=self._capture_loop, daemon=True)
         self.thread.start()
         print("✓ Camera capture started")
     
     def _capture_loop(self):
-        """Continuous frame capture loop"""
+        """
+        Continuous frame capture loop
+        grab() blocks until the driver has a frame, so the loop runs at the
+        camera's own rate without sleeping and the driver buffer never fills
+        up with stale frames. Each frame gets a sequence number and a
+        time.monotonic() capture stamp.
+        Network sources are reopened with backoff after repeated failures;
+        files are paced at their frame rate and stop (or loop) at the end.
+        """
         if not self.cap or not self.camera_available:
             return
+        failures = 0
+        file_start, file_frames = time.monotonic(), 0
         while self.running:
-            if self.cap:
-                ret, frame = self.cap.read()
-                if ret:
-                    with self.lock:
-                        self.frame = frame
-                time.sleep(1 / self.fps)
-            else:
+            if not self.cap:
                 break
+            if not self.cap.grab():
+                self.stats['grab_failures'] += 1
+                failures += 1
+                if self.source_type == 'file':
+                    if not self.loop:
+                        logger.info(f"End of video file: {self.camera_source}")
+                        self.camera_available = False
+                        break
+                    self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                    file_start, file_frames = time.monotonic(), 0
+                elif failures >= self.max_grab_failures:
+                    if not self._reconnect():
+                        break
+                    failures = 0
+                else:
+                    time.sleep(0.01)
+                continue
+            failures = 0
+            
+            if self.source_type == 'file' and self.realtime and self.fps:
+                file_frames += 1
+                wait = file_start + file_frames / self.fps - time.monotonic()
+                if wait > 0:
+                    time.sleep(wait)
+            captured_at = time.monotonic()
+            
+            # Decode straight into a free ring buffer
+            slot = self._next_slot()
+            frame = self._retrieve(slot)
+            if frame is None:
+                self.stats['grab_failures'] += 1
+                continue
+            
+            with self.lock:
+                if not self.frame_consumed:
+                    self.stats['overwritten'] += 1
+                self.frame = frame
+                self._slot = slot
+                self.frame_seq += 1
+                self.frame_time = captured_at
+                self.frame_consumed = False
+            self.stats['captured'] += 1
+    
+    def _retrieve(self, slot: int) -> Optional[np.ndarray]:
+        """Decode the grabbed frame into ring slot, scaled down to decode_width if set"""
+        if not self.decode_width:
+            ret, frame = self.cap.retrieve(self._ring[slot])
+            if not ret:
+                return None
+        else:
+            ret, self._decode_buffer = self.cap.retrieve(self._decode_buffer)
+            if not ret:
+                return None
+            frame = self._decode_buffer
+            if frame.shape[1] <= self.decode_width:
+                # Already small enough, e.g. scaled inside a GStreamer pipeline
+                logger.info(f"Source is {frame.shape[1]}px wide, no decode scaling needed")
+                self.decode_width = 0
+                self._decode_buffer = None
+            else:
+                height = max(1, int(round(frame.shape[0] * self.decode_width / frame.shape[1])))
+                buffer = self._ring[slot]
+                if buffer is None or buffer.shape[:2] != (height, self.decode_width):
+                    buffer = None
+                frame = cv2.resize(frame, (self.decode_width, height), dst=buffer, interpolation=cv2.INTER_AREA)
+        # OpenCV allocates a new array on the first frame or a size change
+        self._ring[slot] = frame
+        return frame
+    
+    def frame_scale(self) -> float:
+        """
+        Factor from full-resolution (configured width) pixel coordinates to the
+        frames this camera delivers; below 1.0 only with decode_width
+        """
+        # The configured value: _retrieve() clears self.decode_width once the
+        # decoder (e.g. a GStreamer pipeline) already delivers scaled frames
+        decode_width = int(self.camera_config.get('decode_width') or 0)
+        if decode_width and self.width and decode_width < self.width:
+            return decode_width / self.width
+        return 1.0
+    
+    def _next_slot(self) -> int:
+        """Index of a ring buffer nobody holds a view of; never the current frame's"""
+        for step in range(1, len(self._ring)):
+            slot = (self._slot + step) % len(self._ring)
+            if self._ring[slot] is None or sys.getrefcount(self._ring[slot]) <= _FREE_REFCOUNT:
+                return slot
+        # Every other buffer is still in use; leave it to its holders and allocate afresh
+        slot = (self._slot + 1) % len(self._ring)
+        self._ring[slot] = None
+        self.stats['ring_reallocs'] += 1
+        return slot
+    
+    def _frame_view(self) -> np.ndarray:
+        """Read-only view of the current frame; keeps its buffer from being reused"""
+        view = self.frame.view()
+        view.flags.writeable = False
+        return view
+    
+    def get_frame_packet(self, after_seq: int = 0) -> Optional[FramePacket]:
+        """
+        Get the latest frame with its sequence number and capture time
+        Returns: FramePacket, or None if there is no frame newer than after_seq
+        """
+        with self.lock:
+            if self.frame is None:
+                return None
+            if self.frame_seq <= after_seq:
+                self.stats['duplicates'] += 1
+                return None
+            self.frame_consumed = True
+            return FramePacket(self._frame_view(), self.frame_seq, self.frame_time)
+    
+    def get_stats(self) -> dict:
+        """Capture counters plus the age of the newest frame"""
+        stats = dict(self.stats)
+        with self.lock:
+            stats['frame_seq'] = self.frame_seq
+            stats['frame_age'] = time.monotonic() - self.frame_time if self.frame_time else None
+        return stats
     
     def get_frame(self) -> Optional[np.ndarray]:
-        """Get the latest frame"""
+        """Get the latest frame as a read-only view (copy it before drawing on it)"""
         # #region agent log
         _log("camera_handler.py:70", "Before get_frame", {"frame_is_none": self.frame is None}, "D")
         # #endregion
@@ -164,14 +455,15 @@ class CameraHandler:
                 # #endregion
                 return None
             try:
-                result = self.frame.copy()
+                self.frame_consumed = True
+                result = self._frame_view()
                 # #region agent log
-                _log("camera_handler.py:70", "Frame copied successfully", {"result_shape": result.shape if result is not None else None}, "D")
+                _log("camera_handler.py:70", "Frame view created", {"result_shape": result.shape if result is not None else None}, "D")
                 # #endregion
                 return result
             except AttributeError as e:
                 # #region agent log
-                _log("camera_handler.py:70", "Frame copy failed", {"error": str(e), "frame_type": type(self.frame).__name__}, "D")
+                _log("camera_handler.py:70", "Frame view failed", {"error": str(e), "frame_type": type(self.frame).__name__}, "D")
                 # #endregion
                 return None
     
@@ -183,6 +475,7 @@ class CameraHandler:
     def stop(self):
         """Stop camera capture"""
         self.running = False
+        self._stop_event.set()
         if self.thread:
             self.thread.join()
         print("✓ Camera capture stopped")
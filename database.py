@@ -1,10 +1,15 @@
 import psycopg2
-from psycopg2.extras import RealDictCursor
+from psycopg2.extras import RealDictCursor, execute_values
+from psycopg2.pool import ThreadedConnectionPool, PoolError
 from datetime import datetime
 import json
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, Tuple
 import os
+import queue
+import select
 import threading
+import time
+from debug_trace import trace as _log
 from logging_config import get_logger
 
 # Get loggers
@@ -12,16 +17,295 @@ logger = get_logger('app')
 detection_logger = get_logger('detection')
 error_logger = get_logger('error')
 
-# #region agent log
-LOG_PATH = r"c:\Users\maazs\Documents\Projects\ALPR_TollPlaza_System\.cursor\debug.log"
-def _log(location, message, data=None, hypothesisId=None):
-    try:
-        import json as _json
-        log_entry = {"sessionId": "debug-session", "runId": "run1", "location": location, "message": message, "data": data or {}, "timestamp": int(__import__("time").time() * 1000)}
-        if hypothesisId: log_entry["hypothesisId"] = hypothesisId
-        with open(LOG_PATH, "a", encoding="utf-8") as f: f.write(_json.dumps(log_entry) + "\n")
-    except: pass
-# #endregion
+DEFAULT_POOL_CONFIG = {
+    'read_pool_size': 4,        # Lookups, history and dashboard queries
+    'write_pool_size': 2,       # Detection inserts and vehicle edits
+    'pool_timeout': 10.0,       # Seconds to wait for a free connection
+    'read_host': None,          # Optional replica for the read pool
+    'connect_timeout': 5,       # Seconds to establish a connection
+    'keepalives_idle': 30       # TCP keepalive so dead server connections are noticed while idle
+}
+
+# Errors that mean the connection itself is gone
+CONNECTION_ERRORS = (psycopg2.OperationalError, psycopg2.InterfaceError)
+
+DEFAULT_WRITER_CONFIG = {
+    'write_batch_size': 100,            # detection_history rows per INSERT
+    'write_flush_interval': 0.5,        # Seconds a queued detection waits for company
+    'spool_path': os.path.join("logs", "detection_spool.jsonl"),
+    'spool_retry': 5.0                  # Seconds between attempts to replay the spool
+}
+
+# detection_history columns written by DetectionWriter, in INSERT order
+DETECTION_FIELDS = ('node_id', 'plate_number', 'detected_at', 'confidence', 'status', 'owner_name', 'image_path')
+
+# Channel the vehicles trigger notifies on
+VEHICLE_CHANNEL = "vehicles_changed"
+
+DEFAULT_CACHE_CONFIG = {
+    'vehicle_cache': True,      # Answer get_vehicle from memory
+    'cache_ttl': 300.0,         # Full reload interval, also covers missed notifications
+    'listen_retry': 5.0         # Seconds between LISTEN reconnect attempts
+}
+
+# Trigger that reports every change to the vehicles table as {"op", "plate", "old_plate"}
+VEHICLE_NOTIFY_SQL = """
+    CREATE OR REPLACE FUNCTION notify_vehicle_change() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP = 'DELETE' THEN
+            PERFORM pg_notify('vehicles_changed', json_build_object(
+                'op', TG_OP, 'plate', OLD.plate_number, 'old_plate', OLD.plate_number)::text);
+            RETURN OLD;
+        ELSIF TG_OP = 'UPDATE' THEN
+            PERFORM pg_notify('vehicles_changed', json_build_object(
+                'op', TG_OP, 'plate', NEW.plate_number, 'old_plate', OLD.plate_number)::text);
+        ELSE
+            PERFORM pg_notify('vehicles_changed', json_build_object(
+                'op', TG_OP, 'plate', NEW.plate_number, 'old_plate', NULL)::text);
+        END IF;
+        RETURN NEW;
+    END;
+    $$ LANGUAGE plpgsql
+"""
+
+
+# Trigger keeping daily_node_counters in step with detection_history
+DETECTION_COUNTER_SQL = """
+    CREATE OR REPLACE FUNCTION count_detection() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP IN ('DELETE', 'UPDATE') THEN
+            UPDATE daily_node_counters
+            SET allowed = allowed - (OLD.status = 'ALLOWED')::int,
+                denied = denied - (OLD.status = 'DENIED')::int,
+                total = total - 1
+            WHERE day = OLD.detected_at::date AND node_id = OLD.node_id;
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            INSERT INTO daily_node_counters AS c (day, node_id, allowed, denied, total)
+            VALUES (NEW.detected_at::date, NEW.node_id,
+                    (NEW.status = 'ALLOWED')::int, (NEW.status = 'DENIED')::int, 1)
+            ON CONFLICT (day, node_id) DO UPDATE
+            SET allowed = c.allowed + EXCLUDED.allowed,
+                denied = c.denied + EXCLUDED.denied,
+                total = c.total + 1;
+        END IF;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+"""
+
+
+def occupancy_from_counters(by_node: Dict, entry_nodes, exit_nodes) -> Dict:
+    """
+    Entry/exit flow from one day's per-node counters (only ALLOWED passages count)
+    Returns: {'entries', 'exits', 'inside'}
+    """
+    entries = sum(by_node.get(node, {}).get('allowed', 0) for node in set(entry_nodes))
+    exits = sum(by_node.get(node, {}).get('allowed', 0) for node in set(exit_nodes))
+    return {'entries': entries, 'exits': exits, 'inside': max(0, entries - exits)}
+
+
+class BlockingConnectionPool(ThreadedConnectionPool):
+    """ThreadedConnectionPool that waits for a free connection instead of raising PoolError"""
+    def __init__(self, minconn, maxconn, timeout=None, *args, **kwargs):
+        self.slots = threading.BoundedSemaphore(maxconn)
+        self.timeout = timeout
+        super().__init__(minconn, maxconn, *args, **kwargs)
+    
+    def discard_idle(self):
+        """Close every idle connection, e.g. after the server restarted"""
+        with self._lock:
+            for conn in self._pool:
+                conn.close()
+            self._pool.clear()
+    
+    def getconn(self, key=None):
+        if not self.slots.acquire(timeout=self.timeout):
+            raise PoolError("timed out waiting for a database connection")
+        try:
+            return super().getconn(key)
+        except Exception:
+            self.slots.release()
+            raise
+    
+    def putconn(self, conn, key=None, close=False):
+        # A rejected connection (unknown or already returned) never held a slot
+        super().putconn(conn, key, close)
+        self.slots.release()
+
+
+class DetectionWriter:
+    """
+    Write-behind queue for detection_history
+    
+    log_detection() only enqueues. One thread inserts queued detections in
+    batches with execute_values. While the database is unreachable, batches
+    are appended to a local JSON-lines spool. The spool is replayed once
+    inserts succeed again, including on the next start.
+    """
+    def __init__(self, db, config: dict):
+        self.db = db
+        self.batch_size = config['write_batch_size']
+        self.flush_interval = config['write_flush_interval']
+        self.spool_path = config['spool_path']
+        self.spool_retry = config['spool_retry']
+        
+        self.queue = queue.Queue()
+        self.stop_event = threading.Event()
+        self.next_replay = 0.0
+        self.stats = {'queued': 0, 'written': 0, 'spooled': 0, 'replayed': 0, 'dropped': 0}
+        
+        self.thread = threading.Thread(target=self._writer_loop, name="alpr-detection-writer", daemon=True)
+        self.thread.start()
+    
+    def put(self, record: dict):
+        self.stats['queued'] += 1
+        self.queue.put(record)
+    
+    def close(self, timeout: float = 30.0):
+        """Write (or spool) everything still queued and stop the thread"""
+        self.stop_event.set()
+        self.thread.join(timeout=timeout)
+    
+    def _writer_loop(self):
+        held = []       # Batch that failed unexpectedly (e.g. spool disk full), retried first
+        while True:
+            batch = held or self._next_batch()
+            held = []
+            try:
+                if batch:
+                    self._write(batch)
+            except Exception as e:
+                held = batch
+                error_logger.error(f"Detection writer failed, retrying {len(batch)} detections: {e}", exc_info=True)
+                self.stop_event.wait(self.spool_retry)
+            try:
+                if self._spool_pending() and time.monotonic() >= self.next_replay:
+                    self._replay_spool()
+            except Exception as e:
+                self.next_replay = time.monotonic() + self.spool_retry
+                error_logger.error(f"Spool replay failed: {e}", exc_info=True)
+            if self.stop_event.is_set() and self.queue.empty() and not held:
+                return
+    
+    def _next_batch(self) -> list:
+        """Wait up to flush_interval for the first record, then take whatever else is queued"""
+        try:
+            batch = [self.queue.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return []
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+    
+    def _insert(self, records: list):
+        rows = [tuple(record.get(field) for field in DETECTION_FIELDS) for record in records]
+        
+        def operation(conn):
+            with conn.cursor() as cur:
+                execute_values(cur, f"""
+                    INSERT INTO detection_history ({', '.join(DETECTION_FIELDS)})
+                    VALUES %s
+                """, rows, page_size=self.batch_size)
+        self.db._run(operation, write=True)
+    
+    def _insert_or_drop(self, records: list) -> Tuple[int, int, Optional[Exception]]:
+        """
+        Insert records; if the batch is rejected, insert them one by one and drop the bad rows
+        Returns: (done, written, error) - leading records committed or dropped, rows
+                 written among them, and the connection error that stopped it (or None)
+        """
+        try:
+            self._insert(records)
+            return len(records), len(records), None
+        except CONNECTION_ERRORS + (PoolError,) as e:
+            return 0, 0, e
+        except psycopg2.Error as e:
+            if len(records) == 1:
+                self.stats['dropped'] += 1
+                error_logger.error(f"Dropping detection {records[0].get('plate_number')}: {e}")
+                return 1, 0, None
+        
+        # Row by row: a connection error part way leaves the committed prefix done
+        done = written = 0
+        for record in records:
+            _, row_written, error = self._insert_or_drop([record])
+            if error:
+                return done, written, error
+            done += 1
+            written += row_written
+        return done, written, None
+    
+    def _write(self, batch: list):
+        done, written, error = self._insert_or_drop(batch)
+        self.stats['written'] += written
+        for record in batch[:done]:
+            detection_logger.info(
+                f"Detection logged - Plate: {record['plate_number']}, Status: {record['status']}, "
+                f"Confidence: {record['confidence']:.2%}, Owner: {record['owner_name'] or 'N/A'}"
+            )
+        # Trim in place so a retry after a failed _spool() skips the committed rows
+        del batch[:done]
+        if error:
+            self._spool(batch, error)
+            return
+        # The database is reachable again; replay the spool right away
+        self.next_replay = 0.0
+    
+    def _spool_pending(self) -> bool:
+        return os.path.exists(self.spool_path) and os.path.getsize(self.spool_path) > 0
+    
+    def _spool(self, records: list, error: Exception):
+        """Append records to the local spool and fsync it"""
+        os.makedirs(os.path.dirname(self.spool_path) or '.', exist_ok=True)
+        with open(self.spool_path, 'a', encoding='utf-8') as f:
+            for record in records:
+                f.write(json.dumps(record, default=str) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self.stats['spooled'] += len(records)
+        self.next_replay = time.monotonic() + self.spool_retry
+        error_logger.error(f"Database unavailable, spooled {len(records)} detections to {self.spool_path}: {error}")
+        print(f"⚠ Database unavailable, {len(records)} detections spooled to {self.spool_path}")
+    
+    def _replay_spool(self):
+        """Insert spooled detections; whatever cannot be written stays in the spool"""
+        with open(self.spool_path, 'r', encoding='utf-8') as f:
+            records = []
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    # Torn last line from a crash mid-write
+                    self.stats['dropped'] += 1
+        
+        done = 0
+        while done < len(records):
+            chunk_done, written, error = self._insert_or_drop(records[done:done + self.batch_size])
+            self.stats['written'] += written
+            done += chunk_done
+            if error:
+                self.next_replay = time.monotonic() + self.spool_retry
+                break
+        
+        self.stats['replayed'] += done
+        if done == len(records):
+            os.remove(self.spool_path)
+            logger.info(f"Replayed {done} spooled detections")
+            print(f"✓ Replayed {done} spooled detections")
+        elif done:
+            # Keep only the part that is still unwritten
+            tmp_path = self.spool_path + ".tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                for record in records[done:]:
+                    f.write(json.dumps(record, default=str) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.spool_path)
+
 
 class DatabaseManager:
     def __init__(self, config_path: str = "config.json"):
@@ -52,40 +336,83 @@ class DatabaseManager:
             raise
         
         self.db_config = config['database']
-        self.conn = None
-        self.lock = threading.Lock()  # Thread safety for database operations
+        self.pool_config = dict(DEFAULT_POOL_CONFIG)
+        self.pool_config.update({k: v for k, v in self.db_config.items() if k in DEFAULT_POOL_CONFIG})
+        # Separate pools so a slow dashboard query never delays a detection insert
+        self.read_pool = None
+        self.write_pool = None
+        self.db_stats = {'queries': 0, 'reconnects': 0, 'failed_retries': 0}
+        self.writer_config = dict(DEFAULT_WRITER_CONFIG)
+        self.writer_config.update({k: v for k, v in self.db_config.items() if k in DEFAULT_WRITER_CONFIG})
+        self.detection_writer = None
+        
+        # Registered vehicles kept in memory: plate -> row
+        self.cache_config = dict(DEFAULT_CACHE_CONFIG)
+        self.cache_config.update({k: v for k, v in self.db_config.items() if k in DEFAULT_CACHE_CONFIG})
+        self.vehicle_cache = None       # None until the first successful load
+        self.cache_loaded_at = 0.0
+        self.cache_lock = threading.Lock()
+        self.cache_stop = threading.Event()
+        self.cache_thread = None
+        self.cache_stats = {'hits': 0, 'misses': 0, 'notifications': 0, 'reloads': 0}
         # #region agent log
-        _log("database.py:15", "Before database connect", {"conn_is_none": self.conn is None}, "C")
+        _log("database.py:15", "Before database connect", {}, "C")
         # #endregion
         self.connect()
         # #region agent log
-        _log("database.py:16", "After database connect, before create_tables", {"conn_is_none": self.conn is None}, "C")
+        _log("database.py:16", "After database connect, before create_tables", {"read_pool": self.pool_config['read_pool_size'], "write_pool": self.pool_config['write_pool_size']}, "C")
         # #endregion
         self.create_tables()
+        
+        # detection_history inserts happen off the caller's thread
+        self.detection_writer = DetectionWriter(self, self.writer_config)
+        
+        if self.cache_config['vehicle_cache']:
+            self.warm_vehicle_cache()
+            self.cache_thread = threading.Thread(target=self._cache_listener_loop, name="alpr-vehicle-cache", daemon=True)
+            self.cache_thread.start()
+    
+    def _connection_kwargs(self) -> dict:
+        """psycopg2.connect() arguments from the database config"""
+        port = self.db_config['port']
+        if isinstance(port, str):
+            port = int(port)
+        return {
+            'host': self.db_config['host'],
+            'port': port,
+            'database': self.db_config['database'],
+            'user': self.db_config['user'],
+            # Ensure password is always a string (important for passwords starting with 0 like "0852")
+            'password': str(self.db_config['password']),
+            'connect_timeout': self.pool_config['connect_timeout'],
+            'keepalives': 1,
+            'keepalives_idle': self.pool_config['keepalives_idle'],
+            'keepalives_interval': 10,
+            'keepalives_count': 3
+        }
     
     def connect(self):
-        """Establish database connection"""
+        """Create the read and write connection pools"""
         # #region agent log
         _log("database.py:21", "Before database connection attempt", {"host": self.db_config.get('host'), "port": self.db_config.get('port'), "port_type": type(self.db_config.get('port')).__name__, "password_type": type(self.db_config.get('password')).__name__, "password_length": len(str(self.db_config.get('password', '')))}, "E")
         # #endregion
         try:
-            port = self.db_config['port']
-            if isinstance(port, str):
-                port = int(port)
-            # Ensure password is always a string (important for passwords starting with 0 like "0852")
-            password = str(self.db_config['password'])
+            kwargs = self._connection_kwargs()
             # #region agent log
-            _log("database.py:27", "Password prepared", {"password_type": type(password).__name__, "password_length": len(password)}, "E")
+            _log("database.py:27", "Password prepared", {"password_type": type(kwargs['password']).__name__, "password_length": len(kwargs['password'])}, "E")
             # #endregion
-            self.conn = psycopg2.connect(
-                host=self.db_config['host'],
-                port=port,
-                database=self.db_config['database'],
-                user=self.db_config['user'],
-                password=password
-            )
+            # minconn == maxconn: psycopg2 closes returned connections above
+            # minconn, so anything lower reconnects on every burst
+            timeout = self.pool_config['pool_timeout']
+            write_size = self.pool_config['write_pool_size']
+            self.write_pool = BlockingConnectionPool(write_size, write_size, timeout, **kwargs)
+            read_kwargs = dict(kwargs)
+            if self.pool_config['read_host']:
+                read_kwargs['host'] = self.pool_config['read_host']
+            read_size = self.pool_config['read_pool_size']
+            self.read_pool = BlockingConnectionPool(read_size, read_size, timeout, **read_kwargs)
             # #region agent log
-            _log("database.py:28", "Database connection successful", {"conn_is_none": self.conn is None}, "C")
+            _log("database.py:28", "Database connection successful", {}, "C")
             # #endregion
             print(f"✓ Connected to database: {self.db_config['database']}")
         except Exception as e:
@@ -95,45 +422,115 @@ class DatabaseManager:
             print(f"✗ Database connection failed: {e}")
             raise
     
-    def ensure_connection(self):
-        """Ensure database connection is alive, reconnect if needed"""
-        try:
-            if self.conn is None or self.conn.closed:
-                # #region agent log
-                _log("database.py:ensure_connection:1", "Connection is closed, reconnecting", {}, "C")
-                # #endregion
-                print("⚠ Database connection lost, reconnecting...")
-                self.connect()
-                return
-            
-            # Test if connection is actually alive
-            with self.conn.cursor() as cur:
-                cur.execute("SELECT 1")
-        except (psycopg2.OperationalError, psycopg2.InterfaceError, AttributeError) as e:
-            # #region agent log
-            _log("database.py:ensure_connection:2", "Connection test failed, reconnecting", {"error": str(e)}, "C")
-            # #endregion
-            print(f"⚠ Database connection test failed: {e}, reconnecting...")
+    def _run(self, operation, write: bool = False):
+        """
+        Run operation(conn) in one transaction on a pooled connection
+        
+        There is no liveness probe: if the connection turns out to be dead
+        while running the operation, the pool's idle connections are dropped
+        and the operation is retried once on a fresh connection. A failed
+        commit is never retried since the server may already have applied it.
+        Returns: whatever operation returns
+        """
+        pool = self.write_pool if write else self.read_pool
+        for attempt in range(2):
+            conn = pool.getconn()
             try:
-                self.connect()
-            except Exception as reconnect_error:
+                result = operation(conn)
+            except CONNECTION_ERRORS as e:
+                lost = bool(conn.closed)
+                if not lost:
+                    conn.rollback()
+                pool.putconn(conn, close=lost)
+                if not lost:
+                    raise
+                if attempt:
+                    self.db_stats['failed_retries'] += 1
+                    # #region agent log
+                    _log("database.py:_run:2", "Retry after reconnect failed", {"error": str(e)}, "C")
+                    # #endregion
+                    print(f"✗ Failed to reconnect to database: {e}")
+                    raise
+                self.db_stats['reconnects'] += 1
                 # #region agent log
-                _log("database.py:ensure_connection:3", "Reconnection failed", {"error": str(reconnect_error)}, "C")
+                _log("database.py:_run:1", "Connection lost, reconnecting", {"error": str(e)}, "C")
                 # #endregion
-                print(f"✗ Failed to reconnect to database: {reconnect_error}")
+                print(f"⚠ Database connection lost ({e}), reconnecting...")
+                pool.discard_idle()
+                continue
+            except Exception:
+                if not conn.closed:
+                    conn.rollback()
+                pool.putconn(conn, close=bool(conn.closed))
                 raise
+            
+            try:
+                conn.commit()
+            finally:
+                pool.putconn(conn, close=bool(conn.closed))
+            self.db_stats['queries'] += 1
+            return result
+    
+    def _query(self, sql: str, params=None, write: bool = False, fetch: str = None):
+        """
+        Execute one statement through _run
+        Returns: a dict for fetch='one', a list of dicts for fetch='all', else the row count
+        """
+        def operation(conn):
+            with conn.cursor(cursor_factory=RealDictCursor) as cur:
+                cur.execute(sql, params)
+                if fetch == 'one':
+                    row = cur.fetchone()
+                    return dict(row) if row else None
+                if fetch == 'all':
+                    return [dict(row) for row in cur.fetchall()]
+                return cur.rowcount
+        return self._run(operation, write)
+    
+    def get_stats(self) -> dict:
+        """Query, reconnect and vehicle cache counters"""
+        stats = dict(self.db_stats)
+        stats.update({f"cache_{k}": v for k, v in self.cache_stats.items()})
+        if self.detection_writer:
+            stats.update({f"writer_{k}": v for k, v in self.detection_writer.stats.items()})
+            stats['writer_pending'] = self.detection_writer.queue.qsize()
+        return stats
     
     def create_tables(self):
         """Create necessary tables if they don't exist"""
         # #region agent log
-        _log("database.py:35", "Before create_tables", {"conn_is_none": self.conn is None}, "C")
+        _log("database.py:35", "Before create_tables", {"pool_is_none": self.write_pool is None}, "C")
         # #endregion
-        if self.conn is None:
+        if self.write_pool is None:
             # #region agent log
-            _log("database.py:35", "Cannot create tables - conn is None", {}, "C")
+            _log("database.py:35", "Cannot create tables - pool is None", {}, "C")
             # #endregion
             raise AttributeError("Database connection is None, cannot create tables")
-        with self.conn.cursor() as cur:
+        self._run(self._create_schema, write=True)
+        print("✓ Database tables initialized")
+    
+    @staticmethod
+    def _install_trigger(cur, table: str, trigger: str, function_sql: str, trigger_sql: str) -> bool:
+        """
+        Create a trigger and its function unless the trigger already exists;
+        replacing it on every start would lock the table while other nodes insert
+        Returns: True if the trigger was created
+        """
+        cur.execute("""
+            SELECT 1 FROM pg_trigger
+            WHERE tgrelid = %s::regclass AND tgname = %s AND NOT tgisinternal
+        """, (table, trigger))
+        if cur.fetchone():
+            return False
+        cur.execute(function_sql)
+        cur.execute(trigger_sql)
+        return True
+    
+    def _create_schema(self, conn):
+        with conn.cursor() as cur:
+            # Nodes starting together set the schema up one after the other
+            cur.execute("SELECT pg_advisory_xact_lock(hashtext('alpr_create_schema'))")
+            
             # Vehicles table
             cur.execute("""
                 CREATE TABLE IF NOT EXISTS vehicles (
@@ -172,214 +569,448 @@ class DatabaseManager:
                 CREATE INDEX IF NOT EXISTS idx_detection_timestamp 
                 ON detection_history(detected_at)
             """)
+            # Dashboard counts come from daily_node_counters now; the old
+            # covering index only slowed down inserts
+            cur.execute("DROP INDEX IF EXISTS idx_detection_day_node_status")
+            
+            # Per-day, per-node detection counters maintained by trigger
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS daily_node_counters (
+                    day DATE NOT NULL,
+                    node_id VARCHAR(50) NOT NULL,
+                    allowed INTEGER NOT NULL DEFAULT 0,
+                    denied INTEGER NOT NULL DEFAULT 0,
+                    total INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (day, node_id)
+                )
+            """)
+            installed = self._install_trigger(cur, 'detection_history', 'detection_history_count', DETECTION_COUNTER_SQL, """
+                CREATE TRIGGER detection_history_count
+                AFTER INSERT OR UPDATE OR DELETE ON detection_history
+                FOR EACH ROW EXECUTE PROCEDURE count_detection()
+            """)
+            if installed:
+                # Backfill from existing history in the same transaction: the
+                # trigger's lock holds back concurrent inserts until commit, and
+                # they are counted by the trigger from then on
+                cur.execute("""
+                    INSERT INTO daily_node_counters (day, node_id, allowed, denied, total)
+                    SELECT detected_at::date, node_id,
+                           COUNT(*) FILTER (WHERE status = 'ALLOWED'),
+                           COUNT(*) FILTER (WHERE status = 'DENIED'),
+                           COUNT(*)
+                    FROM detection_history
+                    WHERE NOT EXISTS (SELECT 1 FROM daily_node_counters)
+                    GROUP BY 1, 2
+                """)
             
-            self.conn.commit()
-            print("✓ Database tables initialized")
+            # Change notifications for the vehicle cache
+            self._install_trigger(cur, 'vehicles', 'vehicles_notify', VEHICLE_NOTIFY_SQL, """
+                CREATE TRIGGER vehicles_notify
+                AFTER INSERT OR UPDATE OR DELETE ON vehicles
+                FOR EACH ROW EXECUTE PROCEDURE notify_vehicle_change()
+            """)
+    
+    @staticmethod
+    def _fetch_vehicles(conn) -> Dict[str, Dict]:
+        """All registered vehicles keyed by plate number"""
+        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            cur.execute("SELECT * FROM vehicles")
+            return {row['plate_number']: dict(row) for row in cur.fetchall()}
+    
+    def warm_vehicle_cache(self, conn=None) -> bool:
+        """
+        (Re)load the whole vehicles table into memory
+        Returns: True on success; on failure the previous cache is kept
+        """
+        try:
+            if conn is None:
+                vehicles = self._run(self._fetch_vehicles)
+            else:
+                vehicles = self._fetch_vehicles(conn)
+        except Exception as e:
+            logger.error(f"Could not load vehicle cache: {e}")
+            return False
+        
+        with self.cache_lock:
+            self.vehicle_cache = vehicles
+            self.cache_loaded_at = time.monotonic()
+            self.cache_stats['reloads'] += 1
+        logger.info(f"Vehicle cache loaded: {len(vehicles)} vehicles")
+        return True
+    
+    def _cache_put(self, plate_number: str, vehicle: Optional[Dict], old_plate: str = None):
+        """Apply one change to the cache (vehicle None removes the plate)"""
+        with self.cache_lock:
+            if self.vehicle_cache is None:
+                return
+            if old_plate and old_plate != plate_number:
+                self.vehicle_cache.pop(old_plate, None)
+            if vehicle:
+                self.vehicle_cache[plate_number] = dict(vehicle)
+            else:
+                self.vehicle_cache.pop(plate_number, None)
+    
+    def _listen_connect(self):
+        """Dedicated autocommit connection subscribed to vehicle changes"""
+        conn = psycopg2.connect(**self._connection_kwargs())
+        conn.autocommit = True
+        with conn.cursor() as cur:
+            cur.execute(f"LISTEN {VEHICLE_CHANNEL}")
+        return conn
+    
+    def _cache_listener_loop(self):
+        """Apply NOTIFY events to the cache; reload it fully every cache_ttl seconds"""
+        conn = None
+        listened = False
+        next_attempt = 0.0
+        next_reload = 0.0
+        while not self.cache_stop.is_set():
+            now = time.monotonic()
+            if conn is None and now >= next_attempt:
+                try:
+                    conn = self._listen_connect()
+                    # Changes made while not listening are unknown; start from a fresh copy
+                    if listened:
+                        self.warm_vehicle_cache(conn)
+                    listened = True
+                except Exception as e:
+                    logger.error(f"Vehicle cache listener could not connect: {e}")
+                    conn = None
+                    next_attempt = now + self.cache_config['listen_retry']
+            
+            # TTL reload, retried every listen_retry seconds while the database is unreachable
+            if now - self.cache_loaded_at >= self.cache_config['cache_ttl'] and now >= next_reload:
+                if not self.warm_vehicle_cache(conn):
+                    next_reload = now + self.cache_config['listen_retry']
+            
+            if conn is None:
+                self.cache_stop.wait(1.0)
+                continue
+            
+            try:
+                if select.select([conn], [], [], 1.0) == ([], [], []):
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    self._apply_notification(conn, conn.notifies.pop(0).payload)
+            except Exception as e:
+                logger.error(f"Vehicle cache listener lost its connection: {e}")
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+                conn = None
+        
+        if conn is not None:
+            conn.close()
+    
+    def _apply_notification(self, conn, payload: str):
+        """Refetch the row named by a vehicles_changed payload"""
+        self.cache_stats['notifications'] += 1
+        change = json.loads(payload)
+        plate_number = change['plate']
+        if change['op'] == 'DELETE':
+            self._cache_put(plate_number, None)
+            return
+        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            cur.execute("SELECT * FROM vehicles WHERE plate_number = %s", (plate_number,))
+            self._cache_put(plate_number, cur.fetchone(), change.get('old_plate'))
+    
+    def _cached_vehicle(self, plate_number: str):
+        """
+        Look a plate up in memory
+        Returns: (cache_ready, vehicle copy or None)
+        """
+        with self.cache_lock:
+            if self.vehicle_cache is None:
+                return False, None
+            vehicle = self.vehicle_cache.get(plate_number)
+            self.cache_stats['hits' if vehicle else 'misses'] += 1
+            return True, dict(vehicle) if vehicle else None
     
     def add_vehicle(self, plate_number: str, owner_name: str, 
                    vehicle_type: str = None, contact_number: str = None,
                    valid_until: str = None, notes: str = None) -> bool:
         """Add a new vehicle to the database"""
-        with self.lock:  # Thread-safe access
-            try:
-                self.ensure_connection()
-                with self.conn.cursor() as cur:
-                    cur.execute("""
-                        INSERT INTO vehicles 
-                        (plate_number, owner_name, vehicle_type, contact_number, valid_until, notes)
-                        VALUES (%s, %s, %s, %s, %s, %s)
-                    """, (plate_number.upper(), owner_name, vehicle_type, contact_number, valid_until, notes))
-                    self.conn.commit()
-                    return True
-            except psycopg2.IntegrityError:
-                self.conn.rollback()
-                print(f"Vehicle with plate {plate_number} already exists")
-                return False
-            except Exception as e:
-                # #region agent log
-                _log("database.py:add_vehicle:1", "Error in add_vehicle", {"error": str(e)}, "J")
-                # #endregion
-                self.conn.rollback()
-                print(f"Error adding vehicle: {e}")
-                return False
+        try:
+            row = self._query("""
+                INSERT INTO vehicles 
+                (plate_number, owner_name, vehicle_type, contact_number, valid_until, notes)
+                VALUES (%s, %s, %s, %s, %s, %s)
+                RETURNING *
+            """, (plate_number.upper(), owner_name, vehicle_type, contact_number, valid_until, notes), write=True, fetch='one')
+            self._cache_put(row['plate_number'], row)
+            return True
+        except psycopg2.IntegrityError:
+            print(f"Vehicle with plate {plate_number} already exists")
+            return False
+        except Exception as e:
+            # #region agent log
+            _log("database.py:add_vehicle:1", "Error in add_vehicle", {"error": str(e)}, "J")
+            # #endregion
+            print(f"Error adding vehicle: {e}")
+            return False
     
     def get_vehicle(self, plate_number: str) -> Optional[Dict]:
         """Get vehicle details by plate number"""
+        # Served from memory once the cache is loaded; the cache holds the whole table
+        cache_ready, vehicle = self._cached_vehicle(plate_number.upper())
+        if cache_ready:
+            return vehicle
+        
         print(f"\n💾 [DATABASE] get_vehicle() called for: {plate_number}")
-        with self.lock:  # Thread-safe access
+        try:
+            # #region agent log
+            _log("database.py:get_vehicle:1", "Before query", {"plate_number": plate_number}, "F")
+            # #endregion
+            
+            print(f"🔍 [DATABASE] Executing query for plate: {plate_number.upper()}")
+            result = self._query("""
+                SELECT * FROM vehicles 
+                WHERE plate_number = %s
+            """, (plate_number.upper(),), fetch='one')
+            # #region agent log
+            _log("database.py:get_vehicle:3", "Query executed", {"result_is_none": result is None}, "F")
+            # #endregion
+            
+            if result:
+                print(f"✅ [DATABASE] Vehicle FOUND: {result}")
+            else:
+                print(f"❌ [DATABASE] Vehicle NOT FOUND")
+            
+            return result
+        except Exception as e:
+            # #region agent log
+            _log("database.py:get_vehicle:4", "Error in get_vehicle", {"error": str(e), "error_type": type(e).__name__}, "F")
+            # #endregion
+            print(f"❌ [DATABASE] Error fetching vehicle {plate_number}: {e}")
+            import traceback
+            traceback.print_exc()
+            return None
+    
+    def find_vehicle_fuzzy(self, plate_number: str):
+        """Try heuristic corrections for OCR misreads by generating plausible
+        single- and double-character substitutions and checking the database for matches.
+
+        Returns (corrected_plate, vehicle_dict) if found, otherwise (None, None).
+        """
+        if not plate_number:
+            return None, None
+
+        plate = plate_number.strip().upper()
+
+        subs = {
+            '0': ['O'], 'O': ['0'],
+            '1': ['I', '7'], 'I': ['1'],
+            '2': ['Z', '7'], 'Z': ['2'],
+            '5': ['S'], 'S': ['5'],
+            '8': ['B'], 'B': ['8'],
+            '7': ['1', '2'], 'T': ['7'],
+            '6': ['G'], 'G': ['6']
+        }
+
+        candidates = []
+        # single-character replacements
+        for i, ch in enumerate(plate):
+            if ch in subs:
+                for alt in subs[ch]:
+                    cand = plate[:i] + alt + plate[i+1:]
+                    if cand != plate:
+                        candidates.append(cand)
+
+        # two-character combinations (limited breadth)
+        if len(candidates) < 20:
+            n = len(plate)
+            for i in range(n):
+                for j in range(i+1, n):
+                    ch_i = plate[i]
+                    ch_j = plate[j]
+                    if ch_i in subs and ch_j in subs:
+                        for a in subs[ch_i]:
+                            for b in subs[ch_j]:
+                                cand = plate[:i] + a + plate[i+1:j] + b + plate[j+1:]
+                                if cand != plate:
+                                    candidates.append(cand)
+
+        # Deduplicate and limit the number of DB queries
+        seen = set()
+        filtered = []
+        for c in candidates:
+            if c not in seen:
+                seen.add(c)
+                filtered.append(c)
+            if len(filtered) >= 50:
+                break
+
+        for cand in filtered:
             try:
-                # #region agent log
-                _log("database.py:get_vehicle:1", "Before ensure_connection", {"plate_number": plate_number}, "F")
-                # #endregion
-                print(f"🔌 [DATABASE] Ensuring connection...")
-                self.ensure_connection()
-                print(f"✅ [DATABASE] Connection OK")
-                # #region agent log
-                _log("database.py:get_vehicle:2", "After ensure_connection, before query", {}, "F")
-                # #endregion
-                
-                print(f"🔍 [DATABASE] Executing query for plate: {plate_number.upper()}")
-                with self.conn.cursor(cursor_factory=RealDictCursor) as cur:
-                    cur.execute("""
-                        SELECT * FROM vehicles 
-                        WHERE plate_number = %s
-                    """, (plate_number.upper(),))
-                    result = cur.fetchone()
-                    # #region agent log
-                    _log("database.py:get_vehicle:3", "Query executed", {"result_is_none": result is None}, "F")
-                    # #endregion
-                    
-                    if result:
-                        print(f"✅ [DATABASE] Vehicle FOUND: {dict(result)}")
-                    else:
-                        print(f"❌ [DATABASE] Vehicle NOT FOUND")
-                    
-                    return dict(result) if result else None
-            except Exception as e:
-                # #region agent log
-                _log("database.py:get_vehicle:4", "Error in get_vehicle", {"error": str(e), "error_type": type(e).__name__}, "F")
-                # #endregion
-                print(f"❌ [DATABASE] Error fetching vehicle {plate_number}: {e}")
-                import traceback
-                traceback.print_exc()
-                return None
+                v = self.get_vehicle(cand)
+                if v:
+                    return cand, v
+            except Exception:
+                continue
+
+        return None, None
     
     def get_all_vehicles(self) -> List[Dict]:
         """Get all vehicles from database"""
-        with self.lock:  # Thread-safe access
-            try:
-                self.ensure_connection()
-                with self.conn.cursor(cursor_factory=RealDictCursor) as cur:
-                    cur.execute("""
-                        SELECT * FROM vehicles 
-                        ORDER BY created_at DESC
-                    """)
-                    results = cur.fetchall()
-                    return [dict(row) for row in results]
-            except Exception as e:
-                # #region agent log
-                _log("database.py:get_all_vehicles:1", "Error in get_all_vehicles", {"error": str(e)}, "H")
-                # #endregion
-                print(f"Error fetching vehicles: {e}")
-                return []
+        try:
+            return self._query("""
+                SELECT * FROM vehicles 
+                ORDER BY created_at DESC
+            """, fetch='all')
+        except Exception as e:
+            # #region agent log
+            _log("database.py:get_all_vehicles:1", "Error in get_all_vehicles", {"error": str(e)}, "H")
+            # #endregion
+            print(f"Error fetching vehicles: {e}")
+            return []
     
     def update_vehicle(self, plate_number: str, **kwargs) -> bool:
         """Update vehicle details"""
-        with self.lock:  # Thread-safe access
-            try:
-                self.ensure_connection()
-                fields = []
-                values = []
-                for key, value in kwargs.items():
-                    if value is not None:
-                        fields.append(f"{key} = %s")
-                        values.append(value)
-                
-                if not fields:
-                    return False
-                
-                values.append(plate_number.upper())
-                query = f"UPDATE vehicles SET {', '.join(fields)}, updated_at = CURRENT_TIMESTAMP WHERE plate_number = %s"
-                
-                with self.conn.cursor() as cur:
-                    cur.execute(query, values)
-                    self.conn.commit()
-                    return True
-            except Exception as e:
-                self.conn.rollback()
-                print(f"Error updating vehicle: {e}")
+        try:
+            fields = []
+            values = []
+            for key, value in kwargs.items():
+                if value is not None:
+                    fields.append(f"{key} = %s")
+                    values.append(value)
+            
+            if not fields:
                 return False
+            
+            values.append(plate_number.upper())
+            query = f"UPDATE vehicles SET {', '.join(fields)}, updated_at = CURRENT_TIMESTAMP WHERE plate_number = %s"
+            
+            row = self._query(query + " RETURNING *", values, write=True, fetch='one')
+            if row:
+                self._cache_put(row['plate_number'], row, plate_number.upper())
+            return True
+        except Exception as e:
+            print(f"Error updating vehicle: {e}")
+            return False
     
     def delete_vehicle(self, plate_number: str) -> bool:
         """Delete a vehicle from database"""
-        with self.lock:  # Thread-safe access
-            try:
-                self.ensure_connection()
-                with self.conn.cursor() as cur:
-                    cur.execute("DELETE FROM vehicles WHERE plate_number = %s", (plate_number.upper(),))
-                    self.conn.commit()
-                    return True
-            except Exception as e:
-                self.conn.rollback()
-                print(f"Error deleting vehicle: {e}")
-                return False
+        try:
+            self._query("DELETE FROM vehicles WHERE plate_number = %s", (plate_number.upper(),), write=True)
+            self._cache_put(plate_number.upper(), None)
+            return True
+        except Exception as e:
+            print(f"Error deleting vehicle: {e}")
+            return False
     
     def log_detection(self, node_id: str, plate_number: str, 
                      confidence: float, status: str, 
-                     owner_name: str = None, image_path: str = None) -> bool:
-        """Log a detection event"""
-        with self.lock:  # Thread-safe access
-            try:
-                # #region agent log
-                _log("database.py:log_detection:1", "Before ensure_connection", {"plate_number": plate_number, "status": status}, "G")
-                # #endregion
-                self.ensure_connection()
-                
-                with self.conn.cursor() as cur:
-                    cur.execute("""
-                        INSERT INTO detection_history 
-                        (node_id, plate_number, confidence, status, owner_name, image_path)
-                        VALUES (%s, %s, %s, %s, %s, %s)
-                    """, (node_id, plate_number.upper(), confidence, status, owner_name, image_path))
-                    self.conn.commit()
-                    
-                    # Log to detection log
-                    detection_logger.info(
-                        f"Detection logged - Plate: {plate_number}, Status: {status}, "
-                        f"Confidence: {confidence:.2%}, Owner: {owner_name or 'N/A'}"
-                    )
-                    
-                    # #region agent log
-                    _log("database.py:log_detection:2", "Detection logged successfully", {}, "G")
-                    # #endregion
-                    return True
-            except Exception as e:
-                error_logger.error(f"Error logging detection to database: {e}", exc_info=True)
-                
-                # #region agent log
-                _log("database.py:log_detection:3", "Error in log_detection", {"error": str(e), "error_type": type(e).__name__}, "G")
-                # #endregion
-                self.conn.rollback()
-                print(f"Error logging detection: {e}")
-                return False
+                     owner_name: str = None, image_path: str = None,
+                     detected_at: datetime = None) -> bool:
+        """
+        Log a detection event
+        
+        The row is queued for the background DetectionWriter, so this never
+        waits on the database; detected_at is taken now, not at insert time.
+        """
+        # #region agent log
+        _log("database.py:log_detection:1", "Queueing detection", {"plate_number": plate_number, "status": status}, "G")
+        # #endregion
+        self.detection_writer.put({
+            'node_id': node_id,
+            'plate_number': plate_number.upper(),
+            'detected_at': detected_at or datetime.now(),
+            'confidence': confidence,
+            'status': status,
+            'owner_name': owner_name,
+            'image_path': image_path
+        })
+        return True
     
     def get_detection_history(self, limit: int = 100) -> List[Dict]:
         """Get recent detection history"""
-        with self.lock:  # Thread-safe access
-            try:
-                self.ensure_connection()
-                with self.conn.cursor(cursor_factory=RealDictCursor) as cur:
-                    cur.execute("""
-                        SELECT * FROM detection_history 
-                        ORDER BY detected_at DESC 
-                        LIMIT %s
-                    """, (limit,))
-                    results = cur.fetchall()
-                    return [dict(row) for row in results]
-            except Exception as e:
-                # #region agent log
-                _log("database.py:get_detection_history:1", "Error in get_detection_history", {"error": str(e)}, "I")
-                # #endregion
-                print(f"Error fetching history: {e}")
-                return []
+        try:
+            return self._query("""
+                SELECT * FROM detection_history 
+                ORDER BY detected_at DESC 
+                LIMIT %s
+            """, (limit,), fetch='all')
+        except Exception as e:
+            # #region agent log
+            _log("database.py:get_detection_history:1", "Error in get_detection_history", {"error": str(e)}, "I")
+            # #endregion
+            print(f"Error fetching history: {e}")
+            return []
+    
+    def get_dashboard_stats(self) -> Dict:
+        """
+        Dashboard counters in one query on the trigger-maintained daily_node_counters
+        Returns: {'total_vehicles', 'total_detections', 'allowed_today', 'denied_today',
+                  'detections_today', 'by_node': {node_id: {'allowed', 'denied', 'total'}}}
+        """
+        # Local date, matching the detected_at values written by log_detection
+        today = datetime.now().date()
+        try:
+            row = self._query("""
+                SELECT
+                    (SELECT COUNT(*) FROM vehicles) AS total_vehicles,
+                    (SELECT COALESCE(SUM(total), 0) FROM daily_node_counters) AS total_detections,
+                    COALESCE((
+                        SELECT json_agg(t) FROM (
+                            SELECT node_id, allowed, denied, total
+                            FROM daily_node_counters
+                            WHERE day = %s
+                        ) t
+                    ), '[]'::json) AS today
+            """, (today,), fetch='one')
+        except Exception as e:
+            # #region agent log
+            _log("database.py:get_dashboard_stats:1", "Error in get_dashboard_stats", {"error": str(e)}, "I")
+            # #endregion
+            print(f"Error fetching dashboard stats: {e}")
+            return {}
+        
+        by_node = {node['node_id']: {k: node[k] for k in ('allowed', 'denied', 'total')} for node in row['today']}
+        return {
+            'total_vehicles': row['total_vehicles'],
+            'total_detections': int(row['total_detections']),
+            'allowed_today': sum(node['allowed'] for node in by_node.values()),
+            'denied_today': sum(node['denied'] for node in by_node.values()),
+            'detections_today': sum(node['total'] for node in by_node.values()),
+            'by_node': by_node
+        }
+    
+    def get_occupancy(self, entry_nodes, exit_nodes, day=None) -> Dict:
+        """
+        Today's (or day's) entries, exits and vehicles inside from daily_node_counters
+        Returns: {'entries', 'exits', 'inside'}
+        """
+        nodes = list(set(entry_nodes) | set(exit_nodes))
+        rows = self._query("""
+            SELECT node_id, allowed FROM daily_node_counters
+            WHERE day = %s AND node_id = ANY(%s)
+        """, (day or datetime.now().date(), nodes), fetch='all') if nodes else []
+        by_node = {row['node_id']: row for row in rows}
+        return occupancy_from_counters(by_node, entry_nodes, exit_nodes)
     
     def search_vehicles(self, query: str) -> List[Dict]:
         """Search vehicles by plate number or owner name"""
         try:
-            with self.conn.cursor(cursor_factory=RealDictCursor) as cur:
-                cur.execute("""
-                    SELECT * FROM vehicles 
-                    WHERE plate_number ILIKE %s OR owner_name ILIKE %s
-                    ORDER BY created_at DESC
-                """, (f"%{query}%", f"%{query}%"))
-                results = cur.fetchall()
-                return [dict(row) for row in results]
+            return self._query("""
+                SELECT * FROM vehicles 
+                WHERE plate_number ILIKE %s OR owner_name ILIKE %s
+                ORDER BY created_at DESC
+            """, (f"%{query}%", f"%{query}%"), fetch='all')
         except Exception as e:
             print(f"Error searching vehicles: {e}")
             return []
     
     def close(self):
         """Close database connection"""
-        if self.conn:
-            self.conn.close()
-            print("✓ Database connection closed")
+        if self.detection_writer:
+            self.detection_writer.close()
+        self.cache_stop.set()
+        if self.cache_thread:
+            self.cache_thread.join(timeout=3)
+        for pool in (self.read_pool, self.write_pool):
+            if pool and not pool.closed:
+                pool.closeall()
+        print("✓ Database connection closed")
@@ -0,0 +1,145 @@
+"""
+Debug tracing
+
+One shared replacement for the per-module `_log` debug shims. Tracing is off
+by default and trace() then returns immediately. When enabled (the
+'debug_trace' section of config.json, or the ALPR_TRACE environment variable
+set to 1 or to an output path) entries are queued and a background thread
+serialises them and appends them to a JSON-lines file in batches, so the
+capture and detection threads never touch the disk.
+"""
+import atexit
+import json
+import os
+import queue
+import threading
+import time
+from typing import Optional
+
+from logging_config import get_logger
+
+# Get logger
+logger = get_logger('app')
+
+TRACE_ENV = "ALPR_TRACE"
+
+DEFAULT_TRACE_CONFIG = {
+    'enabled': False,
+    'path': os.path.join("logs", "debug_trace.jsonl"),
+    'flush_interval': 1.0,      # Seconds between batched writes
+    'batch_size': 500,          # Entries written per file write at most
+    'queue_size': 10000         # Entries buffered before new ones are dropped
+}
+
+
+class DebugTracer:
+    """Queue of trace entries drained to disk by one writer thread"""
+    def __init__(self):
+        self.enabled = False
+        self.config = dict(DEFAULT_TRACE_CONFIG)
+        self.queue = None
+        self.thread = None
+        self.stop_event = threading.Event()
+        self.dropped = 0
+        self.written = 0
+
+    def configure(self, config: Optional[dict] = None):
+        """Apply a 'debug_trace' config section; the ALPR_TRACE env var overrides it"""
+        trace_config = dict(DEFAULT_TRACE_CONFIG)
+        trace_config.update(config or {})
+
+        env = os.environ.get(TRACE_ENV, '').strip()
+        if env:
+            trace_config['enabled'] = env.lower() not in ('0', 'false', 'no', 'off')
+            if trace_config['enabled'] and env.lower() not in ('1', 'true', 'yes', 'on'):
+                trace_config['path'] = env
+
+        self.stop()
+        self.config = trace_config
+        if trace_config['enabled']:
+            self.start()
+
+    def start(self):
+        if self.thread:
+            return
+        os.makedirs(os.path.dirname(self.config['path']) or '.', exist_ok=True)
+        self.queue = queue.Queue(maxsize=self.config['queue_size'])
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._writer_loop, name="alpr-trace", daemon=True)
+        self.thread.start()
+        self.enabled = True
+        logger.info(f"Debug tracing to {self.config['path']}")
+
+    def stop(self):
+        """Flush what is queued and stop the writer thread"""
+        if not self.thread:
+            return
+        self.enabled = False
+        self.stop_event.set()
+        self.thread.join(timeout=5)
+        self.thread = None
+
+    def trace(self, location, message, data=None, hypothesisId=None):
+        if not self.enabled:
+            return
+        try:
+            self.queue.put_nowait((time.time(), threading.current_thread().name, location, message, data, hypothesisId))
+        except queue.Full:
+            self.dropped += 1
+
+    def _writer_loop(self):
+        with open(self.config['path'], "a", encoding="utf-8") as f:
+            while True:
+                batch = self._next_batch()
+                if batch:
+                    f.write("".join(self._format(entry) for entry in batch))
+                    f.flush()
+                    self.written += len(batch)
+                elif self.stop_event.is_set():
+                    return
+
+    def _next_batch(self) -> list:
+        """Wait up to flush_interval for the first entry, then take whatever else is queued"""
+        try:
+            batch = [self.queue.get(timeout=self.config['flush_interval'])]
+        except queue.Empty:
+            return []
+        while len(batch) < self.config['batch_size']:
+            try:
+                batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    @staticmethod
+    def _format(entry) -> str:
+        timestamp, thread_name, location, message, data, hypothesisId = entry
+        record = {
+            "location": location,
+            "message": message,
+            "data": data or {},
+            "timestamp": int(timestamp * 1000),
+            "thread": thread_name
+        }
+        if hypothesisId:
+            record["hypothesisId"] = hypothesisId
+        return json.dumps(record, default=str) + "\n"
+
+
+# Process-wide tracer; enabled from the environment until configure() is called
+tracer = DebugTracer()
+trace = tracer.trace
+
+
+def configure_tracing(config: Optional[dict]):
+    """Enable or disable tracing from the 'debug_trace' section of config.json"""
+    try:
+        tracer.configure(config)
+    except OSError as e:
+        logger.error(f"Could not start debug tracing: {e}")
+
+
+if os.environ.get(TRACE_ENV):
+    configure_tracing(None)
+
+atexit.register(tracer.stop)
@@ -0,0 +1,394 @@
+"""
+Staged detection pipeline
+
+Frame grab, YOLO detection and OCR each run in their own thread, connected by
+small bounded queues that drop the oldest item when full. While OCR works on
+one frame, detection already runs on the next one and the grabber keeps the
+freshest frame ready, so throughput approaches that of the slowest stage
+instead of the sum of all stages.
+
+MultiLanePipeline serves several cameras ("lanes") from one loaded
+ALPREngine; DetectionPipeline is its single-camera form.
+"""
+import queue
+import threading
+import time
+from collections import deque
+from typing import Callable, List, Optional
+
+from logging_config import get_logger
+from stage_metrics import metrics
+
+# Get logger
+logger = get_logger('app')
+
+DEFAULT_PIPELINE_CONFIG = {
+    'max_fps': 10,      # Upper bound on frames fed into detection
+    'queue_size': 2,    # Items buffered between stages before dropping the oldest
+    'batch_size': 4     # Lanes whose frames go through YOLO together
+}
+
+# Metrics label for the detect and OCR stages, which run once for a whole
+# cross-lane batch; per-lane series carry the lane's node_id (see stage_metrics)
+BATCH_LANE = 'batch'
+
+
+class DropOldestQueue:
+    """Bounded queue that discards its oldest item instead of blocking the producer"""
+    def __init__(self, maxsize: int):
+        self._items = deque(maxlen=maxsize)
+        self._cond = threading.Condition()
+        self.dropped = 0
+
+    def put(self, item):
+        """Returns: the item that was discarded to make room, or None"""
+        with self._cond:
+            discarded = None
+            if len(self._items) == self._items.maxlen:
+                self.dropped += 1
+                discarded = self._items[0]
+            self._items.append(item)
+            self._cond.notify()
+            return discarded
+
+    def get(self, timeout: float = None):
+        """Return the oldest item, or None if nothing arrived within timeout"""
+        with self._cond:
+            if not self._items:
+                self._cond.wait(timeout)
+            return self._items.popleft() if self._items else None
+
+    def clear(self):
+        with self._cond:
+            self._items.clear()
+
+    def __len__(self):
+        return len(self._items)
+
+
+class Lane:
+    """One camera feeding a pipeline, with its own tracker and frame queue"""
+    def __init__(self, node_id: Optional[str], camera, tracker=None, queue_size: int = 2, region=None):
+        """region: this camera's ALPREngine.make_region(); None uses the engine's default"""
+        self.node_id = node_id
+        self.camera = camera
+        self.tracker = tracker
+        self.region = region
+        self.paused = False
+        self.frame_queue = DropOldestQueue(queue_size)
+        self.stats = {'grabbed': 0, 'detected': 0, 'results': 0}
+
+
+def get_lane_configs(config: dict) -> List[dict]:
+    """
+    Lanes served by this process, from the 'cameras' list in config.json
+    Each entry holds node settings (node_id, location, role), detection
+    settings (roi, detect_width; unset means the 'yolo' section's) plus camera
+    settings that override the top-level 'camera' section. Without a
+    'cameras' list, 'camera' and 'node' describe a single lane.
+    Returns: list of {'node_id', 'location', 'role', 'roi', 'detect_width', 'camera'} dicts
+    """
+    node_keys = ('node_id', 'location', 'role', 'roi', 'detect_width')
+    defaults = config.get('camera', {})
+    node = config.get('node', {})
+    entries = config.get('cameras') or [dict(node)]
+
+    lanes = []
+    for index, entry in enumerate(entries):
+        camera_config = dict(defaults)
+        camera_config.update({k: v for k, v in entry.items() if k not in node_keys})
+        lanes.append({
+            'node_id': entry.get('node_id') or f"{node.get('node_id', 'CAM')}_{index + 1}",
+            'location': entry.get('location', node.get('location', '')),
+            'role': entry.get('role', node.get('role', 'normal')),
+            'roi': entry.get('roi'),
+            'detect_width': entry.get('detect_width'),
+            'camera': camera_config
+        })
+    return lanes
+
+
+class MultiLanePipeline:
+    """
+    Runs capture -> detect -> OCR for several cameras on one shared ALPREngine
+    Every lane has its own grab thread; a single detection thread takes at
+    most one frame per lane per batch, starting from a rotating lane so none
+    starves, and runs them through YOLO in one call. The OCR thread reads the
+    plates of a whole batch with one recognizer call.
+    """
+    def __init__(self, lanes: List[Lane], alpr_engine, on_results: Callable[[List[dict]], None],
+                 config: Optional[dict] = None):
+        """
+        on_results is called from the OCR thread with the list of
+        process_frame()-style results of a frame; each result also carries
+        the full 'frame' it was read from, the lane's 'node_id' and the
+        per-stage 'timings' (also fed into stage_metrics.metrics).
+        """
+        self.lanes = lanes
+        self.alpr_engine = alpr_engine
+        self.on_results = on_results
+
+        self.config = dict(DEFAULT_PIPELINE_CONFIG)
+        self.config.update(config or {})
+
+        self.ocr_queue = DropOldestQueue(self.config['queue_size'])
+        # Tracker reports due without OCR work (report_after timers); never dropped
+        self.report_queue = queue.Queue()
+        # Set by grab threads whenever a lane has a new frame
+        self.frames_ready = threading.Event()
+        self.next_lane = 0
+
+        self.running = False
+        self.paused = False
+        self.threads = []
+
+        # Per-stage counters; latency is capture -> results, smoothed
+        self.stats = {'grabbed': 0, 'detected': 0, 'detect_batches': 0, 'ocr_batches': 0, 'results': 0,
+                      'latency_ms': None}
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        targets = [(f"grab-{lane.node_id or i}", self._grab_loop, (lane,)) for i, lane in enumerate(self.lanes)]
+        targets += [('detect', self._detect_loop, ()), ('ocr', self._ocr_loop, ())]
+        for name, target, args in targets:
+            thread = threading.Thread(target=target, args=args, name=f"alpr-{name}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+        logger.info(f"Detection pipeline started with {len(self.lanes)} lane(s)")
+
+    def stop(self):
+        self.running = False
+        for thread in self.threads:
+            thread.join(timeout=2.0)
+        self.threads = []
+        logger.info(f"Detection pipeline stopped: {self.get_stats()}")
+
+    def pause(self):
+        self.paused = True
+
+    def resume(self):
+        # Anything queued before the pause is stale now
+        for lane in self.lanes:
+            self.resume_lane(lane)
+        self.ocr_queue.clear()
+        while not self.report_queue.empty():
+            self.report_queue.get_nowait()
+        self.paused = False
+
+    def pause_lane(self, lane: Lane):
+        """Stop grabbing and reporting for one lane; the others keep running"""
+        lane.paused = True
+
+    def resume_lane(self, lane: Lane):
+        # Anything the lane queued or tracked before its pause is stale now
+        lane.frame_queue.clear()
+        if lane.tracker:
+            lane.tracker.reset()
+        lane.paused = False
+
+    def get_stats(self) -> dict:
+        stats = dict(self.stats)
+        stats['frames_dropped'] = sum(lane.frame_queue.dropped for lane in self.lanes)
+        stats['ocr_dropped'] = self.ocr_queue.dropped
+        stats['lanes'] = {}
+        for i, lane in enumerate(self.lanes):
+            lane_stats = dict(lane.stats)
+            lane_stats['frames_dropped'] = lane.frame_queue.dropped
+            if lane.camera and hasattr(lane.camera, 'get_stats'):
+                lane_stats['camera'] = lane.camera.get_stats()
+            stats['lanes'][lane.node_id or str(i)] = lane_stats
+        return stats
+
+    def _grab_loop(self, lane: Lane):
+        interval = 1.0 / self.config['max_fps'] if self.config['max_fps'] else 0.0
+        next_grab = time.monotonic()
+        last_seq = 0
+        while self.running:
+            now = time.monotonic()
+            if now < next_grab:
+                time.sleep(next_grab - now)
+                continue
+
+            if self.paused or lane.paused or not lane.camera or not lane.camera.camera_available:
+                next_grab = now + max(interval, 0.01)
+                continue
+
+            packet = lane.camera.get_frame_packet(last_seq)
+            if packet is None:
+                # No newer frame yet; poll again shortly instead of waiting a full interval
+                next_grab = now + 0.005
+                continue
+            next_grab = max(next_grab + interval, now)
+
+            last_seq = packet.seq
+            # Capture time travels with the frame so latency covers the whole pipeline
+            lane.frame_queue.put((packet.frame, packet.timestamp))
+            lane.stats['grabbed'] += 1
+            self.stats['grabbed'] += 1
+            self.frames_ready.set()
+
+    def _next_batch(self) -> list:
+        """Round-robin over the lanes, one frame per lane, at most batch_size frames"""
+        batch = []
+        count = len(self.lanes)
+        start = self.next_lane
+        for step in range(count):
+            if len(batch) >= self.config['batch_size']:
+                break
+            index = (start + step) % count
+            item = self.lanes[index].frame_queue.get(timeout=0)
+            if item is not None:
+                batch.append((self.lanes[index], item[0], item[1]))
+                # The lane after the last one served goes first next time
+                self.next_lane = (index + 1) % count
+        if any(len(lane.frame_queue) for lane in self.lanes):
+            self.frames_ready.set()
+        return batch
+
+    def _detect_loop(self):
+        while self.running:
+            if not self.frames_ready.wait(timeout=0.1):
+                continue
+            self.frames_ready.clear()
+            batch = self._next_batch()
+            if not batch:
+                continue
+            try:
+                detect_start = time.monotonic()
+                batch_timings = {}
+                detections = self.alpr_engine.detect_plates_batch(
+                    [frame for _, frame, _ in batch], batch_timings, [lane.region for lane, _, _ in batch])
+                self.stats['detect_batches'] += 1
+                metrics.observe_timings(BATCH_LANE, batch_timings)
+
+                work = []
+                for (lane, frame, timestamp), frame_detections in zip(batch, detections):
+                    timings = dict(batch_timings)
+                    timings['capture_age'] = detect_start - timestamp
+                    metrics.observe(lane.node_id, 'capture_age', timings['capture_age'])
+                    if lane.tracker:
+                        # Only tracks whose crop improved need OCR
+                        jobs = lane.tracker.assign(frame_detections, timestamp)
+                    else:
+                        jobs = [(None, plate_img, det_confidence, bbox, True)
+                                for plate_img, det_confidence, bbox in frame_detections]
+                    lane.stats['detected'] += 1
+                    self.stats['detected'] += 1
+                    if any(job[4] for job in jobs):
+                        work.append((lane, frame, timestamp, jobs, timings))
+                    elif lane.tracker:
+                        # No OCR work, but report timers still run; this must not
+                        # go through ocr_queue where it could push out real crops
+                        reports = lane.tracker.collect_reports(timestamp)
+                        if reports:
+                            self.report_queue.put((lane, frame, timestamp, reports, timings))
+                if work:
+                    discarded = self.ocr_queue.put(work)
+                    if discarded:
+                        self._cancel_jobs(discarded)
+            except Exception as e:
+                logger.error(f"Detection stage error: {e}", exc_info=True)
+
+    def _ocr_loop(self):
+        while self.running:
+            work = self.ocr_queue.get(timeout=0.1)
+            self._deliver_reports()
+            if work is None:
+                continue
+            recorded = 0        # OCR jobs whose reading has reached their tracker
+            try:
+                # One recognizer call for the plates of every lane in the batch
+                pending = [[job for job in jobs if job[4]] for _, _, _, jobs, _ in work]
+                crops = [job[1] for lane_jobs in pending for job in lane_jobs]
+                ocr_timings = {}
+                ocr_results = self.alpr_engine.read_plate_texts(crops, ocr_timings) if crops else []
+                if crops:
+                    self.stats['ocr_batches'] += 1
+                    metrics.observe_timings(BATCH_LANE, ocr_timings)
+
+                offset = 0
+                for (lane, frame, timestamp, _, timings), lane_jobs in zip(work, pending):
+                    lane_results = ocr_results[offset:offset + len(lane_jobs)]
+                    offset += len(lane_jobs)
+                    if lane_jobs:
+                        timings = {**timings, **ocr_timings}
+                    if lane.tracker:
+                        for (track, plate_img, det_confidence, quality, _), ocr_result in zip(lane_jobs, lane_results):
+                            lane.tracker.record_reading(track, plate_img, det_confidence, quality, ocr_result, timestamp)
+                            recorded += 1
+                    else:
+                        recorded += len(lane_jobs)
+                    results = self._lane_results(lane, lane_jobs, lane_results, timestamp)
+                    self._deliver(lane, frame, timestamp, results, timings)
+            except Exception as e:
+                logger.error(f"OCR stage error: {e}", exc_info=True)
+                # Otherwise those tracks would count the lost jobs as in flight forever
+                self._cancel_jobs(work, skip=recorded)
+
+    def _deliver_reports(self):
+        """Hand over tracker reports the detect thread collected for frames without OCR work"""
+        while True:
+            try:
+                lane, frame, timestamp, results, timings = self.report_queue.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                self._deliver(lane, frame, timestamp, results, timings)
+            except Exception as e:
+                logger.error(f"Report delivery error: {e}", exc_info=True)
+
+    def _deliver(self, lane: Lane, frame, timestamp: float, results: List[dict], timings: dict):
+        if results and not self.paused and not lane.paused:
+            for result in results:
+                result['frame'] = frame
+                result['node_id'] = lane.node_id
+                result['timings'] = dict(timings)
+            lane.stats['results'] += len(results)
+            self.stats['results'] += len(results)
+            latency = time.monotonic() - timestamp
+            self._record_latency(latency)
+            metrics.observe(lane.node_id, 'end_to_end', latency)
+            self.on_results(results)
+
+    def _cancel_jobs(self, work: list, skip: int = 0):
+        """
+        Give back the tracker OCR slots of a batch that was dropped before OCR
+        or failed in it; the first skip OCR jobs were recorded and are kept
+        """
+        for lane, _, _, jobs, _ in work:
+            for track, _, _, _, needs_ocr in jobs:
+                if not needs_ocr:
+                    continue
+                if skip:
+                    skip -= 1
+                elif lane.tracker:
+                    lane.tracker.cancel_reading(track)
+
+    def _record_latency(self, seconds: float):
+        latency_ms = seconds * 1000.0
+        previous = self.stats['latency_ms']
+        self.stats['latency_ms'] = latency_ms if previous is None else 0.9 * previous + 0.1 * latency_ms
+
+    def _lane_results(self, lane: Lane, pending: list, ocr_results: list, timestamp: float) -> List[dict]:
+        if not lane.tracker:
+            return [
+                self.alpr_engine._build_result(plate_img, det_confidence, ocr_result, bbox)
+                for (_, plate_img, det_confidence, bbox, _), ocr_result in zip(pending, ocr_results)
+                if ocr_result is not None
+            ]
+
+        # Readings were recorded by _ocr_loop as they came in
+        return lane.tracker.collect_reports(timestamp)
+
+
+class DetectionPipeline(MultiLanePipeline):
+    """Runs capture -> detect -> OCR as concurrent stages for one camera"""
+    def __init__(self, camera, alpr_engine, on_results: Callable[[List[dict]], None],
+                 tracker=None, config: Optional[dict] = None, node_id: Optional[str] = None):
+        config = dict(config or {})
+        lane = Lane(node_id, camera, tracker, config.get('queue_size', DEFAULT_PIPELINE_CONFIG['queue_size']))
+        super().__init__([lane], alpr_engine, on_results, config)
+        self.camera = camera
+        self.tracker = tracker
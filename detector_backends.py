@@ -0,0 +1,274 @@
+"""
+Pluggable license plate detector backends
+
+The backend is selected with the "backend" key of the "yolo" config section:
+  - "ultralytics":  the PyTorch .pt model run through ultralytics (default)
+  - "onnx":         a YOLOv8 model exported to ONNX, run with onnxruntime
+  - "torchscript":  a YOLOv8 model exported/traced to TorchScript
+
+Every backend returns, per input image, an (N, 5) float32 array of
+x1, y1, x2, y2, confidence in that image's pixel coordinates.
+
+Export a trained model with:
+  python detector_backends.py --model models/license_plate_detector.pt --format onnx
+"""
+import argparse
+from typing import List, Optional
+
+import cv2
+import numpy as np
+import torch
+
+from logging_config import get_logger
+
+# Get logger
+logger = get_logger('app')
+
+DEFAULT_IMGSZ = 640
+NMS_IOU = 0.7  # Same default as ultralytics predict
+
+
+def _resolve_device(device: str) -> str:
+    if device == 'cuda' and not torch.cuda.is_available():
+        print("CUDA not available, falling back to CPU")
+        return 'cpu'
+    return device
+
+
+class DetectorBackend:
+    """Common interface of all detector backends"""
+    name = 'base'
+
+    def detect(self, images: List[np.ndarray], conf: float, imgsz: Optional[int] = None) -> List[np.ndarray]:
+        """
+        Detect plates in a batch of images
+        Returns: one (N, 5) array of x1, y1, x2, y2, confidence per image
+        """
+        raise NotImplementedError
+
+
+class UltralyticsDetector(DetectorBackend):
+    """PyTorch YOLO model run through ultralytics"""
+    name = 'ultralytics'
+
+    def __init__(self, model_path: str, device: str = 'cpu'):
+        from ultralytics import YOLO
+
+        try:
+            # Try to load custom model
+            self.model = YOLO(model_path)
+            print(f"✓ Loaded custom YOLO model: {model_path}")
+        except:
+            # Fallback to YOLOv8n for general object detection
+            print("Custom model not found, using YOLOv8n...")
+            self.model = YOLO('yolov8n.pt')
+            print("✓ Loaded YOLOv8n model")
+
+        # Set device
+        device = _resolve_device(device)
+        self.model.to(device)
+        print(f"✓ Using device: {device}")
+
+    def detect(self, images: List[np.ndarray], conf: float, imgsz: Optional[int] = None) -> List[np.ndarray]:
+        kwargs = {'conf': conf}
+        if imgsz:
+            kwargs['imgsz'] = imgsz
+
+        # Ultralytics stacks a list of images into one batch
+        results = self.model(list(images), **kwargs)
+
+        detections = []
+        for result in results:
+            boxes = result.boxes
+            if len(boxes) == 0:
+                detections.append(np.zeros((0, 5), dtype=np.float32))
+                continue
+            xyxy = boxes.xyxy.cpu().numpy()
+            scores = boxes.conf.cpu().numpy()
+            detections.append(np.hstack([xyxy, scores[:, None]]).astype(np.float32))
+        return detections
+
+
+class _ExportedDetector(DetectorBackend):
+    """Shared YOLOv8 pre/post-processing for exported models"""
+
+    def __init__(self, imgsz: int):
+        self.imgsz = imgsz
+        # Exported models may have a static batch dimension of 1
+        self.max_batch = None
+
+    def detect(self, images: List[np.ndarray], conf: float, imgsz: Optional[int] = None) -> List[np.ndarray]:
+        if not images:
+            return []
+
+        # The input size of an exported model is fixed at export time
+        letterboxed = [self._letterbox(image) for image in images]
+        batch = np.stack([lb[0] for lb in letterboxed])
+
+        step = self.max_batch or len(images)
+        outputs = []
+        for start in range(0, len(images), step):
+            outputs.append(self._forward(batch[start:start + step]))
+        output = np.concatenate(outputs, axis=0)
+
+        return [
+            self._postprocess(pred, conf, ratio, pad)
+            for pred, (_, ratio, pad) in zip(output, letterboxed)
+        ]
+
+    def _forward(self, batch: np.ndarray) -> np.ndarray:
+        """Run the model on an NCHW float32 batch, returning (B, 4 + classes, anchors)"""
+        raise NotImplementedError
+
+    def _letterbox(self, image: np.ndarray):
+        """Resize keeping aspect ratio and pad to a square, like ultralytics LetterBox"""
+        h, w = image.shape[:2]
+        ratio = min(self.imgsz / h, self.imgsz / w)
+        new_w, new_h = int(round(w * ratio)), int(round(h * ratio))
+        pad_w, pad_h = (self.imgsz - new_w) / 2, (self.imgsz - new_h) / 2
+
+        if (w, h) != (new_w, new_h):
+            image = cv2.resize(image, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+        top, bottom = int(round(pad_h - 0.1)), int(round(pad_h + 0.1))
+        left, right = int(round(pad_w - 0.1)), int(round(pad_w + 0.1))
+        image = cv2.copyMakeBorder(image, top, bottom, left, right, cv2.BORDER_CONSTANT, value=(114, 114, 114))
+
+        # BGR HWC uint8 -> RGB CHW float32 in [0, 1]
+        tensor = image[:, :, ::-1].transpose(2, 0, 1)
+        tensor = np.ascontiguousarray(tensor, dtype=np.float32) / 255.0
+        return tensor, ratio, (left, top)
+
+    def _postprocess(self, pred: np.ndarray, conf: float, ratio: float, pad) -> np.ndarray:
+        """Decode one YOLOv8 prediction: threshold, NMS and undo the letterbox"""
+        pred = pred.T  # (anchors, 4 + classes)
+        scores = pred[:, 4:].max(axis=1)
+        keep = scores >= conf
+        if not np.any(keep):
+            return np.zeros((0, 5), dtype=np.float32)
+
+        pred, scores = pred[keep], scores[keep]
+        cx, cy, bw, bh = pred[:, 0], pred[:, 1], pred[:, 2], pred[:, 3]
+        xywh = np.stack([cx - bw / 2, cy - bh / 2, bw, bh], axis=1)
+
+        indices = cv2.dnn.NMSBoxes(xywh.tolist(), scores.tolist(), conf, NMS_IOU)
+        indices = np.array(indices).reshape(-1)
+        if indices.size == 0:
+            return np.zeros((0, 5), dtype=np.float32)
+
+        xywh, scores = xywh[indices], scores[indices]
+        xyxy = np.stack([xywh[:, 0], xywh[:, 1], xywh[:, 0] + xywh[:, 2], xywh[:, 1] + xywh[:, 3]], axis=1)
+        xyxy[:, [0, 2]] -= pad[0]
+        xyxy[:, [1, 3]] -= pad[1]
+        xyxy /= ratio
+
+        return np.hstack([xyxy, scores[:, None]]).astype(np.float32)
+
+
+class OnnxDetector(_ExportedDetector):
+    """YOLOv8 exported to ONNX, run with onnxruntime"""
+    name = 'onnx'
+
+    def __init__(self, model_path: str, device: str = 'cpu', imgsz: int = DEFAULT_IMGSZ, threads: int = 0):
+        try:
+            import onnxruntime as ort
+        except ImportError as e:
+            raise ImportError("The 'onnx' detector backend requires onnxruntime (pip install onnxruntime)") from e
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+
+        providers = ['CPUExecutionProvider']
+        if device == 'cuda' and 'CUDAExecutionProvider' in ort.get_available_providers():
+            providers.insert(0, 'CUDAExecutionProvider')
+
+        self.session = ort.InferenceSession(model_path, sess_options=options, providers=providers)
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+
+        # A static input shape overrides the configured size
+        batch_dim, _, height_dim = model_input.shape[:3]
+        super().__init__(height_dim if isinstance(height_dim, int) else imgsz)
+        if isinstance(batch_dim, int):
+            self.max_batch = batch_dim
+
+        print(f"✓ Loaded ONNX detector: {model_path} ({', '.join(self.session.get_providers())})")
+
+    def _forward(self, batch: np.ndarray) -> np.ndarray:
+        return self.session.run(None, {self.input_name: batch})[0]
+
+
+class TorchScriptDetector(_ExportedDetector):
+    """YOLOv8 exported/traced to TorchScript"""
+    name = 'torchscript'
+
+    def __init__(self, model_path: str, device: str = 'cpu', imgsz: int = DEFAULT_IMGSZ, threads: int = 0):
+        super().__init__(imgsz)
+        self.device = _resolve_device(device)
+        if threads:
+            torch.set_num_threads(threads)
+
+        self.model = torch.jit.load(model_path, map_location=self.device)
+        self.model.eval()
+        print(f"✓ Loaded TorchScript detector: {model_path} on {self.device}")
+
+    def _forward(self, batch: np.ndarray) -> np.ndarray:
+        with torch.inference_mode():
+            try:
+                output = self.model(torch.from_numpy(batch).to(self.device))
+            except RuntimeError:
+                if self.max_batch == 1 or len(batch) == 1:
+                    raise
+                # Traced with a fixed batch size; fall back to one image per call
+                self.max_batch = 1
+                return np.concatenate([self._forward(batch[i:i + 1]) for i in range(len(batch))])
+
+        if isinstance(output, (list, tuple)):
+            output = output[0]
+        return output.cpu().numpy()
+
+
+def create_detector(yolo_config: dict) -> DetectorBackend:
+    """Build the detector backend selected in the yolo config section"""
+    backend = yolo_config.get('backend', 'ultralytics')
+    model_path = yolo_config['model_path']
+    device = yolo_config.get('device', 'cpu')
+    imgsz = int(yolo_config.get('imgsz') or DEFAULT_IMGSZ)
+    threads = int(yolo_config.get('threads') or 0)
+
+    logger.info(f"Loading '{backend}' detector backend from {model_path}")
+    if backend == 'ultralytics':
+        return UltralyticsDetector(model_path, device)
+    if backend == 'onnx':
+        return OnnxDetector(model_path, device, imgsz, threads)
+    if backend == 'torchscript':
+        return TorchScriptDetector(model_path, device, imgsz, threads)
+    raise ValueError(f"Unknown detector backend: {backend}")
+
+
+def export_model(model_path: str, fmt: str, imgsz: int = DEFAULT_IMGSZ) -> str:
+    """Export an ultralytics .pt model to ONNX or TorchScript, returning the exported path"""
+    from ultralytics import YOLO
+
+    model = YOLO(model_path)
+    if fmt == 'onnx':
+        return model.export(format='onnx', imgsz=imgsz, dynamic=True, simplify=True)
+    if fmt == 'torchscript':
+        return model.export(format='torchscript', imgsz=imgsz)
+    raise ValueError(f"Unsupported export format: {fmt}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the plate detector for the onnx/torchscript backends")
+    parser.add_argument("--model", type=str, default="models/license_plate_detector.pt", help="Ultralytics .pt model")
+    parser.add_argument("--format", type=str, choices=["onnx", "torchscript"], default="onnx", help="Export format")
+    parser.add_argument("--imgsz", type=int, default=DEFAULT_IMGSZ, help="Square input size of the exported model")
+    args = parser.parse_args()
+
+    path = export_model(args.model, args.format, args.imgsz)
+    print(f"✓ Exported {args.format} model: {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,10 @@
+import atexit
+import copy
+import json
 import logging
 import os
-from logging.handlers import RotatingFileHandler
+import queue
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
 from datetime import datetime
 
 # Create logs directory structure if it doesn't exist
@@ -16,11 +20,75 @@ ERROR_LOG = os.path.join(LOGS_DIR, "error.log")
 LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
 
-def setup_logging():
-    """Configure logging for the application"""
+# Loggers written by the background listener
+LOGGER_NAMES = ('app', 'detection', 'error')
+
+# Listener thread that owns all file and console handlers
+_listener = None
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line, for log shippers"""
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record, DATE_FORMAT),
+            'logger': record.name,
+            'level': record.levelname,
+            'message': record.getMessage(),
+            'thread': record.threadName
+        }
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class _LogQueueHandler(QueueHandler):
+    """QueueHandler that keeps the traceback separate so each formatter can place it"""
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def _load_logging_config(config_path):
+    """'logging' section of config.json, or {} if there is none"""
+    try:
+        with open(config_path, 'r') as f:
+            return json.load(f).get('logging', {})
+    except (OSError, ValueError):
+        return {}
+
+
+def stop_logging():
+    """Write out queued records and stop the listener thread"""
+    global _listener
+    if _listener:
+        _listener.stop()
+        _listener = None
+
+def setup_logging(config_path="config.json"):
+    """
+    Configure logging for the application
+    
+    Loggers only put records on a queue; one listener thread formats them and
+    does the file and console writes, so a slow disk never blocks the caller.
+    Set "logging": {"format": "json"} in config.json for structured output.
+    """
+    global _listener
+    stop_logging()
     
     # Create formatters
-    formatter = logging.Formatter(LOG_FORMAT, datefmt=DATE_FORMAT)
+    log_config = _load_logging_config(config_path)
+    if log_config.get('format', 'text') == 'json':
+        formatter = JSONFormatter()
+    else:
+        formatter = logging.Formatter(LOG_FORMAT, datefmt=DATE_FORMAT)
+    handlers = []
     
     # ========== APP LOGGER (General application logs) ==========
     app_logger = logging.getLogger('app')
@@ -36,13 +104,15 @@ def setup_logging():
     )
     app_handler.setLevel(logging.INFO)
     app_handler.setFormatter(formatter)
-    app_logger.addHandler(app_handler)
+    app_handler.addFilter(logging.Filter('app'))
+    handlers.append(app_handler)
     
     # Also log to console
     console_handler = logging.StreamHandler()
     console_handler.setLevel(logging.INFO)
     console_handler.setFormatter(formatter)
-    app_logger.addHandler(console_handler)
+    console_handler.addFilter(logging.Filter('app'))
+    handlers.append(console_handler)
     
     # ========== DETECTION LOGGER (License plate detections) ==========
     detection_logger = logging.getLogger('detection')
@@ -58,7 +128,8 @@ def setup_logging():
     )
     detection_handler.setLevel(logging.INFO)
     detection_handler.setFormatter(formatter)
-    detection_logger.addHandler(detection_handler)
+    detection_handler.addFilter(logging.Filter('detection'))
+    handlers.append(detection_handler)
     
     # ========== ERROR LOGGER (Errors and exceptions) ==========
     error_logger = logging.getLogger('error')
@@ -74,7 +145,16 @@ def setup_logging():
     )
     error_handler.setLevel(logging.ERROR)
     error_handler.setFormatter(formatter)
-    error_logger.addHandler(error_handler)
+    error_handler.addFilter(logging.Filter('error'))
+    handlers.append(error_handler)
+    
+    # ========== QUEUE (one writer thread for all three loggers) ==========
+    log_queue = queue.Queue(-1)
+    queue_handler = _LogQueueHandler(log_queue)
+    for logger in (app_logger, detection_logger, error_logger):
+        logger.addHandler(queue_handler)
+    _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
     
     # Log startup message
     app_logger.info("="*60)
@@ -87,3 +167,7 @@ def setup_logging():
 def get_logger(name='app'):
     """Get a logger by name"""
     return logging.getLogger(name)
+
+
+# Runs before logging's own shutdown hook, which closes the handlers
+atexit.register(stop_logging)
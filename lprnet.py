@@ -0,0 +1,197 @@
+"""
+LPRNet license plate recognizer
+
+A small CTC character recognizer (LPRNet, Zherzdev & Gruzdev 2018) that reads
+a tight plate crop in a single forward pass, without a text detection stage.
+Used by the 'lprnet' OCR backend in alpr_engine.py and trained on
+indian_plate_generator output with train_lprnet.py.
+"""
+import json
+import os
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+import torch
+import torch.nn as nn
+
+# Output classes: plate characters followed by the CTC blank
+CHARS = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+BLANK = len(CHARS)
+NUM_CLASSES = len(CHARS) + 1
+
+# Network input size (width, height)
+INPUT_SIZE = (94, 24)
+
+
+class SmallBasicBlock(nn.Module):
+    def __init__(self, ch_in: int, ch_out: int):
+        super().__init__()
+        self.block = nn.Sequential(
+            nn.Conv2d(ch_in, ch_out // 4, kernel_size=1),
+            nn.ReLU(),
+            nn.Conv2d(ch_out // 4, ch_out // 4, kernel_size=(3, 1), padding=(1, 0)),
+            nn.ReLU(),
+            nn.Conv2d(ch_out // 4, ch_out // 4, kernel_size=(1, 3), padding=(0, 1)),
+            nn.ReLU(),
+            nn.Conv2d(ch_out // 4, ch_out, kernel_size=1),
+        )
+
+    def forward(self, x):
+        return self.block(x)
+
+
+class LPRNet(nn.Module):
+    """
+    LPRNet backbone with global context embedding
+    Input: (B, 3, 24, 94) float tensor; Output: (B, NUM_CLASSES, 18) logits
+    """
+    # Backbone layers whose outputs feed the global context
+    CONTEXT_LAYERS = (2, 6, 13, 22)
+
+    def __init__(self, class_num: int = NUM_CLASSES, dropout_rate: float = 0.5):
+        super().__init__()
+        self.class_num = class_num
+        self.backbone = nn.Sequential(
+            nn.Conv2d(3, 64, kernel_size=3, stride=1),                    # 0
+            nn.BatchNorm2d(64),
+            nn.ReLU(),                                                     # 2
+            nn.MaxPool3d(kernel_size=(1, 3, 3), stride=(1, 1, 1)),
+            SmallBasicBlock(64, 128),                                      # 4
+            nn.BatchNorm2d(128),
+            nn.ReLU(),                                                     # 6
+            nn.MaxPool3d(kernel_size=(1, 3, 3), stride=(2, 1, 2)),
+            SmallBasicBlock(64, 256),                                      # 8
+            nn.BatchNorm2d(256),
+            nn.ReLU(),                                                     # 10
+            SmallBasicBlock(256, 256),
+            nn.BatchNorm2d(256),                                           # 12
+            nn.ReLU(),                                                     # 13
+            nn.MaxPool3d(kernel_size=(1, 3, 3), stride=(4, 1, 2)),
+            nn.Dropout(dropout_rate),
+            nn.Conv2d(64, 256, kernel_size=(1, 4), stride=1),              # 16
+            nn.BatchNorm2d(256),
+            nn.ReLU(),                                                     # 18
+            nn.Dropout(dropout_rate),
+            nn.Conv2d(256, class_num, kernel_size=(13, 1), stride=1),      # 20
+            nn.BatchNorm2d(class_num),
+            nn.ReLU(),                                                     # 22
+        )
+        self.container = nn.Conv2d(64 + 128 + 256 + class_num, class_num, kernel_size=1)
+        self.context_pools = nn.ModuleList([
+            nn.AvgPool2d(kernel_size=5, stride=5),
+            nn.AvgPool2d(kernel_size=5, stride=5),
+            nn.AvgPool2d(kernel_size=(4, 10), stride=(4, 2)),
+            nn.Identity(),
+        ])
+
+    def forward(self, x):
+        features = []
+        for i, layer in enumerate(self.backbone.children()):
+            x = layer(x)
+            if i in self.CONTEXT_LAYERS:
+                features.append(x)
+
+        context = []
+        for pool, f in zip(self.context_pools, features):
+            f = pool(f)
+            f = f / torch.mean(torch.pow(f, 2))
+            context.append(f)
+
+        x = self.container(torch.cat(context, 1))
+        return torch.mean(x, dim=2)
+
+
+def preprocess(plate_img: np.ndarray) -> np.ndarray:
+    """Resize a BGR (or grayscale) plate crop to the network input, CHW float32"""
+    if plate_img.ndim == 2:
+        plate_img = cv2.cvtColor(plate_img, cv2.COLOR_GRAY2BGR)
+    img = cv2.resize(plate_img, INPUT_SIZE).astype(np.float32)
+    img = (img - 127.5) * 0.0078125
+    return img.transpose(2, 0, 1)
+
+
+def encode(text: str) -> List[int]:
+    """Plate text to class indices (characters outside CHARS are dropped)"""
+    return [CHARS.index(c) for c in text.upper() if c in CHARS]
+
+
+def greedy_decode(logits: torch.Tensor) -> List[Tuple[str, float]]:
+    """
+    Best-path CTC decoding of (B, NUM_CLASSES, T) logits
+    Returns: (text, confidence) per image, confidence being the mean
+             probability of the emitted characters
+    """
+    probs = torch.softmax(logits, dim=1)
+    best_probs, best_idx = probs.max(dim=1)
+    best_probs = best_probs.cpu().numpy()
+    best_idx = best_idx.cpu().numpy()
+
+    decoded = []
+    for idx_row, prob_row in zip(best_idx, best_probs):
+        chars, char_probs = [], []
+        previous = BLANK
+        for idx, prob in zip(idx_row, prob_row):
+            if idx != BLANK and idx != previous:
+                chars.append(CHARS[idx])
+                char_probs.append(prob)
+            previous = idx
+        confidence = float(np.mean(char_probs)) if char_probs else 0.0
+        decoded.append((''.join(chars), confidence))
+    return decoded
+
+
+def load_model(model_path: str, device: str = 'cpu') -> LPRNet:
+    """Load trained LPRNet weights for inference"""
+    model = LPRNet()
+    model.load_state_dict(torch.load(model_path, map_location=device))
+    model.to(device)
+    model.eval()
+    return model
+
+
+class PlateCropDataset(torch.utils.data.Dataset):
+    """
+    Plate crops from an indian_plate_generator dataset
+    Reads labels.json and crops every image to its plate bbox, so both
+    --tight-crop and full-background datasets can be used.
+    """
+    def __init__(self, dataset_dir: str, split: str = 'train', augment: bool = False):
+        with open(os.path.join(dataset_dir, 'labels.json'), 'r') as f:
+            annotations = json.load(f)
+        self.dataset_dir = dataset_dir
+        self.items = [a for a in annotations if a['split'] == split]
+        self.augment = augment
+
+    def __len__(self):
+        return len(self.items)
+
+    def __getitem__(self, index):
+        item = self.items[index]
+        image = cv2.imread(os.path.join(self.dataset_dir, 'images', item['split'], item['filename']))
+
+        # Loose crop like YOLO's padded boxes, jittered when augmenting
+        x, y, w, h = item['bbox']
+        pad = int(0.05 * w) if not self.augment else np.random.randint(0, int(0.1 * w) + 1)
+        x1, y1 = max(0, x - pad), max(0, y - pad)
+        x2, y2 = min(image.shape[1], x + w + pad), min(image.shape[0], y + h + pad)
+        crop = image[y1:y2, x1:x2]
+
+        label = encode(item['code'])
+        return torch.from_numpy(preprocess(crop)), torch.tensor(label, dtype=torch.long), len(label)
+
+
+def collate(batch):
+    """Stack images and concatenate targets for nn.CTCLoss"""
+    images, labels, lengths = zip(*batch)
+    return torch.stack(images), torch.cat(labels), torch.tensor(lengths, dtype=torch.long)
+
+
+def recognize(model: LPRNet, plate_imgs: List[np.ndarray], device: str = 'cpu') -> List[Optional[Tuple[str, float]]]:
+    """Read a batch of plate crops with one forward pass"""
+    if not plate_imgs:
+        return []
+    batch = torch.from_numpy(np.stack([preprocess(img) for img in plate_imgs])).to(device)
+    with torch.inference_mode():
+        logits = model(batch)
+    return [reading if reading[0] else None for reading in greedy_decode(logits)]
@@ -1,5 +1,6 @@
 import sys
 import json
+import multiprocessing
 import warnings
 warnings.filterwarnings("ignore", category=DeprecationWarning)
 
@@ -16,33 +17,34 @@ import numpy as np
 from datetime import datetime
 import os
 
-from database import DatabaseManager
+from database import DatabaseManager, occupancy_from_counters
 from camera_handler import CameraHandler
 from alpr_engine import ALPREngine
+from plate_tracker import PlateTracker
+from detection_pipeline import Lane, MultiLanePipeline, get_lane_configs
+from debug_trace import trace as _log, configure_tracing
 from logging_config import setup_logging, get_logger
+from stage_metrics import metrics, stage_timer, start_metrics_server
 
-# Initialize logging
-app_logger, detection_logger, error_logger = setup_logging()
+# Get loggers; setup_logging() runs in main() so spawned OCR workers, which
+# re-import this module as __mp_main__, never open the log files themselves
+app_logger = get_logger('app')
+detection_logger = get_logger('detection')
+error_logger = get_logger('error')
 
-# #region agent log
-LOG_PATH = r"c:\Users\maazs\Documents\Projects\ALPR_TollPlaza_System\.cursor\debug.log"
-def _log(location, message, data=None, hypothesisId=None):
-    try:
-        import json as _json
-        log_entry = {"sessionId": "debug-session", "runId": "run1", "location": location, "message": message, "data": data or {}, "timestamp": int(__import__("time").time() * 1000)}
-        if hypothesisId: log_entry["hypothesisId"] = hypothesisId
-        with open(LOG_PATH, "a", encoding="utf-8") as f: f.write(_json.dumps(log_entry) + "\n")
-    except: pass
-# #endregion
 
 class CameraInitThread(QThread):
-    """Thread for initializing camera in background"""
-    initialization_complete = pyqtSignal(object)  # Emits the CameraHandler object or None
+    """Thread for initializing the lane cameras in background"""
+    initialization_complete = pyqtSignal(object)  # Emits a list of CameraHandler objects (one per lane) or None
     initialization_status = pyqtSignal(str)  # Emits status messages
     
+    def __init__(self, lane_configs):
+        super().__init__()
+        self.lane_configs = lane_configs
+    
     def run(self):
         # #region agent log
-        _log("main_gui.py:CameraInitThread:1", "CameraInitThread.run() started", {}, "J")
+        _log("main_gui.py:CameraInitThread:1", "CameraInitThread.run() started", {"lanes": len(self.lane_configs)}, "J")
         # #endregion
         try:
             self.initialization_status.emit("Initializing camera...")
@@ -50,31 +52,34 @@ class CameraInitThread(QThread):
             _log("main_gui.py:CameraInitThread:2", "Before importing CameraHandler", {}, "J")
             # #endregion
             from camera_handler import CameraHandler
-            # #region agent log
-            _log("main_gui.py:CameraInitThread:3", "Before creating CameraHandler()", {}, "J")
-            # #endregion
-            camera = CameraHandler()
-            # #region agent log
-            _log("main_gui.py:CameraInitThread:4", "After creating CameraHandler()", {"camera_available": camera.camera_available if camera else False}, "J")
-            # #endregion
-            if camera.camera_available:
-                # #region agent log
-                _log("main_gui.py:CameraInitThread:5", "Before camera.start()", {}, "J")
-                # #endregion
-                camera.start()
+            cameras = []
+            for lane in self.lane_configs:
                 # #region agent log
-                _log("main_gui.py:CameraInitThread:6", "After camera.start()", {}, "J")
+                _log("main_gui.py:CameraInitThread:3", "Before creating CameraHandler()", {"node_id": lane['node_id']}, "J")
                 # #endregion
-                self.initialization_status.emit("Camera initialized successfully!")
-            else:
+                camera = CameraHandler(camera_config=lane['camera'])
                 # #region agent log
-                _log("main_gui.py:CameraInitThread:7", "Camera not available", {}, "J")
+                _log("main_gui.py:CameraInitThread:4", "After creating CameraHandler()", {"camera_available": camera.camera_available if camera else False}, "J")
                 # #endregion
-                self.initialization_status.emit("Camera not available")
+                if camera.camera_available:
+                    # #region agent log
+                    _log("main_gui.py:CameraInitThread:5", "Before camera.start()", {}, "J")
+                    # #endregion
+                    camera.start()
+                    # #region agent log
+                    _log("main_gui.py:CameraInitThread:6", "After camera.start()", {}, "J")
+                    # #endregion
+                    self.initialization_status.emit(f"Camera {lane['node_id']} initialized successfully!")
+                else:
+                    # #region agent log
+                    _log("main_gui.py:CameraInitThread:7", "Camera not available", {"node_id": lane['node_id']}, "J")
+                    # #endregion
+                    self.initialization_status.emit(f"Camera {lane['node_id']} not available")
+                cameras.append(camera)
             # #region agent log
-            _log("main_gui.py:CameraInitThread:8", "Before emitting initialization_complete", {"camera_is_none": camera is None}, "J")
+            _log("main_gui.py:CameraInitThread:8", "Before emitting initialization_complete", {"cameras": len(cameras)}, "J")
             # #endregion
-            self.initialization_complete.emit(camera)
+            self.initialization_complete.emit(cameras)
             # #region agent log
             _log("main_gui.py:CameraInitThread:9", "After emitting initialization_complete", {}, "J")
             # #endregion
@@ -104,15 +109,28 @@ class ALPRInitThread(QThread):
 
 
 class DetectionThread(QThread):
-    """Thread for continuous plate detection"""
+    """Thread that drives the staged detection pipeline (grab -> YOLO -> OCR) for all lanes"""
     detection_result = pyqtSignal(dict)
     
-    def __init__(self, camera, alpr_engine):
+    def __init__(self, lane_cameras, alpr_engine, tracker_config=None, pipeline_config=None):
+        """lane_cameras: list of (lane config from get_lane_configs, CameraHandler) sharing one ALPREngine"""
         super().__init__()
-        self.camera = camera
         self.alpr_engine = alpr_engine
         self.running = False
         self.paused = False
+        
+        # Track plates across frames so a parked car is not OCR'd on every tick
+        tracker_config = tracker_config or {}
+        pipeline_config = pipeline_config or {}
+        lanes = []
+        for lane_config, camera in lane_cameras:
+            tracker = PlateTracker(alpr_engine, tracker_config) if tracker_config.get('enabled', True) else None
+            # ROI and detection width are per camera; the engine is shared
+            region = alpr_engine.make_region(lane_config['roi'], lane_config['detect_width'], camera.frame_scale())
+            lanes.append(Lane(lane_config['node_id'], camera, tracker, pipeline_config.get('queue_size', 2), region))
+        
+        self.lanes = {lane.node_id: lane for lane in lanes}
+        self.pipeline = MultiLanePipeline(lanes, alpr_engine, self._on_results, pipeline_config)
     
     def run(self):
         self.running = True
@@ -120,54 +138,55 @@ class DetectionThread(QThread):
         print("🔍 DETECTION THREAD STARTED")
         print("="*60 + "\n")
         
+        self.pipeline.start()
         while self.running:
-            if not self.paused and self.camera and self.camera.camera_available and self.alpr_engine:
-                ret, frame = self.camera.read()
-                if ret and frame is not None:
-                    try:
-                        # #region agent log
-                        _log("main_gui.py:DetectionThread:1", "Before process_frame()", {"frame_shape": frame.shape if frame is not None else None}, "M")
-                        # #endregion
-                        result = self.alpr_engine.process_frame(frame)
-                        # #region agent log
-                        _log("main_gui.py:DetectionThread:2", "After process_frame()", {"result_is_none": result is None, "result_keys": list(result.keys()) if result else None}, "M")
-                        # #endregion
-                        if result:
-                            print("\n" + " "*20)
-                            print(f"[INFO] PLATE DETECTED: {result.get('plate_number')} (Confidence: {result.get('confidence'):.2%})")
-                            print("🎯 "*20 + "\n")
-                            print(f"[INFO] EMITTING DETECTION SIGNAL...")
-                            
-                            # Add the frame to the result for snapshot
-                            result['frame'] = frame.copy()
-                            
-                            # Pause detection after finding a plate
-                            self.paused = True
-                            print(f"⏸️  DETECTION PAUSED")
-                            
-                            # #region agent log
-                            _log("main_gui.py:DetectionThread:3", "Before emitting detection_result", {"plate_number": result.get('plate_number'), "confidence": result.get('confidence')}, "N")
-                            # #endregion
-                            self.detection_result.emit(result)
-                            print(f"✅ SIGNAL EMITTED SUCCESSFULLY\n")
-                            # #region agent log
-                            _log("main_gui.py:DetectionThread:4", "After emitting detection_result", {}, "N")
-                            # #endregion
-                    except Exception as e:
-                        print(f"\n❌ ERROR IN DETECTION THREAD: {e}")
-                        print(f"   Error type: {type(e).__name__}\n")
-                        # #region agent log
-                        _log("main_gui.py:DetectionThread:5", "Exception in detection thread", {"error": str(e), "error_type": type(e).__name__}, "P")
-                        # #endregion
             self.msleep(100)
+        self.pipeline.stop()
+    
+    def _on_results(self, results):
+        """Called from the pipeline's OCR stage with the results of one frame"""
+        if self.paused:
+            return
+        try:
+            print("\n" + " "*20)
+            for result in results:
+                print(f"[INFO] PLATE DETECTED: {result.get('plate_number')} on {result.get('node_id')} (Confidence: {result.get('confidence'):.2%})")
+            print("🎯 "*20 + "\n")
+            print(f"[INFO] EMITTING DETECTION SIGNAL...")
+            
+            # Pause the lane that found a plate; the other lanes keep detecting
+            node_id = results[0].get('node_id')
+            lane = self.lanes.get(node_id)
+            if lane:
+                self.pipeline.pause_lane(lane)
+                print(f"⏸️  Lane {node_id} paused")
+            
+            for result in results:
+                # #region agent log
+                _log("main_gui.py:DetectionThread:3", "Before emitting detection_result", {"plate_number": result.get('plate_number'), "confidence": result.get('confidence')}, "N")
+                # #endregion
+                self.detection_result.emit(result)
+            print(f"✅ SIGNAL EMITTED SUCCESSFULLY\n")
+            # #region agent log
+            _log("main_gui.py:DetectionThread:4", "After emitting detection_result", {}, "N")
+            # #endregion
+        except Exception as e:
+            print(f"\n❌ ERROR IN DETECTION THREAD: {e}")
+            print(f"   Error type: {type(e).__name__}\n")
+            # #region agent log
+            _log("main_gui.py:DetectionThread:5", "Exception in detection thread", {"error": str(e), "error_type": type(e).__name__}, "P")
+            # #endregion
     
     def pause(self):
         """Pause detection"""
         self.paused = True
+        self.pipeline.pause()
         print("⏸️  Detection paused")
     
     def resume(self):
-        """Resume detection"""
+        """Resume detection on every lane, including lanes paused after a plate"""
+        # Queued frames and tracks went stale while paused
+        self.pipeline.resume()
         self.paused = False
         print("▶️  Detection resumed")
     
@@ -260,6 +279,7 @@ class ALPRMainWindow(QMainWindow):
         try:
             with open('config.json', 'r') as f:
                 self.config = json.load(f)
+            configure_tracing(self.config.get('debug_trace'))
             # #region agent log
             _log("main_gui.py:49", "Config loaded successfully", {"has_database": "database" in self.config, "has_camera": "camera" in self.config, "has_yolo": "yolo" in self.config, "has_ocr": "ocr" in self.config, "has_node": "node" in self.config}, "B")
             # #endregion
@@ -284,7 +304,10 @@ class ALPRMainWindow(QMainWindow):
         
         # Initialize components
         self.db = None
-        self.camera = None
+        self.lanes = get_lane_configs(self.config)
+        self.cameras = []
+        self.camera = None  # First lane's camera, shown in the preview
+        self.video_frame_seq = 0
         self.alpr_engine = None
         self.camera_loading = False
         self.alpr_loading = False
@@ -307,6 +330,7 @@ class ALPRMainWindow(QMainWindow):
         
         # UI state
         self.current_detection = None
+        self.refresh_pending = False
         self.stats = {
             'total_vehicles': 0,
             'allowed_today': 0,
@@ -346,6 +370,9 @@ class ALPRMainWindow(QMainWindow):
         _log("main_gui.py:__init__:10", "After update_stats()", {}, "E")
         # #endregion
         
+        # Stage latency histograms on a local HTTP port, if enabled
+        start_metrics_server(self.config.get('metrics'))
+        
         # Initialize camera and ALPR in background after GUI is shown
         QTimer.singleShot(100, self.init_camera_background)
         
@@ -1185,35 +1212,26 @@ class ALPRMainWindow(QMainWindow):
         # #endregion
         try:
             # #region agent log
-            _log("main_gui.py:update_stats:2", "Before db.get_all_vehicles()", {}, "E")
+            _log("main_gui.py:update_stats:2", "Before db.get_dashboard_stats()", {}, "E")
             # #endregion
-            vehicles = self.db.get_all_vehicles()
+            dashboard = self.db.get_dashboard_stats()
+            if not dashboard:
+                return
             # #region agent log
-            _log("main_gui.py:update_stats:3", "After db.get_all_vehicles(), before db.get_detection_history()", {"vehicle_count": len(vehicles)}, "E")
+            _log("main_gui.py:update_stats:3", "After db.get_dashboard_stats()", {"vehicle_count": dashboard['total_vehicles']}, "E")
             # #endregion
-            history = self.db.get_detection_history(1000)
-            
-            today = datetime.now().date()
-            allowed_today = sum(1 for h in history if h['status'] == 'ALLOWED' and h['detected_at'].date() == today)
-            denied_today = sum(1 for h in history if h['status'] == 'DENIED' and h['detected_at'].date() == today)
             
-            self.stats['total_vehicles'] = len(vehicles)
-            self.stats['allowed_today'] = allowed_today
-            self.stats['denied_today'] = denied_today
-            self.stats['total_detections'] = len(history)
+            self.stats['total_vehicles'] = dashboard['total_vehicles']
+            self.stats['allowed_today'] = dashboard['allowed_today']
+            self.stats['denied_today'] = dashboard['denied_today']
+            self.stats['total_detections'] = dashboard['total_detections']
 
-            # Compute entry/exit counts if configured
-            entry_node = self.config.get('flow', {}).get('entry_node')
-            exit_node = self.config.get('flow', {}).get('exit_node')
-            entries = 0
-            exits = 0
-            if entry_node:
-                entries = sum(1 for h in history if h['status'] == 'ALLOWED' and h.get('node_id') == entry_node and h['detected_at'].date() == today)
-            if exit_node:
-                exits = sum(1 for h in history if h['status'] == 'ALLOWED' and h.get('node_id') == exit_node and h['detected_at'].date() == today)
+            # Entry/exit occupancy from today's per-node counters
+            entry_nodes, exit_nodes = self.get_flow_nodes()
+            occupancy = occupancy_from_counters(dashboard['by_node'], entry_nodes, exit_nodes)
 
-            self.stats['inside'] = max(0, entries - exits)
-            self.stats['exited'] = exits
+            self.stats['inside'] = occupancy['inside']
+            self.stats['exited'] = occupancy['exits']
             
             # Update cards
             if hasattr(self, 'total_vehicles_card'):
@@ -1245,11 +1263,14 @@ class ALPRMainWindow(QMainWindow):
         # #region agent log
         _log("main_gui.py:255", "Reading camera frame", {"camera_exists": self.camera is not None}, "D")
         # #endregion
-        ret, frame = self.camera.read()
+        # Only redraw when the camera has produced a new frame
+        packet = self.camera.get_frame_packet(self.video_frame_seq)
+        ret, frame = (True, packet.frame) if packet else (False, None)
         # #region agent log
         _log("main_gui.py:256", "Camera read result", {"ret": ret, "frame_is_none": frame is None, "frame_shape": frame.shape if frame is not None else None}, "D")
         # #endregion
         if ret and frame is not None:
+            self.video_frame_seq = packet.seq
             try:
                 rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
                 h, w, ch = rgb_frame.shape
@@ -1284,6 +1305,9 @@ class ALPRMainWindow(QMainWindow):
             plate_number = result['plate_number']
             confidence = result['confidence']
             frame = result.get('frame')
+            # Lane that saw the plate; uploaded images count for this node
+            node_id = result.get('node_id') or self.config['node']['node_id']
+            timings = {}
             
             detection_logger.info(f"Plate detected: {plate_number} (Confidence: {confidence:.2%})")
             
@@ -1303,7 +1327,8 @@ class ALPRMainWindow(QMainWindow):
                 # Save snapshot with timestamp
                 timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
                 snapshot_path = f'snapshots/{plate_number}_{timestamp}.jpg'
-                cv2.imwrite(snapshot_path, frame)
+                with stage_timer(timings, 'snapshot_write'):
+                    cv2.imwrite(snapshot_path, frame)
                 print(f"📸 Snapshot saved: {snapshot_path}")
                 
                 # Display the snapshot
@@ -1354,22 +1379,25 @@ class ALPRMainWindow(QMainWindow):
             # #endregion
             
             print(f"🔍 Checking database for vehicle: {plate_number}")
-            vehicle = self.db.get_vehicle(plate_number)
-            print(f"📦 Database result: {'FOUND' if vehicle else 'NOT FOUND'}")
+            with stage_timer(timings, 'db_lookup'):
+                vehicle = self.db.get_vehicle(plate_number)
+                print(f"📦 Database result: {'FOUND' if vehicle else 'NOT FOUND'}")
 
-            # If not found, try heuristic corrections for common OCR confusions
-            if not vehicle:
-                try:
-                    corrected_plate, corrected_vehicle = self.try_correct_plate(plate_number)
-                    if corrected_vehicle:
-                        print(f"🔁 Plate corrected: {plate_number} -> {corrected_plate}")
-                        plate_number = corrected_plate
-                        vehicle = corrected_vehicle
-                        # Update displayed plate immediately
-                        self.plate_label.setText(plate_number)
-                        _log("main_gui.py:handle_detection:correct", "Plate corrected via heuristics", {"original": result.get('plate_number'), "corrected": plate_number}, "O")
-                except Exception as e:
-                    _log("main_gui.py:handle_detection:correct:error", "Error during plate correction", {"error": str(e)}, "O")
+                # If not found, try heuristic corrections for common OCR confusions
+                if not vehicle:
+                    try:
+                        corrected_plate, corrected_vehicle = self.try_correct_plate(plate_number)
+                        if corrected_vehicle:
+                            print(f"🔁 Plate corrected: {plate_number} -> {corrected_plate}")
+                            plate_number = corrected_plate
+                            vehicle = corrected_vehicle
+                            # Update displayed plate immediately
+                            self.plate_label.setText(plate_number)
+                            _log("main_gui.py:handle_detection:correct", "Plate corrected via heuristics", {"original": result.get('plate_number'), "corrected": plate_number}, "O")
+                    except Exception as e:
+                        _log("main_gui.py:handle_detection:correct:error", "Error during plate correction", {"error": str(e)}, "O")
+            metrics.observe_timings(node_id, timings)
+            result.setdefault('timings', {}).update(timings)
             
             # #region agent log
             _log("main_gui.py:handle_detection:4", "After get_vehicle()", {"vehicle_found": vehicle is not None}, "O")
@@ -1401,27 +1429,14 @@ class ALPRMainWindow(QMainWindow):
                 try:
                     print(f"💾 Logging ALLOWED detection to database...")
                     self.db.log_detection(
-                        self.config['node']['node_id'],
+                        node_id,
                         plate_number,
                         confidence,
                         'ALLOWED',
                         vehicle['owner_name']
                     )
                     print(f"✅ Detection logged successfully")
-                    # Update flow counters depending on this node's role
-                    role = self.config.get('node', {}).get('role', 'normal')
-                    if role == 'entry':
-                        self.stats['inside'] = self.stats.get('inside', 0) + 1
-                        if hasattr(self, 'inside_card'):
-                            self.inside_card.set_value(self.stats['inside'])
-                    elif role == 'exit':
-                        # Vehicle exiting: increment exited and decrement inside safely
-                        self.stats['exited'] = self.stats.get('exited', 0) + 1
-                        self.stats['inside'] = max(0, self.stats.get('inside', 0) - 1)
-                        if hasattr(self, 'exited_card'):
-                            self.exited_card.set_value(self.stats['exited'])
-                        if hasattr(self, 'inside_card'):
-                            self.inside_card.set_value(self.stats['inside'])
+                    # Inside/exited cards follow from daily_node_counters on the next refresh
                 except Exception as e:
                     # #region agent log
                     _log("main_gui.py:handle_detection:5", "Error logging ALLOWED detection", {"error": str(e)}, "O")
@@ -1450,7 +1465,7 @@ class ALPRMainWindow(QMainWindow):
                 try:
                     print(f"💾 Logging DENIED detection to database...")
                     self.db.log_detection(
-                        self.config['node']['node_id'],
+                        node_id,
                         plate_number,
                         confidence,
                         'DENIED'
@@ -1462,17 +1477,8 @@ class ALPRMainWindow(QMainWindow):
                     # #endregion
                     print(f"❌ Error logging detection: {e}")
             
-            # Refresh UI (wrapped in try-except to not block status display)
-            try:
-                print(f"🔄 Refreshing UI (history and stats)...")
-                self.refresh_history()
-                self.update_stats()
-                print(f"✅ UI refreshed")
-            except Exception as e:
-                # #region agent log
-                _log("main_gui.py:handle_detection:7", "Error refreshing UI", {"error": str(e)}, "O")
-                # #endregion
-                print(f"❌ Error refreshing UI: {e}")
+            # Refresh history and stats once the detection writer has flushed the row
+            self.schedule_refresh()
             
             # Enable resume button
             if hasattr(self, 'resume_btn'):
@@ -1481,7 +1487,7 @@ class ALPRMainWindow(QMainWindow):
             
             print("\n" + "="*60)
             print("🎉 HANDLE_DETECTION COMPLETED SUCCESSFULLY!")
-            print("🎉 Detection paused - Click 'Resume Detection' to continue")
+            print(f"🎉 Lane {node_id} paused - Click 'Resume Detection' to continue")
             print("="*60 + "\n")
             
         except Exception as e:
@@ -1516,6 +1522,28 @@ class ALPRMainWindow(QMainWindow):
             if hasattr(self, 'resume_btn'):
                 self.resume_btn.setEnabled(True)
     
+    def schedule_refresh(self):
+        """Refresh history and stats shortly, after queued detections are written"""
+        if self.refresh_pending:
+            return
+        self.refresh_pending = True
+        delay_ms = int(self.db.detection_writer.flush_interval * 1000) + 250
+        QTimer.singleShot(delay_ms, self.refresh_after_detection)
+    
+    def refresh_after_detection(self):
+        """Deferred UI refresh (wrapped in try-except to not block status display)"""
+        self.refresh_pending = False
+        try:
+            print(f"🔄 Refreshing UI (history and stats)...")
+            self.refresh_history()
+            self.update_stats()
+            print(f"✅ UI refreshed")
+        except Exception as e:
+            # #region agent log
+            _log("main_gui.py:handle_detection:7", "Error refreshing UI", {"error": str(e)}, "O")
+            # #endregion
+            print(f"❌ Error refreshing UI: {e}")
+    
     def reset_display(self):
         """Reset display to waiting state"""
         print("\n" + "⏱* "*20)
@@ -1543,69 +1571,29 @@ class ALPRMainWindow(QMainWindow):
         
         print("✅ Display reset complete\n")
 
+    def get_flow_nodes(self):
+        """
+        Node ids counted as entries and as exits: lanes by role plus the flow settings
+        Returns: (entry_nodes, exit_nodes)
+        """
+        flow = self.config.get('flow', {})
+        lanes = get_lane_configs(self.config)
+        entry_nodes = {lane['node_id'] for lane in lanes if lane['role'] == 'entry'}
+        exit_nodes = {lane['node_id'] for lane in lanes if lane['role'] == 'exit'}
+        if flow.get('entry_node'):
+            entry_nodes.add(flow['entry_node'])
+        if flow.get('exit_node'):
+            exit_nodes.add(flow['exit_node'])
+        return entry_nodes, exit_nodes
+    
     def try_correct_plate(self, plate: str):
-        """Try heuristic corrections for OCR misreads by generating plausible
-        single- and double-character substitutions and checking the database for matches.
+        """Try heuristic corrections for OCR misreads against the database.
 
         Returns (corrected_plate, vehicle_dict) if found, otherwise (None, None).
         """
         if not plate or not self.db:
             return None, None
-
-        plate = plate.strip().upper()
-
-        subs = {
-            '0': ['O'], 'O': ['0'],
-            '1': ['I', '7'], 'I': ['1'],
-            '2': ['Z', '7'], 'Z': ['2'],
-            '5': ['S'], 'S': ['5'],
-            '8': ['B'], 'B': ['8'],
-            '7': ['1', '2'], 'T': ['7'],
-            '6': ['G'], 'G': ['6']
-        }
-
-        candidates = []
-        # single-character replacements
-        for i, ch in enumerate(plate):
-            if ch in subs:
-                for alt in subs[ch]:
-                    cand = plate[:i] + alt + plate[i+1:]
-                    if cand != plate:
-                        candidates.append(cand)
-
-        # two-character combinations (limited breadth)
-        if len(candidates) < 20:
-            n = len(plate)
-            for i in range(n):
-                for j in range(i+1, n):
-                    ch_i = plate[i]
-                    ch_j = plate[j]
-                    if ch_i in subs and ch_j in subs:
-                        for a in subs[ch_i]:
-                            for b in subs[ch_j]:
-                                cand = plate[:i] + a + plate[i+1:j] + b + plate[j+1:]
-                                if cand != plate:
-                                    candidates.append(cand)
-
-        # Deduplicate and limit the number of DB queries
-        seen = set()
-        filtered = []
-        for c in candidates:
-            if c not in seen:
-                seen.add(c)
-                filtered.append(c)
-            if len(filtered) >= 50:
-                break
-
-        for cand in filtered:
-            try:
-                v = self.db.get_vehicle(cand)
-                if v:
-                    return cand, v
-            except Exception:
-                continue
-
-        return None, None
+        return self.db.find_vehicle_fuzzy(plate)
     
     def resume_detection(self):
         """Resume detection after a plate was detected"""
@@ -1676,17 +1664,15 @@ class ALPRMainWindow(QMainWindow):
             print("🔍 Processing image through ALPR engine...")
             
             # Process image through ALPR engine
-            result = self.alpr_engine.process_frame(frame)
+            results = self.alpr_engine.process_frame(frame)
             
-            if result is None:
+            if not results:
                 QMessageBox.information(self, "No Detection", "No license plate detected in the uploaded image.")
                 print("❌ No plate detected in uploaded image")
                 return
             
-            print(f"✅ Plate detected: {result.get('plate_number')} (Confidence: {result.get('confidence'):.2%})")
-            
-            # Add frame to result for display
-            result['frame'] = frame
+            for result in results:
+                print(f"✅ Plate detected: {result.get('plate_number')} (Confidence: {result.get('confidence'):.2%})")
             
             # Stop video timer if running
             if hasattr(self, 'video_timer') and self.video_timer and self.video_timer.isActive():
@@ -1698,8 +1684,11 @@ class ALPRMainWindow(QMainWindow):
                 self.detection_thread.pause()
                 print("⏸️  Detection thread paused")
             
-            # Process and display the detection result
-            self.handle_detection(result)
+            # Process and display every detection result
+            for result in results:
+                # Add frame to result for display
+                result['frame'] = frame
+                self.handle_detection(result)
             
             print("\n" + "="*60)
             print("🎉 IMAGE PROCESSING COMPLETED!")
@@ -1817,7 +1806,7 @@ class ALPRMainWindow(QMainWindow):
             self.status_label.setStyleSheet("color: #f59e0b; font-size: 24px; font-weight: 600;")
         
         # Start initialization thread
-        self.camera_init_thread = CameraInitThread()
+        self.camera_init_thread = CameraInitThread(self.lanes)
         self.camera_init_thread.initialization_status.connect(self.on_camera_status)
         self.camera_init_thread.initialization_complete.connect(self.on_camera_initialized)
         self.camera_init_thread.start()
@@ -1865,12 +1854,13 @@ class ALPRMainWindow(QMainWindow):
             self.status_label.setText("WAITING")
             self.status_label.setStyleSheet("color: #6b7280; font-size: 24px; font-weight: 600;")
     
-    def on_camera_initialized(self, camera):
+    def on_camera_initialized(self, cameras):
         """Handle camera initialization completion"""
         if not self.camera_loading:
             return  # Timeout already occurred
         
-        self.camera = camera
+        self.cameras = cameras or []
+        self.camera = self.cameras[0] if self.cameras else None
         self.camera_loading = False
         
         if self.camera is not None and self.camera.camera_available:
@@ -1946,8 +1936,15 @@ class ALPRMainWindow(QMainWindow):
             
             # Start detection thread
             if self.camera and self.camera.camera_available:
-                print(f"[INFO] Camera available, starting detection thread...")
-                self.detection_thread = DetectionThread(self.camera, self.alpr_engine)
+                lane_cameras = [
+                    (lane, camera) for lane, camera in zip(self.lanes, self.cameras)
+                    if camera.camera_available
+                ]
+                print(f"[INFO] {len(lane_cameras)} camera(s) available, starting detection thread...")
+                self.detection_thread = DetectionThread(
+                    lane_cameras, self.alpr_engine,
+                    self.config.get('tracker'), self.config.get('pipeline')
+                )
                 print("[INFO] Connecting detection_result signal to handle_detection...")
                 self.detection_thread.detection_result.connect(self.handle_detection)
                 print("✅ Signal connected!")
@@ -1998,9 +1995,13 @@ class ALPRMainWindow(QMainWindow):
             self.detection_thread.stop()
             self.detection_thread.wait()
         
-        # Release camera
-        if self.camera:
-            self.camera.release()
+        # Stop OCR worker processes
+        if self.alpr_engine:
+            self.alpr_engine.close()
+        
+        # Release cameras
+        for camera in self.cameras:
+            camera.release()
         
         # Close database
         if self.db:
@@ -2010,6 +2011,9 @@ class ALPRMainWindow(QMainWindow):
 
 
 def main():
+    # Initialize logging
+    setup_logging()
+    
     # #region agent log
     _log("main_gui.py:main:1", "main() started, creating QApplication", {}, "D")
     # #endregion
@@ -2050,4 +2054,6 @@ def main():
 
 
 if __name__ == '__main__':
+    # OCR worker processes are spawned; needed for frozen Windows builds
+    multiprocessing.freeze_support()
     main()
@@ -0,0 +1,141 @@
+"""
+Process-pool OCR workers
+
+EasyOCR post-processing and plate text cleaning are pure Python and hold the
+GIL, so OCR threads barely run in parallel. OCRWorkerPool runs the recognizer
+in separate processes instead. Plate crops are handed over through one
+shared-memory block per task rather than being pickled. The readings come
+back pickled, each with its preprocessed plate image (shown by the GUI), which
+is small next to the crops.
+
+Enabled by setting "workers" > 0 in the ocr section of config.json; the pool
+is then used transparently by ALPREngine.read_plate_text(s).
+"""
+import multiprocessing as mp
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import resource_tracker, shared_memory
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from logging_config import get_logger
+
+# Get logger
+logger = get_logger('app')
+
+# OCR-only engine of the current worker process
+_worker_engine = None
+
+
+def _init_worker(config_path: str):
+    """Load the recognizer once per worker process"""
+    global _worker_engine
+    from alpr_engine import ALPREngine
+    _worker_engine = ALPREngine(config_path, ocr_only=True)
+
+
+def _attach_shared(shm_name: str) -> shared_memory.SharedMemory:
+    """
+    Attach to a block the parent owns without registering it with the
+    resource tracker, which would otherwise warn about a leak and unlink it
+    a second time; the parent unlinks it once the task is done
+    """
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=shm_name, track=False)
+    # Older versions always register on attach; workers run one task at a time
+    register = resource_tracker.register
+    resource_tracker.register = lambda name, rtype: None
+    try:
+        return shared_memory.SharedMemory(name=shm_name)
+    finally:
+        resource_tracker.register = register
+
+
+def _read_shared(shm_name: str, specs: List[Tuple[int, tuple, str]]):
+    """Read the plate crops stored in a shared-memory block"""
+    shm = _attach_shared(shm_name)
+    try:
+        crops = [np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=offset) for offset, shape, dtype in specs]
+        results = _worker_engine.read_plate_texts(crops)
+        # Views into the block must be gone before it can be closed
+        del crops
+        return results
+    finally:
+        shm.close()
+
+
+class OCRWorkerPool:
+    """Pool of OCR worker processes fed through shared memory"""
+    def __init__(self, config_path: str, workers: int):
+        self.config_path = config_path
+        self.workers = workers
+        self.restarts = 0
+        self.executor = self._start_executor()
+        logger.info(f"Started OCR worker pool with {workers} processes")
+        print(f"✓ OCR worker pool: {workers} processes")
+
+    def _start_executor(self) -> ProcessPoolExecutor:
+        # Spawn so workers do not inherit torch/OpenCV thread state from the parent
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=mp.get_context('spawn'),
+            initializer=_init_worker,
+            initargs=(self.config_path,)
+        )
+
+    def read_plate_texts(self, plate_imgs: List[np.ndarray]) -> List[Optional[Tuple[str, float, np.ndarray]]]:
+        """
+        Same contract as ALPREngine.read_plate_texts, spread over the workers
+        A worker that died (crash, OOM kill) breaks the whole executor; it is
+        replaced once and the call retried on the new one
+        """
+        if not plate_imgs:
+            return []
+        try:
+            return self._read(plate_imgs)
+        except BrokenProcessPool as e:
+            self.restarts += 1
+            logger.error(f"OCR worker pool broken ({e}), restarting it")
+            print("⚠ OCR worker died, restarting the worker pool")
+            self.executor.shutdown(wait=False)
+            self.executor = self._start_executor()
+            return self._read(plate_imgs)
+
+    def _read(self, plate_imgs: List[np.ndarray]) -> List[Optional[Tuple[str, float, np.ndarray]]]:
+        # Contiguous chunks, one per worker at most
+        chunk_size = -(-len(plate_imgs) // self.workers)
+        chunks = [plate_imgs[i:i + chunk_size] for i in range(0, len(plate_imgs), chunk_size)]
+
+        blocks = []
+        futures = []
+        try:
+            for chunk in chunks:
+                shm, specs = self._to_shared(chunk)
+                blocks.append(shm)
+                futures.append(self.executor.submit(_read_shared, shm.name, specs))
+            return [result for future in futures for result in future.result()]
+        finally:
+            for shm in blocks:
+                shm.close()
+                shm.unlink()
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+
+    @staticmethod
+    def _to_shared(images: List[np.ndarray]):
+        """Copy images into a new shared-memory block, returning it and (offset, shape, dtype) per image"""
+        images = [np.ascontiguousarray(img) for img in images]
+        shm = shared_memory.SharedMemory(create=True, size=max(1, sum(img.nbytes for img in images)))
+
+        specs = []
+        offset = 0
+        for img in images:
+            view = np.ndarray(img.shape, dtype=img.dtype, buffer=shm.buf, offset=offset)
+            view[...] = img
+            del view
+            specs.append((offset, img.shape, img.dtype.str))
+            offset += img.nbytes
+        return shm, specs
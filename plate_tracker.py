@@ -0,0 +1,286 @@
+"""
+Lightweight plate tracker around ALPREngine.detect_plates
+
+Gives each plate a track ID by matching detections across frames (IoU first,
+centroid distance as fallback), only re-runs OCR on a track when its crop gets
+bigger or sharper, and combines the readings of a track with
+confidence-weighted per-character voting.
+"""
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from logging_config import get_logger
+
+# Get logger
+logger = get_logger('app')
+
+DEFAULT_TRACKER_CONFIG = {
+    'iou_threshold': 0.3,           # Minimum IoU to continue a track
+    'max_centroid_distance': 80,    # Fallback match radius in pixels
+    'max_age': 1.0,                 # Seconds a track survives without detections
+    'min_quality_gain': 1.15,       # Crop must be this much better to re-run OCR
+    'max_readings': 5,              # OCR calls per track at most
+    'min_readings': 3,              # Readings before a track is reported
+    'report_after': 0.5             # ...or seconds since its first reading
+}
+
+Box = Tuple[int, int, int, int]
+
+
+def box_iou(a: Box, b: Box) -> float:
+    """Intersection over union of two (x1, y1, x2, y2) boxes"""
+    ix1, iy1 = max(a[0], b[0]), max(a[1], b[1])
+    ix2, iy2 = min(a[2], b[2]), min(a[3], b[3])
+    inter = max(0, ix2 - ix1) * max(0, iy2 - iy1)
+    if inter == 0:
+        return 0.0
+    area_a = (a[2] - a[0]) * (a[3] - a[1])
+    area_b = (b[2] - b[0]) * (b[3] - b[1])
+    return inter / float(area_a + area_b - inter)
+
+
+def box_centroid_distance(a: Box, b: Box) -> float:
+    """Euclidean distance between the centres of two boxes"""
+    ax, ay = (a[0] + a[2]) / 2, (a[1] + a[3]) / 2
+    bx, by = (b[0] + b[2]) / 2, (b[1] + b[3]) / 2
+    return float(np.hypot(ax - bx, ay - by))
+
+
+def crop_quality(plate_img: np.ndarray) -> float:
+    """Score a plate crop by its area times its sharpness (variance of the Laplacian)"""
+    if plate_img is None or plate_img.size == 0:
+        return 0.0
+    gray = cv2.cvtColor(plate_img, cv2.COLOR_BGR2GRAY) if plate_img.ndim == 3 else plate_img
+    sharpness = cv2.Laplacian(gray, cv2.CV_64F).var()
+    return float(gray.shape[0] * gray.shape[1]) * float(sharpness)
+
+
+class PlateTrack:
+    """State of a single tracked plate"""
+    def __init__(self, track_id: int, bbox: Box, timestamp: float):
+        self.track_id = track_id
+        self.bbox = bbox
+        self.first_seen = timestamp
+        self.last_seen = timestamp
+        self.first_reading_at = None
+        self.readings = 0
+        self.pending = 0        # OCR jobs handed out by assign() and not yet recorded
+        self.reported = False
+
+        # Quality of the best crop that has been sent to OCR so far
+        self.best_quality = 0.0
+        self.best_plate_image = None
+        self.best_preprocessed_image = None
+        self.best_detection_confidence = 0.0
+
+        # votes[length][position][char] = summed OCR confidence
+        self.votes: Dict[int, List[Dict[str, float]]] = {}
+        self.length_counts: Dict[int, int] = {}
+
+    def add_reading(self, text: str, confidence: float):
+        """Add one OCR reading to the per-character vote"""
+        if not text:
+            return
+        positions = self.votes.setdefault(len(text), [{} for _ in text])
+        for position, char in zip(positions, text):
+            position[char] = position.get(char, 0.0) + confidence
+        self.length_counts[len(text)] = self.length_counts.get(len(text), 0) + 1
+
+    def consensus(self) -> Optional[Tuple[str, float]]:
+        """
+        Combine readings by confidence-weighted character voting
+        Returns: (plate_text, confidence) or None
+        """
+        if not self.votes:
+            return None
+
+        # Readings of different length cannot be aligned character by character,
+        # so vote within the length that carries the most total confidence
+        length = max(self.votes, key=lambda n: sum(sum(p.values()) for p in self.votes[n]))
+        positions = self.votes[length]
+        count = self.length_counts[length]
+
+        chars = []
+        shares = []
+        for position in positions:
+            char, weight = max(position.items(), key=lambda item: item[1])
+            chars.append(char)
+            # Mean confidence of the winning char, counting dissenting readings as 0
+            shares.append(weight / count)
+
+        return ''.join(chars), float(np.mean(shares))
+
+
+class PlateTracker:
+    """IoU/centroid tracker that limits OCR to a few readings per vehicle"""
+    def __init__(self, alpr_engine, config: Optional[dict] = None):
+        self.alpr_engine = alpr_engine
+        self.config = dict(DEFAULT_TRACKER_CONFIG)
+        self.config.update(config or {})
+
+        self.tracks: Dict[int, PlateTrack] = {}
+        self._next_id = 1
+        self._lock = threading.RLock()
+
+        # Counters for monitoring how much OCR the tracker saves
+        self.detections_seen = 0
+        self.ocr_calls = 0
+
+    def reset(self):
+        """Forget all tracks (e.g. after detection was paused)"""
+        with self._lock:
+            self.tracks.clear()
+
+    def update(self, frame: np.ndarray, timestamp: Optional[float] = None) -> List[dict]:
+        """
+        Detect plates in frame, update tracks and OCR only the tracks that need it
+        Returns: list of process_frame()-style result dicts for tracks that are
+                 ready to be reported, each with an extra 'track_id'
+        """
+        timestamp = time.monotonic() if timestamp is None else timestamp
+        detections = self.alpr_engine.detect_plates(frame)
+
+        with self._lock:
+            assignments = self.assign(detections, timestamp)
+            pending = [a for a in assignments if a[4]]
+            if pending:
+                ocr_results = self.alpr_engine.read_plate_texts([a[1] for a in pending])
+                for (track, plate_img, det_confidence, quality, _), ocr_result in zip(pending, ocr_results):
+                    self.record_reading(track, plate_img, det_confidence, quality, ocr_result, timestamp)
+            return self.collect_reports(timestamp)
+
+    def assign(self, detections: list, timestamp: float) -> List[Tuple[PlateTrack, np.ndarray, float, float, bool]]:
+        """
+        Match detect_plates() output to tracks, creating tracks for new plates
+        Returns: list of (track, plate_img, det_confidence, quality, needs_ocr)
+        """
+        with self._lock:
+            self._expire(timestamp)
+            self.detections_seen += len(detections)
+
+            matches = self._match(detections)
+            assignments = []
+            for det_idx, (plate_img, det_confidence, bbox) in enumerate(detections):
+                track = matches.get(det_idx)
+                if track is None:
+                    track = PlateTrack(self._next_id, bbox, timestamp)
+                    self.tracks[track.track_id] = track
+                    self._next_id += 1
+                else:
+                    track.bbox = bbox
+                    track.last_seen = timestamp
+
+                quality = crop_quality(plate_img)
+                # Count OCR jobs still in flight on another thread as readings already taken
+                requested = track.readings + track.pending
+                # A reported track's consensus is final; further readings would go unused
+                needs_ocr = (
+                    not track.reported and
+                    requested < self.config['max_readings'] and
+                    (requested == 0 or quality >= track.best_quality * self.config['min_quality_gain'])
+                )
+                if needs_ocr:
+                    track.pending += 1
+                    track.best_quality = max(track.best_quality, quality)
+                assignments.append((track, plate_img, det_confidence, quality, needs_ocr))
+
+            return assignments
+
+    def record_reading(self, track: PlateTrack, plate_img: np.ndarray, det_confidence: float,
+                       quality: float, ocr_result: Optional[Tuple[str, float, np.ndarray]],
+                       timestamp: float):
+        """Store the OCR result of a track's crop (None if OCR rejected it)"""
+        with self._lock:
+            self.ocr_calls += 1
+            track.readings += 1
+            track.pending = max(0, track.pending - 1)
+            # Even a rejected reading raises the bar, so a crop of the same quality is not retried
+            track.best_quality = max(track.best_quality, quality)
+
+            if ocr_result is None:
+                return
+
+            plate_text, ocr_confidence, preprocessed_img = ocr_result
+            track.add_reading(plate_text, ocr_confidence)
+            if track.first_reading_at is None:
+                track.first_reading_at = timestamp
+            if track.best_plate_image is None or quality >= track.best_quality:
+                track.best_plate_image = plate_img
+                track.best_preprocessed_image = preprocessed_img
+                track.best_detection_confidence = det_confidence
+
+    def cancel_reading(self, track: PlateTrack):
+        """Release an OCR job from assign() that will never be recorded (e.g. dropped from a queue)"""
+        with self._lock:
+            track.pending = max(0, track.pending - 1)
+
+    def collect_reports(self, timestamp: float) -> List[dict]:
+        """Return results for tracks that have collected enough readings and were not reported yet"""
+        with self._lock:
+            reports = []
+            for track in self.tracks.values():
+                if track.reported or track.first_reading_at is None:
+                    continue
+
+                enough = sum(track.length_counts.values()) >= self.config['min_readings']
+                waited = timestamp - track.first_reading_at >= self.config['report_after']
+                exhausted = track.readings >= self.config['max_readings']
+                if enough or waited or exhausted:
+                    result = self._build_report(track)
+                    if result is not None:
+                        track.reported = True
+                        reports.append(result)
+
+            return reports
+
+    def _build_report(self, track: PlateTrack) -> Optional[dict]:
+        consensus = track.consensus()
+        if consensus is None:
+            return None
+
+        plate_text, ocr_confidence = consensus
+        result = self.alpr_engine._build_result(
+            track.best_plate_image,
+            track.best_detection_confidence,
+            (plate_text, ocr_confidence, track.best_preprocessed_image),
+            track.bbox
+        )
+        result['track_id'] = track.track_id
+        result['readings'] = track.readings
+        return result
+
+    def _match(self, detections: list) -> Dict[int, PlateTrack]:
+        """Greedy assignment of detections to live tracks, IoU first then centroid distance"""
+        matches: Dict[int, PlateTrack] = {}
+        free_tracks = dict(self.tracks)
+
+        pairs = []
+        for det_idx, (_, _, bbox) in enumerate(detections):
+            for track in free_tracks.values():
+                iou = box_iou(bbox, track.bbox)
+                if iou >= self.config['iou_threshold']:
+                    pairs.append((iou, det_idx, track.track_id))
+        for _, det_idx, track_id in sorted(pairs, reverse=True):
+            if det_idx in matches or track_id not in free_tracks:
+                continue
+            matches[det_idx] = free_tracks.pop(track_id)
+
+        # Fast-moving or partially occluded plates may not overlap the previous box
+        for det_idx, (_, _, bbox) in enumerate(detections):
+            if det_idx in matches or not free_tracks:
+                continue
+            track = min(free_tracks.values(), key=lambda t: box_centroid_distance(bbox, t.bbox))
+            if box_centroid_distance(bbox, track.bbox) <= self.config['max_centroid_distance']:
+                matches[det_idx] = free_tracks.pop(track.track_id)
+
+        return matches
+
+    def _expire(self, timestamp: float):
+        expired = [tid for tid, t in self.tracks.items() if timestamp - t.last_seen > self.config['max_age']]
+        for track_id in expired:
+            track = self.tracks.pop(track_id)
+            logger.debug(f"Track {track_id} expired after {track.readings} OCR readings")
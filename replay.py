@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Offline replay: run the ALPR pipeline over a recorded video or image folder
+
+Frames are decoded in a background thread and pushed through
+ALPREngine.process_batch as fast as the hardware allows (no real-time
+pacing). Per-frame results go to JSONL or CSV, and a throughput summary is
+printed at the end.
+
+Usage:
+    python replay.py recording.mp4 --output results.jsonl
+    python replay.py snapshots --output results.csv --expect-from-filename
+"""
+import argparse
+import csv
+import glob
+import json
+import os
+import queue
+import sys
+import threading
+import time
+
+import cv2
+
+# Ensure package is in path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from alpr_engine import ALPREngine
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+CSV_FIELDS = ['source', 'frame', 'position_ms', 'plate_number', 'confidence', 'detection_confidence',
+              'ocr_confidence', 'bbox', 'expected', 'match']
+
+
+def iter_frames(path: str):
+    """Yield (source, frame_index, position_ms, frame) from a video file, image folder or glob"""
+    if os.path.isdir(path) or any(c in path for c in '*?['):
+        pattern = os.path.join(path, '*') if os.path.isdir(path) else path
+        files = sorted(f for f in glob.glob(pattern) if f.lower().endswith(IMAGE_EXTENSIONS))
+        for index, filename in enumerate(files):
+            frame = cv2.imread(filename)
+            if frame is not None:
+                yield filename, index, None, frame
+        return
+
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise IOError(f"Cannot open video: {path}")
+    index = 0
+    try:
+        while True:
+            ok, frame = cap.read()
+            if not ok:
+                break
+            yield path, index, cap.get(cv2.CAP_PROP_POS_MSEC), frame
+            index += 1
+    finally:
+        cap.release()
+
+
+def prefetch(iterator, depth: int):
+    """
+    Run iterator in a background thread so decoding overlaps inference
+    An exception raised by iterator is re-raised in the consumer
+    """
+    items = queue.Queue(maxsize=depth)
+    done = object()
+
+    def worker():
+        try:
+            for item in iterator:
+                items.put((item, None))
+        except BaseException as e:
+            items.put((done, e))
+        else:
+            items.put((done, None))
+
+    threading.Thread(target=worker, daemon=True).start()
+    while True:
+        item, error = items.get()
+        if item is done:
+            if error is not None:
+                raise error
+            return
+        yield item
+
+
+def batched(iterator, size: int):
+    batch = []
+    for item in iterator:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def expected_plate(source: str) -> str:
+    """Plate encoded in a snapshot filename, e.g. snapshots/MH12AB1234_20260105_233220.jpg"""
+    return os.path.basename(source).split('_')[0].upper()
+
+
+class ResultWriter:
+    """Writes one JSON line per frame, or one CSV row per plate"""
+    def __init__(self, path: str):
+        self.file = open(path, 'w', newline='', encoding='utf-8') if path else None
+        self.csv = None
+        if self.file and path.lower().endswith('.csv'):
+            self.csv = csv.DictWriter(self.file, fieldnames=CSV_FIELDS)
+            self.csv.writeheader()
+
+    def write(self, record: dict):
+        if not self.file:
+            return
+        if not self.csv:
+            self.file.write(json.dumps(record) + "\n")
+            return
+        base = {k: record.get(k) for k in ('source', 'frame', 'position_ms', 'expected')}
+        plates = record['plates'] or [{}]
+        for plate in plates:
+            row = dict(base)
+            row.update({k: plate.get(k) for k in CSV_FIELDS if k in plate})
+            if record.get('expected') is not None:
+                row['match'] = plate.get('plate_number') == record['expected']
+            self.csv.writerow(row)
+
+    def close(self):
+        if self.file:
+            self.file.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the ALPR pipeline over a recorded video or image folder")
+    parser.add_argument("input", help="Video file, image folder or image glob")
+    parser.add_argument("--config", type=str, default="config.json", help="Path to config.json")
+    parser.add_argument("--output", type=str, default=None, help="Results file (.jsonl or .csv)")
+    parser.add_argument("--batch-size", type=int, default=8, help="Frames per process_batch call")
+    parser.add_argument("--prefetch", type=int, default=32, help="Decoded frames buffered ahead of inference")
+    parser.add_argument("--max-frames", type=int, default=0, help="Stop after this many frames (0 = all)")
+    parser.add_argument("--expect-from-filename", action="store_true",
+                        help="Compare readings with the plate at the start of each image filename")
+    parser.add_argument("--summary", type=str, default=None, help="Also write the summary as JSON to this file")
+    args = parser.parse_args()
+
+    engine = ALPREngine(args.config)
+    writer = ResultWriter(args.output)
+
+    frames = prefetch(iter_frames(args.input), args.prefetch)
+    stats = {'frames': 0, 'frames_with_plates': 0, 'plates': 0, 'expected': 0, 'correct': 0}
+
+    print(f"Replaying {args.input} (batch size {args.batch_size})...")
+    start = time.perf_counter()
+    try:
+        for batch in batched(frames, args.batch_size):
+            if args.max_frames:
+                batch = batch[:max(0, args.max_frames - stats['frames'])]
+                if not batch:
+                    break
+            results = engine.process_batch([frame for _, _, _, frame in batch])
+
+            for (source, index, position_ms, _), frame_results in zip(batch, results):
+                plates = [
+                    {
+                        'plate_number': r['plate_number'],
+                        'confidence': round(r['confidence'], 4),
+                        'detection_confidence': round(r['detection_confidence'], 4),
+                        'ocr_confidence': round(r['ocr_confidence'], 4),
+                        'bbox': list(r['bbox']) if r.get('bbox') else None
+                    }
+                    for r in frame_results
+                ]
+                record = {'source': source, 'frame': index, 'position_ms': position_ms, 'plates': plates}
+                if args.expect_from_filename:
+                    record['expected'] = expected_plate(source)
+                    stats['expected'] += 1
+                    stats['correct'] += any(p['plate_number'] == record['expected'] for p in plates)
+                writer.write(record)
+
+                stats['frames'] += 1
+                stats['frames_with_plates'] += bool(plates)
+                stats['plates'] += len(plates)
+
+            if stats['frames'] % (args.batch_size * 25) < args.batch_size:
+                elapsed = time.perf_counter() - start
+                print(f"  {stats['frames']} frames, {stats['frames'] / elapsed:.1f} fps")
+    finally:
+        writer.close()
+        engine.close()
+
+    elapsed = time.perf_counter() - start
+    stats['seconds'] = round(elapsed, 3)
+    stats['fps'] = round(stats['frames'] / elapsed, 2) if elapsed > 0 else 0.0
+    if stats['expected']:
+        stats['accuracy'] = round(stats['correct'] / stats['expected'], 4)
+
+    print("\n" + "="*60)
+    print(f"Frames:             {stats['frames']}")
+    print(f"Frames with plates: {stats['frames_with_plates']}")
+    print(f"Plates read:        {stats['plates']}")
+    print(f"Time:               {elapsed:.2f}s")
+    print(f"Throughput:         {stats['fps']:.2f} fps")
+    if stats['expected']:
+        print(f"Filename matches:   {stats['correct']}/{stats['expected']} ({stats['accuracy']:.1%})")
+    print("="*60)
+
+    if args.summary:
+        with open(args.summary, 'w') as f:
+            json.dump(stats, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
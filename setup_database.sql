@@ -37,6 +37,65 @@ CREATE INDEX idx_detection_timestamp ON detection_history(detected_at);
 CREATE INDEX idx_detection_node ON detection_history(node_id);
 CREATE INDEX idx_detection_status ON detection_history(status);
 
+-- Per-day, per-node detection counters (dashboard and entry/exit occupancy)
+CREATE TABLE daily_node_counters (
+    day DATE NOT NULL,
+    node_id VARCHAR(50) NOT NULL,
+    allowed INTEGER NOT NULL DEFAULT 0,
+    denied INTEGER NOT NULL DEFAULT 0,
+    total INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, node_id)
+);
+
+-- Keep the counters in step with detection_history in the same transaction
+CREATE OR REPLACE FUNCTION count_detection() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('DELETE', 'UPDATE') THEN
+        UPDATE daily_node_counters
+        SET allowed = allowed - (OLD.status = 'ALLOWED')::int,
+            denied = denied - (OLD.status = 'DENIED')::int,
+            total = total - 1
+        WHERE day = OLD.detected_at::date AND node_id = OLD.node_id;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO daily_node_counters AS c (day, node_id, allowed, denied, total)
+        VALUES (NEW.detected_at::date, NEW.node_id,
+                (NEW.status = 'ALLOWED')::int, (NEW.status = 'DENIED')::int, 1)
+        ON CONFLICT (day, node_id) DO UPDATE
+        SET allowed = c.allowed + EXCLUDED.allowed,
+            denied = c.denied + EXCLUDED.denied,
+            total = c.total + 1;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER detection_history_count
+AFTER INSERT OR UPDATE OR DELETE ON detection_history
+FOR EACH ROW EXECUTE PROCEDURE count_detection();
+
+-- Notify the application's vehicle cache of every change to vehicles
+CREATE OR REPLACE FUNCTION notify_vehicle_change() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        PERFORM pg_notify('vehicles_changed', json_build_object(
+            'op', TG_OP, 'plate', OLD.plate_number, 'old_plate', OLD.plate_number)::text);
+        RETURN OLD;
+    ELSIF TG_OP = 'UPDATE' THEN
+        PERFORM pg_notify('vehicles_changed', json_build_object(
+            'op', TG_OP, 'plate', NEW.plate_number, 'old_plate', OLD.plate_number)::text);
+    ELSE
+        PERFORM pg_notify('vehicles_changed', json_build_object(
+            'op', TG_OP, 'plate', NEW.plate_number, 'old_plate', NULL)::text);
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER vehicles_notify
+AFTER INSERT OR UPDATE OR DELETE ON vehicles
+FOR EACH ROW EXECUTE PROCEDURE notify_vehicle_change();
+
 -- Insert sample data
 INSERT INTO vehicles (plate_number, owner_name, vehicle_type, contact_number, valid_until, notes)
 VALUES 
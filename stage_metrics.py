@@ -0,0 +1,192 @@
+"""
+Per-stage latency metrics
+
+Stage timings are plain dicts of stage name -> seconds that the engine,
+pipeline and front ends fill in with time.perf_counter() and attach to each
+result as result['timings']. MetricsRegistry aggregates them per lane into
+cumulative histograms plus a rolling window for quantiles, and can serve
+them as Prometheus text on a local HTTP port.
+
+In the multi-lane pipeline YOLO and OCR run once for a batch of frames from
+several lanes, so their stages ('yolo', 'crop', 'preprocess', 'ocr', 'clean')
+are batch-level series under lane="batch", one sample per batch. The series
+labelled with a lane's node_id are per frame: 'capture_age' (capture until
+the detect batch starts) and 'end_to_end' (capture until the frame's results
+are handed over), plus the front ends' 'db_lookup' and 'snapshot_write'.
+"""
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+
+from logging_config import get_logger
+
+# Get logger
+logger = get_logger('app')
+
+# Stages in pipeline order
+STAGES = ('capture_age', 'yolo', 'crop', 'preprocess', 'ocr', 'clean', 'end_to_end', 'db_lookup', 'snapshot_write')
+
+# Histogram bucket upper bounds in seconds
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+DEFAULT_METRICS_CONFIG = {
+    'enabled': False,
+    'host': '127.0.0.1',
+    'port': 9108,
+    'window': 1000      # Recent samples per stage used for the quantiles
+}
+
+
+def add_timing(timings: Optional[dict], stage: str, seconds: float):
+    """Accumulate seconds for stage into timings (no-op when timings is None)"""
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + seconds
+
+
+@contextmanager
+def stage_timer(timings: Optional[dict], stage: str):
+    """Time the enclosed block into timings[stage]"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        add_timing(timings, stage, time.perf_counter() - start)
+
+
+class RollingHistogram:
+    """Cumulative bucket counts plus the most recent samples for quantiles"""
+    def __init__(self, window: int):
+        self.buckets = [0] * len(BUCKETS)
+        self.count = 0
+        self.total = 0.0
+        self.recent = deque(maxlen=window)
+
+    def observe(self, seconds: float):
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                self.buckets[i] += 1
+                break
+        self.count += 1
+        self.total += seconds
+        self.recent.append(seconds)
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self.recent:
+            return None
+        ordered = sorted(self.recent)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class MetricsRegistry:
+    """Stage latency histograms per lane"""
+    def __init__(self, window: int = DEFAULT_METRICS_CONFIG['window']):
+        self.window = window
+        self.histograms: Dict[tuple, RollingHistogram] = {}
+        self.lock = threading.Lock()
+        self.server = None
+
+    def observe(self, lane: Optional[str], stage: str, seconds: float):
+        key = (lane or 'default', stage)
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = RollingHistogram(self.window)
+            histogram.observe(seconds)
+
+    def observe_timings(self, lane: Optional[str], timings: Optional[dict]):
+        for stage, seconds in (timings or {}).items():
+            self.observe(lane, stage, seconds)
+
+    def snapshot(self) -> dict:
+        """{lane: {stage: {'count', 'mean_ms', 'p50_ms', 'p95_ms', 'p99_ms'}}}"""
+        with self.lock:
+            items = list(self.histograms.items())
+            summary = {}
+            for (lane, stage), h in items:
+                summary.setdefault(lane, {})[stage] = {
+                    'count': h.count,
+                    'mean_ms': h.total / h.count * 1000.0 if h.count else None,
+                    **{f"p{int(q * 100)}_ms": (h.quantile(q) or 0.0) * 1000.0 for q in (0.5, 0.95, 0.99)}
+                }
+        return summary
+
+    def render_prometheus(self) -> str:
+        """Prometheus text exposition of all stage histograms"""
+        lines = [
+            "# HELP alpr_stage_seconds Latency of each ALPR pipeline stage",
+            "# TYPE alpr_stage_seconds histogram"
+        ]
+        quantile_lines = [
+            "# HELP alpr_stage_recent_seconds Stage latency quantiles over the recent window",
+            "# TYPE alpr_stage_recent_seconds summary"
+        ]
+        with self.lock:
+            for (lane, stage), h in sorted(self.histograms.items()):
+                labels = f'lane="{lane}",stage="{stage}"'
+                cumulative = 0
+                for bound, count in zip(BUCKETS, h.buckets):
+                    cumulative += count
+                    lines.append(f'alpr_stage_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f'alpr_stage_seconds_bucket{{{labels},le="+Inf"}} {h.count}')
+                lines.append(f'alpr_stage_seconds_sum{{{labels}}} {h.total:.6f}')
+                lines.append(f'alpr_stage_seconds_count{{{labels}}} {h.count}')
+                for q in (0.5, 0.95, 0.99):
+                    value = h.quantile(q)
+                    if value is not None:
+                        quantile_lines.append(f'alpr_stage_recent_seconds{{{labels},quantile="{q}"}} {value:.6f}')
+        return "\n".join(lines + quantile_lines) + "\n"
+
+    def start_http_server(self, host: str, port: int):
+        """Serve /metrics in a daemon thread"""
+        if self.server:
+            return
+        registry = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] not in ('/metrics', '/'):
+                    self.send_error(404)
+                    return
+                body = registry.render_prometheus().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), MetricsHandler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, name="alpr-metrics", daemon=True).start()
+        logger.info(f"Metrics available at http://{host}:{port}/metrics")
+        print(f"✓ Metrics: http://{host}:{port}/metrics")
+
+    def stop_http_server(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+
+# Process-wide registry
+metrics = MetricsRegistry()
+
+
+def start_metrics_server(config: Optional[dict]) -> bool:
+    """Start the /metrics endpoint if the 'metrics' section of config.json enables it"""
+    metrics_config = dict(DEFAULT_METRICS_CONFIG)
+    metrics_config.update(config or {})
+    if not metrics_config['enabled']:
+        return False
+    metrics.window = metrics_config['window']
+    try:
+        metrics.start_http_server(metrics_config['host'], metrics_config['port'])
+        return True
+    except OSError as e:
+        logger.error(f"Could not start metrics server: {e}")
+        return False
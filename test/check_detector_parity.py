@@ -0,0 +1,113 @@
+"""
+Detector backend parity check
+Runs the ultralytics, ONNX and TorchScript detector backends over the same
+images and checks that they find the same plate boxes within a tolerance.
+
+Usage:
+    python check_detector_parity.py --pt ../models/license_plate_detector.pt \
+        --onnx ../models/license_plate_detector.onnx \
+        --torchscript ../models/license_plate_detector.torchscript
+"""
+
+import argparse
+import glob
+import os
+import sys
+
+import cv2
+import numpy as np
+
+# Run from the test folder against the main modules in the parent directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from detector_backends import UltralyticsDetector, OnnxDetector, TorchScriptDetector
+from plate_tracker import box_iou
+
+
+def match_boxes(reference: np.ndarray, candidate: np.ndarray, min_iou: float):
+    """Pair every reference box with its best candidate box; returns (pairs, unmatched_count)"""
+    pairs = []
+    unmatched = 0
+    used = set()
+    for ref in reference:
+        best_iou, best_idx = 0.0, None
+        for idx, cand in enumerate(candidate):
+            if idx in used:
+                continue
+            iou = box_iou(tuple(ref[:4]), tuple(cand[:4]))
+            if iou > best_iou:
+                best_iou, best_idx = iou, idx
+        if best_idx is None or best_iou < min_iou:
+            unmatched += 1
+            continue
+        used.add(best_idx)
+        pairs.append((ref, candidate[best_idx], best_iou))
+    unmatched += len(candidate) - len(used)
+    return pairs, unmatched
+
+
+def main():
+    parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+    parser = argparse.ArgumentParser(description="Check that all detector backends produce the same boxes")
+    parser.add_argument("--pt", default=os.path.join(parent_dir, "models", "license_plate_detector.pt"))
+    parser.add_argument("--onnx", default=None, help="Exported ONNX model")
+    parser.add_argument("--torchscript", default=None, help="Exported TorchScript model")
+    parser.add_argument("--images", default=os.path.join(parent_dir, "snapshots", "*.jpg"), help="Image glob")
+    parser.add_argument("--imgsz", type=int, default=640, help="Input size the models were exported with")
+    parser.add_argument("--conf", type=float, default=0.5, help="Detection confidence threshold")
+    parser.add_argument("--min-iou", type=float, default=0.9, help="Minimum IoU for boxes to count as equal")
+    parser.add_argument("--conf-tolerance", type=float, default=0.05, help="Maximum confidence difference")
+    args = parser.parse_args()
+
+    images = [cv2.imread(path) for path in sorted(glob.glob(args.images))]
+    images = [image for image in images if image is not None]
+    if not images:
+        print(f"[ERROR] No images found for {args.images}")
+        return 1
+
+    reference = UltralyticsDetector(args.pt)
+    candidates = []
+    if args.onnx:
+        candidates.append(OnnxDetector(args.onnx, imgsz=args.imgsz))
+    if args.torchscript:
+        candidates.append(TorchScriptDetector(args.torchscript, imgsz=args.imgsz))
+    if not candidates:
+        print("[ERROR] Pass --onnx and/or --torchscript to compare against the .pt model")
+        return 1
+
+    # Run the reference at the size the models were exported with
+    ref_boxes = [reference.detect([image], args.conf, args.imgsz)[0] for image in images]
+
+    failed = False
+    print("\n" + "="*70)
+    print(f" DETECTOR PARITY ({len(images)} images, min IoU {args.min_iou}, conf tol {args.conf_tolerance})")
+    print("="*70)
+    for backend in candidates:
+        cand_boxes = backend.detect(images, args.conf)
+
+        ious, conf_diffs, unmatched = [], [], 0
+        for ref, cand in zip(ref_boxes, cand_boxes):
+            pairs, missing = match_boxes(ref, cand, args.min_iou)
+            unmatched += missing
+            for ref_box, cand_box, iou in pairs:
+                ious.append(iou)
+                conf_diffs.append(abs(float(ref_box[4]) - float(cand_box[4])))
+
+        worst_iou = min(ious) if ious else 1.0
+        worst_conf = max(conf_diffs) if conf_diffs else 0.0
+        ok = unmatched == 0 and worst_conf <= args.conf_tolerance
+        failed |= not ok
+
+        print(f"\n[{'PASS' if ok else 'FAIL'}] {backend.name}")
+        print(f"  Matched boxes:      {len(ious)}")
+        print(f"  Unmatched boxes:    {unmatched}")
+        print(f"  Worst IoU:          {worst_iou:.4f}")
+        print(f"  Worst conf diff:    {worst_conf:.4f}")
+
+    print()
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+import argparse
+import os
+import sys
+
+import torch
+import torch.nn as nn
+from torch.utils.data import DataLoader
+
+# Ensure package is in path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import lprnet
+
+
+def evaluate(model, loader, device):
+    """Exact-match plate accuracy on a data loader"""
+    model.eval()
+    correct = 0
+    total = 0
+    with torch.no_grad():
+        for images, labels, lengths in loader:
+            decoded = lprnet.greedy_decode(model(images.to(device)))
+            offset = 0
+            for (text, _), length in zip(decoded, lengths.tolist()):
+                target = ''.join(lprnet.CHARS[i] for i in labels[offset:offset + length].tolist())
+                offset += length
+                correct += int(text == target)
+                total += 1
+    return correct / total if total else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the LPRNet OCR backend on indian_plate_generator output")
+    parser.add_argument("--dataset", type=str, default="dataset", help="Directory written by generate_dataset.py")
+    parser.add_argument("--output", type=str, default="models/lprnet.pth", help="Where to save the trained weights")
+    parser.add_argument("--epochs", type=int, default=30, help="Number of training epochs")
+    parser.add_argument("--batch-size", type=int, default=64, help="Batch size")
+    parser.add_argument("--lr", type=float, default=1e-3, help="Learning rate")
+    parser.add_argument("--workers", type=int, default=2, help="Data loader worker processes")
+    parser.add_argument("--resume", type=str, default=None, help="Continue from existing weights")
+    parser.add_argument("--device", type=str, default="cuda" if torch.cuda.is_available() else "cpu")
+
+    args = parser.parse_args()
+
+    print(f"Dataset: {os.path.abspath(args.dataset)}")
+    print(f"Device: {args.device}")
+
+    train_set = lprnet.PlateCropDataset(args.dataset, 'train', augment=True)
+    val_set = lprnet.PlateCropDataset(args.dataset, 'val')
+    print(f"Train: {len(train_set)} plates, Val: {len(val_set)} plates")
+
+    train_loader = DataLoader(train_set, batch_size=args.batch_size, shuffle=True,
+                              num_workers=args.workers, collate_fn=lprnet.collate)
+    val_loader = DataLoader(val_set, batch_size=args.batch_size, shuffle=False,
+                            num_workers=args.workers, collate_fn=lprnet.collate)
+
+    model = lprnet.LPRNet().to(args.device)
+    if args.resume:
+        model.load_state_dict(torch.load(args.resume, map_location=args.device))
+        print(f"Resumed from: {args.resume}")
+
+    optimizer = torch.optim.Adam(model.parameters(), lr=args.lr)
+    scheduler = torch.optim.lr_scheduler.CosineAnnealingLR(optimizer, T_max=args.epochs)
+    ctc_loss = nn.CTCLoss(blank=lprnet.BLANK, reduction='mean', zero_infinity=True)
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    best_accuracy = -1.0
+
+    for epoch in range(1, args.epochs + 1):
+        model.train()
+        running_loss = 0.0
+        for images, labels, lengths in train_loader:
+            images = images.to(args.device)
+            logits = model(images)                                   # (B, C, T)
+            log_probs = logits.permute(2, 0, 1).log_softmax(2)      # (T, B, C)
+            input_lengths = torch.full((images.size(0),), log_probs.size(0), dtype=torch.long)
+
+            loss = ctc_loss(log_probs, labels, input_lengths, lengths)
+            optimizer.zero_grad()
+            loss.backward()
+            optimizer.step()
+            running_loss += loss.item() * images.size(0)
+
+        scheduler.step()
+        accuracy = evaluate(model, val_loader, args.device)
+        print(f"Epoch {epoch}/{args.epochs} - loss: {running_loss / max(1, len(train_set)):.4f}, "
+              f"val accuracy: {accuracy:.2%}")
+
+        if accuracy > best_accuracy:
+            best_accuracy = accuracy
+            torch.save(model.state_dict(), args.output)
+            print(f"✓ Saved best model to {args.output}")
+
+    print(f"Done! Best val accuracy: {best_accuracy:.2%}")
+
+
+if __name__ == "__main__":
+    main()